@@ -1,73 +1,39 @@
 import streamlit as st
-import os, pickle, time, urllib.parse, requests, pandas as pd
+import os, io, sys, pickle, pandas as pd
+from functools import partial
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-def fetch_data_for_smallcode(smallCode):
-    try:
-        url = f'https://fasih-sm.bps.go.id/assignment-general/api/assignments/get-principal-values-by-smallest-code/{survey_period_id}/{smallCode}'
-        resp = st.session_state.session.get(url, headers=headers)
-        if resp.status_code != 200 or not resp.text.strip():
-            return [], []
-
-        data = resp.json().get('data', [])
-        if not data:
-            return [], []
-
-        local_results_assign = data
-        local_results_answers = []
-
-        for d in data:
-            assignment_id = d.get('assignmentId')
-            url_detail = f'https://fasih-sm.bps.go.id/assignment-general/api/assignment/get-by-id-with-data-for-scm?id={assignment_id}'
-            resp_detail = sess.get(url_detail, headers=headers)
-            if resp_detail.status_code != 200:
-                continue
-
-            try:
-                detail_json = resp_detail.json()
-                inner_str = detail_json.get("data", {}).get("data") if isinstance(detail_json.get("data"), dict) else detail_json.get("data")
-                if isinstance(inner_str, str):
-                    import json as _json
-                    inner_json = _json.loads(inner_str)
-                else:
-                    inner_json = detail_json.get("data", {})
-                answers = inner_json.get("answers", [])
-                flat = {}
-                for a in answers:
-                    k = a.get("dataKey")
-                    v = a.get("value") if "value" in a else a.get("dataValue")
-                    flat[k] = v
-                flat['assignment_id'] = assignment_id
-                flat['smallCode'] = smallCode
-                local_results_answers.append(flat)
-            except Exception:
-                continue
-
-        return local_results_assign, local_results_answers
-    except Exception as e:
-        st.warning(f"Error smallCode {smallCode}: {e}")
-        return [], []
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fasih_approve import APPROVE_URL, ROLE_APPROVE_FROM
+from fasih_browser import (LEAN_BROWSER, LEGACY_SLEEP, POLL, DriverPool, apply_lean, chrome_options, open_driver,
+                           suggested_pool_size, track_xhr, wait_idle, wait_ready, wait_url)
+from fasih_client import FasihClient, fasih_headers
+from fasih_wilayah import load_wilayah, RegionCache, DEFAULT_WORKERS, DEFAULT_TTL
+from fasih_fetch import DEFAULT_FETCH_WORKERS
+from fasih_jobs import DEFAULT_MAX_JOBS, JobRunner
+from fasih_metrics import StepTimer, timed
+from fasih_pool import SessionPool
+from fasih_runs import approve_assignments, raw_export
+from fasih_writer import DEFAULT_CHUNK_ROWS
+
+# Mesin HTTP: thread pool (requests) atau asyncio (httpx, perlu `pip install httpx`)
+ENGINES = {"Thread pool (requests)": "thread", "Asyncio (httpx)": "async"}
 
 # =============== FUNGSI DASAR ===============
 
-def setup_driver() -> webdriver.Chrome:
+def setup_driver(lean=LEAN_BROWSER) -> webdriver.Chrome:
+    # jendela tetap terlihat (OTP diketik manual); profil ringan: tanpa gambar/font/analytics
     service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("--disable-logging")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    chrome_options.add_experimental_option("prefs", {
-        "credentials_enable_service": False,
-        "profile.password_manager_enabled": False
-    })
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver = webdriver.Chrome(service=service, options=chrome_options(headless=False, lean=lean))
+    if lean:
+        apply_lean(driver)
+    track_xhr(driver)
     return driver
 
 
@@ -82,10 +48,14 @@ def muat_session(folder, username):
     if os.path.exists(filepath):
         with open(filepath, "rb") as f:
             data = pickle.load(f)
+        session = data.get("session")
+        if session is not None and not isinstance(session, FasihClient):
+            # file session lama berisi requests.Session biasa
+            session = FasihClient(data.get("headers") or dict(session.headers), session.cookies)
         return (
             data.get("headers"),
             data.get("cookies"),
-            data.get("session"),
+            session,
             data.get("password", None),
         )
     return None, None, None, None
@@ -107,9 +77,10 @@ def simpan_session(folder, username, headers, cookies, session, password=None):
         )
 
 
-def apply_cookies_to_driver(driver, cookies, domain):
+def apply_cookies_to_driver(driver, cookies, domain, timer=None):
     driver.get(f"https://{domain}")
-    time.sleep(2)
+    with timed(timer, "cookie host"):
+        wait_ready(driver)
     for name, value in cookies.items():
         try:
             driver.add_cookie({
@@ -124,12 +95,15 @@ def apply_cookies_to_driver(driver, cookies, domain):
 
 # =============== LOGIN ===============
 
-def login_sso(driver, username, password):
+def login_sso(driver, username, password, timer=None):
     driver.get("https://sso.bps.go.id")
     driver.find_element(By.NAME, "username").send_keys(username)
     driver.find_element(By.NAME, "password").send_keys(password)
-    driver.find_element(By.XPATH, '//*[@id="kc-login"]').click()
-    time.sleep(1)
+    submit = driver.find_element(By.XPATH, '//*[@id="kc-login"]')
+    submit.click()
+    # tunggu hasil submit: form login diganti (form OTP / halaman berikutnya)
+    with timed(timer, "login sso"):
+        WebDriverWait(driver, 30, poll_frequency=POLL).until(EC.staleness_of(submit))
     # cek apakah diminta OTP
     try:
         otp_element = driver.find_element(By.XPATH, '//*[@id="otp"]')
@@ -138,36 +112,29 @@ def login_sso(driver, username, password):
             otp_element.send_keys(otp)
             driver.find_element(By.XPATH, '//*[@id="kc-login"]').click()
             st.info("🔑 Login dengan OTP berhasil...")
-            time.sleep(3)
+            with timed(timer, "otp"):
+                WebDriverWait(driver, 30, poll_frequency=POLL).until(EC.staleness_of(otp_element))
     except NoSuchElementException:
         st.success("✅ Login tanpa OTP berhasil")
-        time.sleep(2)
+        with timed(timer, "login tanpa otp"):
+            wait_ready(driver)
 
 
-def main_login(driver, username, password):
-    login_sso(driver, username, password)
+def main_login(driver, username, password, timer=None):
+    login_sso(driver, username, password, timer)
     driver.get("https://fasih-sm.bps.go.id/oauth2/authorization/ics")
-    time.sleep(3)
+    # redirect SSO → callback oauth2 → kembali ke host FASIH
+    with timed(timer, "oauth"):
+        wait_url(driver, lambda u: u.startswith("https://fasih-sm.bps.go.id") and "oauth2" not in u)
     driver.get("https://fasih-sm.bps.go.id/survey-collection/survey")
-    time.sleep(3)
+    with timed(timer, "halaman survei"):
+        wait_idle(driver)
 
     cookies = driver.get_cookies()
     cookie_dict = {c['name']: c['value'] for c in cookies}
 
-    xsrf_token = urllib.parse.unquote(cookie_dict.get("XSRF-TOKEN", ""))
-    headers = {
-        "X-Requested-With": "XMLHttpRequest",
-        "X-XSRF-TOKEN": xsrf_token,
-        "Referer": "https://fasih-sm.bps.go.id/",
-        "User-Agent": "Mozilla/5.0",
-        "Content-Type": "application/json",
-        "Accept": "application/json, text/plain, */*",
-        "Origin": "https://fasih-sm.bps.go.id",
-    }
-
-    session = requests.Session()
-    session.cookies.update(cookie_dict)
-    session.headers.update(headers)
+    headers = fasih_headers(cookie_dict)
+    session = FasihClient(headers, cookie_dict)
 
     return headers, cookie_dict, session, password
 
@@ -180,364 +147,155 @@ def ambil_semua_sls_smallcode_dari_kabupaten(
     headers,
     cookies,
     region_level1,
-    region_level2
+    region_level2,
+    max_workers=DEFAULT_WORKERS,
+    cache=None,
+    force=False,
+    engine="thread",
 ):
     st.write("### 🌍 Mengambil semua wilayah dari kabupaten...")
     st.caption(
-        "Proses ini akan menelusuri kecamatan, desa, SLS, dan sub-SLS sesuai level region yang tersedia."
+        "Proses ini akan menelusuri kecamatan, desa, SLS, dan sub-SLS sesuai level region yang tersedia "
+        f"(paralel, {max_workers} worker)."
     )
 
     progress_bar = st.progress(0.0)
     status_text = st.empty()
 
     if not isinstance(level_region, list) or len(level_region) < 3:
-        if len(level_region) == 2:
+        if isinstance(level_region, list) and len(level_region) == 2:
             st.warning("❌ Region level hanya sampai Kabupaten.")
             return pd.DataFrame([region_level2])
-        elif len(level_region) == 1:
+        elif isinstance(level_region, list) and len(level_region) == 1:
             st.warning("❌ Region level hanya sampai Provinsi.")
             return pd.DataFrame([region_level1])
         else:
             st.error("❌ Struktur region tidak valid.")
             return pd.DataFrame()
 
-    result = []
-    # Ambil semua kecamatan
+    def on_progress(level_name, done, total):
+        progress_bar.progress(done / total if total else 1.0)
+        status_text.text(f"📍 {level_name}: {done}/{total}")
+
+    def on_error(level_name, parent_name, e):
+        st.warning(f"❌ Gagal mengambil {level_name} dari {parent_name}: {e}")
+
     try:
-        url_kecamatan = (
-            f"https://fasih-sm.bps.go.id/region/api/v1/region/level3"
-            f"?groupId={region_group_id}&level2Id={kabupaten_id}"
+        df_result, info = load_wilayah(
+            kabupaten_id, level_region, region_group_id, headers, cookies,
+            cache=cache, force=force,
+            max_workers=max_workers, on_progress=on_progress, on_error=on_error, engine=engine,
         )
-        resp_kec = requests.get(url_kecamatan, headers=headers, cookies=cookies)
-        resp_kec.raise_for_status()
-        daftar_kecamatan = resp_kec.json().get("data", []) or []
     except Exception as e:
         st.error(f"❌ Gagal mengambil data kecamatan: {e}")
         return pd.DataFrame()
 
-    total_kecamatan = len(daftar_kecamatan)
-    if total_kecamatan == 0:
-        st.warning("⚠️ Tidak ditemukan kecamatan untuk kabupaten ini.")
-        return pd.DataFrame()
-
-    processed_kec = 0
-
-    for kec in daftar_kecamatan:
-        processed_kec += 1
-        pct = processed_kec / total_kecamatan
-        # progress expects number 0..1 or 0..100 — st.progress accepts float 0..1 as well
-        try:
-            progress_bar.progress(pct)
-        except Exception:
-            # fallback to percentage int
-            progress_bar.progress(int(pct * 100))
-
-        status_text.text(f"📍 Kecamatan {processed_kec}/{total_kecamatan}: {kec.get('name')}")
-
-        kecamatan_id = kec.get("id")
-        kecamatan_name = kec.get("name")
-        kecamatan_kode = kec.get("fullCode")
-
-        # Jika level hanya sampai kecamatan
-        if len(level_region) == 3:
-            result.append({
-                f"{level_region[2]['name']}_id": kecamatan_id,
-                f"{level_region[2]['name']}": kecamatan_name,
-                "smallcode": kecamatan_kode,
-            })
-            continue
-
-        # Ambil desa
-        try:
-            url_desa = (
-                f"https://fasih-sm.bps.go.id/region/api/v1/region/level4"
-                f"?groupId={region_group_id}&level3Id={kecamatan_id}"
-            )
-            resp_desa = requests.get(url_desa, headers=headers, cookies=cookies)
-            resp_desa.raise_for_status()
-            daftar_desa = resp_desa.json().get("data", []) or []
-        except Exception as e:
-            st.warning(f"❌ Gagal mengambil desa dari {kecamatan_name}: {e}")
-            continue
-
-        for desa in daftar_desa:
-            desa_id = desa.get("id")
-            desa_name = desa.get("name")
-            desa_kode = desa.get("fullCode")
-
-            if len(level_region) == 4:
-                result.append({
-                    f"{level_region[2]['name']}_id": kecamatan_id,
-                    f"{level_region[2]['name']}": kecamatan_name,
-                    f"{level_region[3]['name']}_id": desa_id,
-                    f"{level_region[3]['name']}": desa_name,
-                    "smallcode": desa_kode,
-                })
-                continue
-
-            # Ambil SLS
-            try:
-                url_sls = (
-                    f"https://fasih-sm.bps.go.id/region/api/v1/region/level5"
-                    f"?groupId={region_group_id}&level4Id={desa_id}"
-                )
-                resp_sls = requests.get(url_sls, headers=headers, cookies=cookies)
-                resp_sls.raise_for_status()
-                daftar_sls = resp_sls.json().get("data", []) or []
-            except Exception as e:
-                st.warning(f"❌ Gagal mengambil SLS dari {desa_name}: {e}")
-                continue
-
-            for sls in daftar_sls:
-                sls_id = sls.get("id")
-                sls_name = sls.get("name")
-                sls_kode = sls.get("fullCode")
-
-                if len(level_region) == 5:
-                    result.append({
-                        f"{level_region[2]['name']}_id": kecamatan_id,
-                        f"{level_region[2]['name']}": kecamatan_name,
-                        f"{level_region[3]['name']}_id": desa_id,
-                        f"{level_region[3]['name']}": desa_name,
-                        f"{level_region[4]['name']}_id": sls_id,
-                        f"{level_region[4]['name']}": sls_name,
-                        "smallcode": sls_kode,
-                    })
-                    continue
-
-                # Ambil SUB SLS
-                try:
-                    url_subsls = (
-                        f"https://fasih-sm.bps.go.id/region/api/v1/region/level6"
-                        f"?groupId={region_group_id}&level5Id={sls_id}"
-                    )
-                    resp_subsls = requests.get(url_subsls, headers=headers, cookies=cookies)
-                    resp_subsls.raise_for_status()
-                    daftar_subsls = resp_subsls.json().get("data", []) or []
-                except Exception as e:
-                    st.warning(f"❌ Gagal mengambil SubSLS dari {sls_name}: {e}")
-                    continue
-
-                for subsls in daftar_subsls:
-                    subsls_id = subsls.get("id")
-                    subsls_name = subsls.get("name")
-                    subsls_kode = subsls.get("fullCode")
-
-                    result.append({
-                        f"{level_region[2]['name']}_id": kecamatan_id,
-                        f"{level_region[2]['name']}": kecamatan_name,
-                        f"{level_region[3]['name']}_id": desa_id,
-                        f"{level_region[3]['name']}": desa_name,
-                        f"{level_region[4]['name']}_id": sls_id,
-                        f"{level_region[4]['name']}": sls_name,
-                        f"{level_region[5]['name']}_id": subsls_id,
-                        f"{level_region[5]['name']}": subsls_name,
-                        "smallcode": subsls_kode,
-                    })
-
-        time.sleep(0.2)
-
     progress_bar.progress(1.0)
-    status_text.text("✅ Selesai mengambil seluruh wilayah.")
+    fetched_at = datetime.fromtimestamp(info["fetched_at"]).strftime("%Y-%m-%d %H:%M")
+    if info["source"] == "cache":
+        status_text.text(f"✅ Daftar wilayah diambil dari cache lokal (diperbarui {fetched_at}).")
+    else:
+        status_text.text(
+            f"✅ Selesai mengambil seluruh wilayah — {info['fetched']} daftar diambil dari API "
+            f"({info['changed']} berubah), {info['reused']} dipakai ulang dari cache"
+            + (" (melanjutkan crawl sebelumnya)." if info["resumed"] else ".")
+        )
+        if info["failed"]:
+            st.warning(
+                f"⚠️ {info['failed']} daftar wilayah gagal diambil, hasil belum lengkap. "
+                "Progres sudah disimpan — klik ambil lagi untuk melanjutkan dari checkpoint."
+            )
 
-    df_result = pd.DataFrame(result)
     if df_result.empty:
         st.warning("⚠️ Tidak ada data wilayah yang berhasil diambil.")
 
+    st.session_state.wilayah_store = info.get("store")
     return df_result
 
-# ---------------- Streamlit wrappers for actions ----------------
-def streamlit_get_all_survey_answers(id_survey, template_id, nama_kab, nama_survey, daftarwilayah_df, headers, cookies, sess, survey_period_id, save_folder):
-    """Ambil jawaban assignment berdasarkan daftarwilayah_df['smallcode'] dan survey_period_id.
-       Simpan 2 file: raw answers & assignment list. Kembalikan file paths."""
-    if daftarwilayah_df is None or 'smallcode' not in daftarwilayah_df.columns:
-        st.error("Daftar wilayah kosong atau tidak mengandung kolom 'smallcode'.")
-        return None, None
-
-    st.write("Jumlah wilayah:", len(daftarwilayah_df))
-    st.dataframe(daftarwilayah_df.head())
-    # prepare filenames
-    
-    # Buat subfolder otomatis di dalam OUTPUT/nama_survey
-    output_dir = os.path.join(save_folder, "output", nama_survey)
-    os.makedirs(output_dir, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename_answers = f"Raw_Data_{nama_kab}_{nama_survey}_{timestamp}.xlsx"
-    filename_assign = f"Assignment_{nama_kab}_{nama_survey}_{timestamp}.xlsx"
-    path_answers = os.path.join(output_dir, filename_answers)
-    path_assign = os.path.join(output_dir, filename_assign)
-
-    results_answers = []
-    results_assign = []
-    total = len(daftarwilayah_df['smallcode'])
-    p = st.progress(0)
-    count = 0
-
-    start_time = time.time()
-    for smallCode in daftarwilayah_df['smallcode']:
-        try:
-            url = f'https://fasih-sm.bps.go.id/assignment-general/api/assignments/get-principal-values-by-smallest-code/{survey_period_id}/{smallCode}'
-            resp = sess.get(url, headers=headers)
-            # st.write(f"Memeriksa smallCode: {smallCode}")
-            # st.write(f"URL: {url}")
-            # st.write(f"Status: {resp.status_code}")
-            # st.write(f"Response text: {resp.text[:500]}")   
-
-            if resp.status_code != 200 or not resp.text.strip():
-                # skip
-                count += 1
-                p.progress(int(count/total*100))
-                continue
-
-            data = resp.json().get('data', [])
-            if not data:
-                count += 1
-                p.progress(int(count/total*100))
-                continue
-
-            # save assignment raw objects
-            results_assign.extend(data)
-
-            # for each assignment get detail
-            for d in data:
-                assignment_id = d.get('assignmentId')
-                url_detail = f'https://fasih-sm.bps.go.id/assignment-general/api/assignment/get-by-id-with-data-for-scm?id={assignment_id}'
-                resp_detail = sess.get(url_detail, headers=headers)
-                if resp_detail.status_code != 200:
-                    continue
-                try:
-                    detail_json = resp_detail.json()
-                    # some responses have JSON string inside "data"
-                    inner_str = detail_json.get("data", {}).get("data") if isinstance(detail_json.get("data"), dict) else detail_json.get("data")
-                    if isinstance(inner_str, str):
-                        import json as _json
-                        inner_json = _json.loads(inner_str)
-                    else:
-                        inner_json = detail_json.get("data", {})
-                    answers = inner_json.get("answers", [])
-                    # build a flat dict of answers
-                    flat = {}
-                    for a in answers:
-                        k = a.get("dataKey")
-                        v = a.get("value") if "value" in a else a.get("dataValue")
-                        flat[k] = v
-                    flat['assignment_id'] = assignment_id
-                    flat['smallCode'] = smallCode
-                    results_answers.append(flat)
-                except Exception:
-                    continue
-
-        except Exception as e:
-            st.warning(f"Error smallCode {smallCode}: {e}")
-        count += 1
-        p.progress(int(count/total*100))
-
-    # save
-    if results_answers:
-        df_ans = pd.DataFrame(results_answers).fillna('')
-        os.makedirs(save_folder, exist_ok=True)
-        df_ans.to_excel(path_answers, index=False)
-    else:
-        df_ans = pd.DataFrame()
 
-    if results_assign:
-        df_assign = pd.DataFrame(results_assign).fillna('')
-        os.makedirs(save_folder, exist_ok=True)
-        df_assign.to_excel(path_assign, index=False)
+def pilih_subset_wilayah(daftarwilayah_df, store=None):
+    """
+    UI untuk membatasi aksi ke sebagian wilayah. Bila daftar wilayah berasal dari
+    cache (RegionStore), subset diambil lewat indeks prefix smallcode tanpa memuat
+    ulang seluruh file; untuk file unggahan dipakai filter prefix biasa.
+    """
+    if daftarwilayah_df is None or daftarwilayah_df.empty:
+        return daftarwilayah_df
+
+    if store is None or not store.exists() or not store.levels():
+        teks = st.text_input("Batasi ke prefix smallcode (opsional, pisahkan dengan koma):", value="")
+        prefixes = tuple(x.strip() for x in teks.split(",") if x.strip())
+        if not prefixes:
+            return daftarwilayah_df
+        subset = daftarwilayah_df[daftarwilayah_df["smallcode"].astype(str).str.startswith(prefixes)]
     else:
-        df_assign = pd.DataFrame()
+        level = st.selectbox("Batasi wilayah per level:", ["(semua wilayah)"] + store.levels())
+        if level == "(semua wilayah)":
+            return daftarwilayah_df
+        nodes = store.nodes(level)
+        pilihan = st.multiselect(f"Pilih {level}:", list(nodes), format_func=lambda k: f"{nodes[k][0]} ({nodes[k][1]})")
+        if not pilihan:
+            return daftarwilayah_df
+        subset = store.select([nodes[k][1] for k in pilihan])
+
+    st.caption(f"📌 {len(subset)} dari {len(daftarwilayah_df)} wilayah terpilih.")
+    return subset
 
-    elapsed = time.time() - start_time
-    st.success(f"Selesai ambil data — waktu: {int(elapsed//60)} menit {int(elapsed%60)} detik.")
-    return (path_answers if not df_ans.empty else None, path_assign if not df_assign.empty else None)
+# ---------------- Streamlit wrappers for actions ----------------
+def streamlit_get_all_survey_answers(id_survey, template_id, nama_kab, nama_survey, daftarwilayah_df, headers, cookies, sess, survey_period_id, save_folder, max_workers=DEFAULT_FETCH_WORKERS, engine="thread", incremental=False, excel=True, chunk_rows=DEFAULT_CHUNK_ROWS, resume=True, detail_cache=True, pool=None, ui=st):
+    """Ambil Raw Data (lihat fasih_runs.raw_export); `ui` = `st` inline atau JobUI di job latar."""
+    return raw_export(
+        id_survey, template_id, nama_kab, nama_survey, daftarwilayah_df, headers, cookies, sess,
+        survey_period_id, save_folder, ui=ui, max_workers=max_workers, engine=engine,
+        incremental=incremental, excel=excel, chunk_rows=chunk_rows, resume=resume,
+        detail_cache=detail_cache, pool=pool,
+    )
 
 
-def streamlit_approve_by_pml(id_survey, template_id, nama_kab, nama_survey, daftarwilayah_df, headers, cookies, sess, survey_period_id, save_folder, driver):
-    """
-    Sederhana: ambil assignments per smallcode, masuk ke review page via driver (yang sudah login),
-    klik approve jika kondisi terpenuhi. Karena proses ini bergantung pada driver/element, UI hanya
-    akan menjalankan dan menyimpan log excel hasil attempt.
-    """
-    if daftarwilayah_df is None or 'smallcode' not in daftarwilayah_df.columns:
-        st.error("Daftar wilayah kosong atau tidak mengandung kolom 'smallcode'.")
-        return None
+def streamlit_approve_by_pml(id_survey, template_id, nama_kab, nama_survey, daftarwilayah_df, headers, cookies, sess, survey_period_id, save_folder, driver, ui=st, role="PML", approve_url=APPROVE_URL, plan_only=False):
+    """Rencana (cek status per role) lalu approve lewat API (bila `approve_url`) atau driver yang sudah login (lihat fasih_runs.approve_assignments)."""
+    return approve_assignments(
+        id_survey, template_id, nama_kab, nama_survey, daftarwilayah_df, headers, cookies, sess,
+        survey_period_id, save_folder, driver, ui=ui, role=role, approve_url=approve_url, plan_only=plan_only,
+    )
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename_log = f"Log_Approve_{nama_kab}_{nama_survey}_{timestamp}.xlsx"
-    path_log = os.path.join(save_folder, filename_log)
 
-    log_rows = []
-    total = len(daftarwilayah_df['smallcode'])
-    p = st.progress(0)
-    count = 0
-    start_time = time.time()
+# =============== JOB LATAR ===============
 
-    for smallCode in daftarwilayah_df['smallcode']:
-        try:
-            url = f'https://fasih-sm.bps.go.id/assignment-general/api/assignments/get-principal-values-by-smallest-code/{survey_period_id}/{smallCode}'
-            resp = sess.get(url, headers=headers)
-            if resp.status_code != 200 or not resp.text.strip():
-                count += 1
-                p.progress(int(count/total*100))
-                continue
-            data = resp.json().get('data', [])
-            if not data:
-                count += 1
-                p.progress(int(count/total*100))
-                continue
-
-            for d in data:
-                assignment_id = d.get('assignmentId')
-                review_url = f'https://fasih-sm.bps.go.id/survey-collection/survey-review/{assignment_id}/{template_id}/{survey_period_id}/a/1'
-                status_assignment = ''  # could be derived via history endpoint if needed
-                approved = False
-                keterangan = ""
+@st.cache_resource
+def job_runner():
+    """Satu JobRunner per server: job tetap jalan walau halaman di-rerun / ditutup."""
+    return JobRunner(max_jobs=int(os.environ.get("FASIH_MAX_JOBS", DEFAULT_MAX_JOBS)))
 
-                try:
-                    # open review page in driver and attempt clicking approve
-                    driver.get(review_url)
-                    time.sleep(1)
-                    # waiting / element handling is fragile — adjust if page structure different
-                    # Try to click button with id 'buttonApprove'
-                    try:
-                        btn = driver.find_element(By.ID, "buttonApprove")
-                        btn.click()
-                        time.sleep(0.5)
-                        # click confirm if appears
-                        try:
-                            confirm = driver.find_element(By.XPATH, '//*[@id="fasih"]/div/div/div[6]/button[1]')
-                            confirm.click()
-                        except Exception:
-                            pass
-                        approved = True
-                        keterangan = "Approved"
-                    except Exception as ebtn:
-                        keterangan = f"Button not clickable / not found: {ebtn}"
-                except Exception as e:
-                    keterangan = f"Error opening review: {e}"
-
-                log_rows.append({
-                    "assignment_id": assignment_id,
-                    "smallCode": smallCode,
-                    "review_url": review_url,
-                    "approved": approved,
-                    "keterangan": keterangan
-                })
-        except Exception as e:
-            st.warning(f"Error smallCode {smallCode}: {e}")
-        count += 1
-        p.progress(int(count/total*100))
-
-    # save log
-    df_log = pd.DataFrame(log_rows)
-    os.makedirs(save_folder, exist_ok=True)
-    df_log.to_excel(path_log, index=False)
-    elapsed = time.time() - start_time
-    st.success(f"Selesai approve attempt — waktu: {int(elapsed//60)} menit {int(elapsed%60)} detik.")
-    return path_log
+
+def baca_file(path):
+    with open(path, "rb") as fh:
+        return fh.read()
 
 
+@st.fragment(run_every=2)
+def panel_job():
+    runner = job_runner()
+    jobs = runner.jobs()
+    if not jobs:
+        return
+    st.subheader(f"🧵 Job latar ({len(runner.active())} aktif, maks {runner.max_jobs} bersamaan)")
+    for job in jobs:
+        menit, detik = divmod(int(job.elapsed), 60)
+        with st.expander(f"[{job.status}] {job.title} — {menit}m {detik}s", expanded=job.status == "running"):
+            st.progress(job.progress, text=job.text or None)
+            if job.log:
+                st.code("\n".join(job.log[-10:]), language=None)
+            if job.error:
+                st.error(job.error)
+            for path in job.outputs:
+                st.download_button(f"⬇️ {os.path.basename(path)}", partial(baca_file, path),
+                                   file_name=os.path.basename(path), key=f"dl_{job.id}_{path}")
+            if job.status in ("queued", "running") and st.button("⏹️ Batalkan", key=f"batal_{job.id}"):
+                runner.cancel(job.id)
+    if st.button("🧹 Bersihkan job yang sudah selesai"):
+        runner.forget_finished()
+
 
 # =============== STREAMLIT UI ===============
 
@@ -559,6 +317,10 @@ if "username" not in st.session_state:
     st.session_state.username = None
 if "session" not in st.session_state:
     st.session_state.session = None
+if "daftarwilayah" not in st.session_state:
+    st.session_state.daftarwilayah = None
+if "wilayah_store" not in st.session_state:
+    st.session_state.wilayah_store = None
 
 # Session state
 if "otp_needed" not in st.session_state:
@@ -605,30 +367,31 @@ with st.expander("🔐 Login ke FASIH", expanded=not st.session_state.get("login
 
         driver = setup_driver()
         st.session_state["driver"] = driver
+        steps = StepTimer(LEGACY_SLEEP)
+        st.session_state["login_steps"] = steps
 
         if session:
             st.write(f"🔄 Menggunakan session tersimpan untuk {username}...")
-            apply_cookies_to_driver(driver, session.cookies.get_dict(), "sso.bps.go.id")
-            apply_cookies_to_driver(driver, session.cookies.get_dict(), "fasih-sm.bps.go.id")
+            apply_cookies_to_driver(driver, session.cookies.get_dict(), "sso.bps.go.id", steps)
+            apply_cookies_to_driver(driver, session.cookies.get_dict(), "fasih-sm.bps.go.id", steps)
 
             driver.get("https://fasih-sm.bps.go.id/survey-collection/survey")
             st.write("⏳ Mengecek validitas session...")
-            max_wait = 15
-            start_time = time.time()
-            valid = False
-            while time.time() - start_time < max_wait:
-                url_now = driver.current_url
-                if "survey" in url_now or "collection" in url_now:
-                    valid = True
-                    break
-                time.sleep(1)
+            try:
+                # session habis → dialihkan ke SSO, URL tidak pernah kembali ke host FASIH
+                with timed(steps, "cek session"):
+                    wait_url(driver, lambda u: u.startswith("https://fasih-sm.bps.go.id")
+                             and ("survey" in u or "collection" in u), timeout=15)
+                valid = True
+            except TimeoutException:
+                valid = False
 
             if valid:
                 st.success("✅ Session masih valid! Browser akan tetap terbuka.")
                 st.session_state.login_success = True
             else:
                 st.warning("⚠️ Session tidak valid / reload lama. Login ulang diperlukan.")
-                headers, cookies, session, password = main_login(driver, username, password)
+                headers, cookies, session, password = main_login(driver, username, password, steps)
                 simpan_session(session_folder, username, headers, cookies, session, password)
                 st.success("✅ Session baru berhasil disimpan.")
                 st.session_state.login_success = True
@@ -641,7 +404,7 @@ with st.expander("🔐 Login ke FASIH", expanded=not st.session_state.get("login
 
         else:
             st.warning("🔐 Tidak ada session tersimpan. Login manual diperlukan.")
-            headers, cookies, session, password = main_login(driver, username, password)
+            headers, cookies, session, password = main_login(driver, username, password, steps)
             simpan_session(session_folder, username, headers, cookies, session, password)
             st.success("✅ Login berhasil dan session tersimpan.")
             st.session_state.login_success = True
@@ -654,6 +417,11 @@ with st.expander("🔐 Login ke FASIH", expanded=not st.session_state.get("login
         # Setelah login selesai, langsung rerun agar expander tertutup
         st.rerun()
 
+    steps = st.session_state.get("login_steps")
+    if steps is not None and steps.samples:
+        st.caption(f"⏱️ Login: {steps.text()}")
+        st.dataframe(steps.frame())
+
 
     # ✅ Tambahkan tombol manual untuk menutup browser
     if "driver" in st.session_state and st.session_state["driver"] is not None:
@@ -680,12 +448,7 @@ if st.session_state.get("login_success", False):
 
     # --- Ambil daftar survei
     try:
-        url_survey = "https://fasih-sm.bps.go.id/survey/api/v1/surveys/datatable?surveyType=Pencacahan"
-        payload = {"pageNumber": 0, "pageSize": 100, "sortBy": "CREATED_AT", "sortDirection": "DESC", "keywordSearch": ""}
-        resp = req_session.post(url_survey, json=payload)
-        resp.raise_for_status()
-        data = resp.json()
-        surveys = data.get('data', {}).get('content', [])
+        surveys = req_session.surveys()
     except Exception as e:
         st.error(f"Gagal ambil daftar survei: {e}")
         surveys = []
@@ -700,14 +463,12 @@ if st.session_state.get("login_success", False):
 
             # fetch survey metadata
             try:
-                url_group = f"https://fasih-sm.bps.go.id/survey/api/v1/surveys/{id_survey}"
-                rg = req_session.get(url_group, headers=headers).json()
-                group_id = rg['data'].get('regionGroupId')
+                meta = req_session.survey(id_survey)
+                group_id = meta.get('regionGroupId')
                 template_id = None
-                if rg['data'].get('surveyTemplates'):
-                    template_id = rg['data']['surveyTemplates'][-1].get('templateId')
-                url_level_region = f'https://fasih-sm.bps.go.id/region/api/v1/region-metadata?id={group_id}'
-                level_region = req_session.get(url_level_region, headers=headers).json().get('data', {}).get('level', [])
+                if meta.get('surveyTemplates'):
+                    template_id = meta['surveyTemplates'][-1].get('templateId')
+                level_region = req_session.region_metadata(group_id)
             except Exception as e:
                 st.error(f"Gagal ambil metadata survei: {e}")
                 group_id = None
@@ -718,9 +479,7 @@ if st.session_state.get("login_success", False):
             # st.header("2. Pilih Provinsi")
             provinces = []
             try:
-                url_prov = f"https://fasih-sm.bps.go.id/region/api/v1/region/level1?groupId={group_id}"
-                data_prov = req_session.get(url_prov, headers=headers).json()
-                provinces = data_prov.get('data', [])
+                provinces = req_session.provinces(group_id)
             except Exception as e:
                 st.error(f"Gagal ambil daftar provinsi: {e}")
 
@@ -737,9 +496,7 @@ if st.session_state.get("login_success", False):
                     # Step C: kabupaten
                     # st.header("3. Pilih Kabupaten / Kota")
                     try:
-                        url_kab = f"https://fasih-sm.bps.go.id/region/api/v1/region/level2?groupId={group_id}&level1FullCode={fullcode_prov}"
-                        data_kab = req_session.get(url_kab, headers=headers).json()
-                        kab_list = data_kab.get('data', [])
+                        kab_list = req_session.kabupaten(group_id, fullcode_prov)
                     except Exception as e:
                         st.error(f"Gagal ambil daftar kabupaten: {e}")
                         kab_list = []
@@ -759,16 +516,10 @@ if st.session_state.get("login_success", False):
                             # Period selection (try endpoint; otherwise manual)
                             periods = []
                             try:
-                                url_period = f'https://fasih-sm.bps.go.id/survey/api/v1/surveys/{id_survey}'
-                                rp = req_session.get(url_period, headers=headers)
-                                if rp.ok:
-                                    pdatas = rp.json()['data']['surveyPeriods']
-                                    # buat mapping label -> id agar bisa ditampilkan dengan nama tapi ambil id
-                                    period_options = {f"{p['name']} (Start: {p['startDate']} - End: {p['endDate']})": p['id'] for p in pdatas}
-                                    labels = list(period_options.keys())
-                                else:
-                                    period_options = {}
-                                    labels = []
+                                pdatas = req_session.survey(id_survey)['surveyPeriods']
+                                # buat mapping label -> id agar bisa ditampilkan dengan nama tapi ambil id
+                                period_options = {f"{p['name']} (Start: {p['startDate']} - End: {p['endDate']})": p['id'] for p in pdatas}
+                                labels = list(period_options.keys())
                             except Exception:
                                 period_options = {}
                                 labels = []
@@ -785,8 +536,7 @@ if st.session_state.get("login_success", False):
                             daftarwilayah_df = None
 
                             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            wilayah_dir = os.path.join(os.getcwd(), "Daftar Wilayah", nama_survey)
-                            os.makedirs(wilayah_dir, exist_ok=True)
+                            mesin_http = ENGINES[st.selectbox("Mesin HTTP", list(ENGINES))]
 
                             if uploaded_file is not None:
                                 try:
@@ -798,13 +548,24 @@ if st.session_state.get("login_success", False):
                                     st.error(f"Gagal baca file: {e}")
 
                             if daftarwilayah_df is None:
+                                jumlah_worker_wilayah = st.number_input(
+                                    "Jumlah worker paralel (ambil wilayah)", min_value=1, max_value=64, value=DEFAULT_WORKERS
+                                )
+                                ttl_wilayah_jam = st.number_input(
+                                    "Umur cache daftar wilayah (jam)", min_value=0.0, value=DEFAULT_TTL / 3600
+                                )
+                                paksa_ambil_ulang = st.checkbox("🔄 Abaikan cache, ambil ulang dari API", value=False)
                                 if st.button("🌐 Ambil daftar wilayah dari API"):
                                     with st.spinner("Mengambil daftar wilayah dari server..."):
                                         region_level1 = {'id': id_prov, 'fullCode': fullcode_prov, 'code': code_prov, 'name': name_prov, 'smallcode': fullcode_prov}
                                         region_level2 = {'id': id_kab, 'fullCode': fullcode_kab, 'code': code_kab, 'name': nama_kab, 'smallcode': fullcode_kab}
                                         df_wil = ambil_semua_sls_smallcode_dari_kabupaten(
                                             id_kab, level_region, group_id, headers, cookies,
-                                            region_level1=region_level1, region_level2=region_level2
+                                            region_level1=region_level1, region_level2=region_level2,
+                                            max_workers=int(jumlah_worker_wilayah),
+                                            cache=RegionCache(ttl=ttl_wilayah_jam * 3600),
+                                            force=paksa_ambil_ulang,
+                                            engine=mesin_http,
                                         )
 
                                         if df_wil is not None and not df_wil.empty:
@@ -812,22 +573,56 @@ if st.session_state.get("login_success", False):
                                             st.success("📥 Daftar wilayah berhasil diambil.")
                                             st.dataframe(df_wil.head(20))
 
-                                            # Simpan hasil API ke folder Daftar Wilayah/<nama_survey>/
-                                            save_path = os.path.join(wilayah_dir, f"daftar_wilayah_api_{nama_kab}_{timestamp}.xlsx")
-                                            df_wil.to_excel(save_path, index=False)
-                                            st.info(f"💾 File daftar wilayah tersimpan di: `{save_path}`")
+                                            # Hasil sudah tersimpan di cache lokal (cached_data/wilayah/<regionGroupId>);
+                                            # file Excel hanya dibuat bila diunduh.
+                                            buf_wil = io.BytesIO()
+                                            df_wil.to_excel(buf_wil, index=False)
+                                            st.download_button(
+                                                "⬇️ Download daftar wilayah (Excel)", buf_wil.getvalue(),
+                                                file_name=f"daftar_wilayah_api_{nama_kab}_{timestamp}.xlsx",
+                                            )
 
                                         else:
                                             st.warning("Gagal ambil daftar wilayah atau hasil kosong.")
 
                             else:
                                 st.session_state.daftarwilayah = daftarwilayah_df
+                                st.session_state.wilayah_store = None
 
 
                             # ACTIONS (placeholder untuk langkah selanjutnya)
                             # st.header("5. Pilih Aksi Lanjutan")
+                            wilayah_aksi = pilih_subset_wilayah(st.session_state.daftarwilayah, st.session_state.wilayah_store)
                             aksi = st.selectbox("Aksi:", ["-- pilih aksi --", "Ambil Raw Data", "Approve Assignment"])
                             save_folder = st.text_input("Folder untuk menyimpan hasil (local)", value=os.getcwd())
+                            jumlah_worker_aksi = st.number_input(
+                                "Jumlah worker paralel (ambil raw data)", min_value=1, max_value=64, value=DEFAULT_FETCH_WORKERS
+                            )
+                            sinkron_inkremental = st.checkbox(
+                                "🔁 Sinkron inkremental (ambil detail hanya assignment baru/berubah)", value=True
+                            )
+                            lanjutkan_run = st.checkbox("⏯️ Lanjutkan run sebelumnya yang terputus (bila ada)", value=True)
+                            buat_excel = st.checkbox("📝 Buat file Excel di akhir (data tetap tersimpan per part)", value=True)
+                            multi_akun = st.checkbox(
+                                f"👥 Bagi kerja ke semua session tersimpan di '{session_folder}' (multi-akun, worker per akun)", value=False
+                            )
+                            pakai_cache_detail = st.checkbox("🗄️ Pakai cache detail assignment di disk (lewati unduh ulang yang tidak berubah)", value=True)
+                            di_latar = st.checkbox("🧵 Jalankan sebagai job latar (tetap jalan walau halaman di-refresh)", value=False)
+                            if aksi == "Approve Assignment":
+                                role_approve = st.selectbox("Role approve", list(ROLE_APPROVE_FROM), index=1)
+                                hanya_rencana = st.checkbox(
+                                    "📋 Hanya susun rencana (cek status per smallcode, belum approve)", value=False,
+                                    help="Listing & riwayat status diambil paralel; hasilnya Excel rencana tanpa membuka browser.",
+                                )
+                                approve_api = st.checkbox(
+                                    "⚡ Approve lewat API tanpa browser (browser hanya cadangan)", value=bool(APPROVE_URL),
+                                    disabled=not APPROVE_URL, help="Atur env FASIH_APPROVE_URL untuk mengaktifkan.",
+                                )
+                                jumlah_browser = st.number_input(
+                                    "Jumlah browser paralel (approve lewat halaman review)", min_value=1,
+                                    max_value=suggested_pool_size(), value=1,
+                                    help="Browser tambahan dibuka headless dengan cookie login yang sama; batas atas dari CPU & RAM mesin ini.",
+                                )
 
                             if st.button("Jalankan Aksi"):
                                 if aksi == "-- pilih aksi --":
@@ -836,7 +631,7 @@ if st.session_state.get("login_success", False):
                                     if st.session_state.session is None:
                                         st.error("Requests session tidak tersedia.")
                                     else:
-                                        if st.session_state.daftarwilayah is None or st.session_state.daftarwilayah.empty:
+                                        if wilayah_aksi is None or wilayah_aksi.empty:
                                             st.warning("Daftar wilayah kosong. Unggah file atau ambil dari API dahulu.")
                                         else:
                                             # ensure survey_period_id given (string or numeric)
@@ -844,19 +639,43 @@ if st.session_state.get("login_success", False):
                                                 st.warning("Isi atau pilih survey period ID terlebih dahulu.")
                                             else:
                                                 if aksi == "Ambil Raw Data":
-                                                    with st.spinner("Mengambil raw data..."):
-                                                        path_answers, path_assign = streamlit_get_all_survey_answers(
-                                                            id_survey=id_survey,
-                                                            template_id=template_id,
-                                                            nama_kab=fullcode_kab,
-                                                            nama_survey=nama_survey,
-                                                            daftarwilayah_df=st.session_state.daftarwilayah,
-                                                            headers=st.session_state.headers,
-                                                            cookies=st.session_state.cookies,
-                                                            sess=st.session_state.session,
-                                                            survey_period_id=survey_period_id,
-                                                            save_folder=save_folder
-                                                        )
+                                                    pool = None
+                                                    if multi_akun:
+                                                        with st.spinner("Memuat & mengecek session tersimpan..."):
+                                                            pool = SessionPool.from_folder(session_folder, max_per_account=int(jumlah_worker_aksi))
+                                                        for name, why in pool.rejected:
+                                                            st.warning(f"Session {name} dilewati: {why}")
+                                                        if not pool.accounts:
+                                                            st.warning("Tidak ada session valid; memakai session login saat ini.")
+                                                            pool = None
+                                                        else:
+                                                            st.info(f"👥 Memakai {len(pool.accounts)} akun: {', '.join(a.name for a in pool.accounts)}")
+                                                    kwargs_raw = dict(
+                                                        id_survey=id_survey,
+                                                        template_id=template_id,
+                                                        nama_kab=fullcode_kab,
+                                                        nama_survey=nama_survey,
+                                                        daftarwilayah_df=wilayah_aksi,
+                                                        headers=st.session_state.headers,
+                                                        cookies=st.session_state.cookies,
+                                                        sess=st.session_state.session,
+                                                        survey_period_id=survey_period_id,
+                                                        save_folder=save_folder,
+                                                        max_workers=int(jumlah_worker_aksi),
+                                                        engine=mesin_http,
+                                                        incremental=sinkron_inkremental,
+                                                        excel=buat_excel,
+                                                        resume=lanjutkan_run,
+                                                        detail_cache=pakai_cache_detail,
+                                                        pool=pool,
+                                                    )
+                                                    if di_latar:
+                                                        job = job_runner().submit("raw", f"Ambil raw data {nama_survey} — {nama_kab}",
+                                                                                  streamlit_get_all_survey_answers, **kwargs_raw)
+                                                        st.success(f"🧵 Job {job.id} diantrekan; pantau di panel job di bawah.")
+                                                    else:
+                                                        with st.spinner("Mengambil raw data..."):
+                                                            path_answers, path_assign = streamlit_get_all_survey_answers(**kwargs_raw)
                                                         if path_answers:
                                                             with open(path_answers, "rb") as fh:
                                                                 st.download_button("Download Raw Data Excel", fh.read(), file_name=os.path.basename(path_answers))
@@ -864,23 +683,44 @@ if st.session_state.get("login_success", False):
                                                             with open(path_assign, "rb") as fh:
                                                                 st.download_button("Download Assignment Excel", fh.read(), file_name=os.path.basename(path_assign))
                                                 elif aksi == "Approve Assignment":
-                                                    if st.session_state.driver is None:
+                                                    if st.session_state.driver is None and not approve_api and jumlah_browser <= 1 and not hanya_rencana and not di_latar:
                                                         st.warning("Driver tidak tersedia — buka browser / login dulu.")
                                                     else:
-                                                        with st.spinner("Menjalankan auto-approve (berbasis driver)..."):
-                                                            logpath = streamlit_approve_by_pml(
-                                                                id_survey=id_survey,
-                                                                template_id=template_id,
-                                                                nama_kab=nama_kab,
-                                                                nama_survey=nama_survey,
-                                                                daftarwilayah_df=st.session_state.daftarwilayah,
-                                                                headers=st.session_state.headers,
-                                                                cookies=st.session_state.cookies,
-                                                                sess=st.session_state.session,
-                                                                survey_period_id=survey_period_id,
-                                                                save_folder=save_folder,
-                                                                driver=st.session_state.driver
-                                                            )
+                                                        if hanya_rencana:
+                                                            driver_approve = None
+                                                        elif di_latar:
+                                                            # job latar punya Chrome headless sendiri dari cookie session (seperti CLI),
+                                                            # browser login halaman ini tidak dipinjam
+                                                            driver_approve = DriverPool(partial(open_driver, st.session_state.session.cookies),
+                                                                                        int(jumlah_browser))
+                                                        elif jumlah_browser <= 1:
+                                                            driver_approve = st.session_state.driver
+                                                        else:
+                                                            driver_approve = DriverPool(partial(open_driver, st.session_state.session.cookies),
+                                                                                        int(jumlah_browser), drivers=[st.session_state.driver])
+                                                        kwargs_approve = dict(
+                                                            id_survey=id_survey,
+                                                            template_id=template_id,
+                                                            nama_kab=nama_kab,
+                                                            nama_survey=nama_survey,
+                                                            daftarwilayah_df=wilayah_aksi,
+                                                            headers=st.session_state.headers,
+                                                            cookies=st.session_state.cookies,
+                                                            sess=st.session_state.session,
+                                                            survey_period_id=survey_period_id,
+                                                            save_folder=save_folder,
+                                                            driver=driver_approve,
+                                                            role=role_approve,
+                                                            approve_url=APPROVE_URL if approve_api else "",
+                                                            plan_only=hanya_rencana,
+                                                        )
+                                                        if di_latar:
+                                                            job = job_runner().submit("approve", f"Approve {nama_survey} — {nama_kab}",
+                                                                                      streamlit_approve_by_pml, **kwargs_approve)
+                                                            st.success(f"🧵 Job {job.id} diantrekan; pantau di panel job di bawah.")
+                                                        else:
+                                                            with st.spinner("Menjalankan auto-approve..."):
+                                                                logpath = streamlit_approve_by_pml(**kwargs_approve)
                                                             if logpath:
                                                                 with open(logpath, "rb") as fh:
                                                                     st.download_button("Download Log Approve Excel", fh.read(), file_name=os.path.basename(logpath))
@@ -915,6 +755,8 @@ if st.session_state.get("login_success", False):
 else:
     st.info("Belum login — buka expand Login di atas untuk masuk.")
 
+panel_job()
+
 # ✅ Tombol tutup browser global (jika masih ingin menutup)
 if "driver" in st.session_state and st.session_state["driver"] is not None:
     if st.button("❌ Tutup Browser (global)"):
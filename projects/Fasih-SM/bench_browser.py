@@ -0,0 +1,129 @@
+# bench_browser.py
+"""
+Benchmark waktu siap halaman di Chrome: profil standar vs profil ringan
+(fasih_browser.lean_options + apply_lean) terhadap server tiruan (fasih_standin).
+
+    python bench_browser.py                                  # stand-in lokal, 20 halaman review per profil
+    python bench_browser.py --pages 50 --latency aset=150,20 --assets 20
+    python bench_browser.py --profil ringan --show-browser --json hasil.json
+    python bench_browser.py --url http://10.0.0.5:8765       # stand-in yang sudah jalan
+
+Tiap profil membuka satu Chrome lewat fasih_browser.open_driver (injeksi cookie
++ handshake OAuth ke stand-in = langkah "login"), memuat satu halaman review
+pemanasan, lalu mengukur `--pages` halaman review:
+
+- get     : sampai driver.get kembali (profil ringan: setelah DOMContentLoaded)
+- tombol  : sampai #buttonApprove bisa diklik
+- idle    : sampai fasih_browser.page_idle (load selesai, XHR & spinner kosong)
+
+dilaporkan p50/p95 (ms) per langkah, plus jumlah request aset (gambar, font,
+video, analytics) yang sampai ke server per halaman. Butuh selenium + Chrome.
+"""
+import argparse
+import json
+import os
+import time
+
+import fasih_standin
+
+PROFILES = ("standar", "ringan")
+STEPS = ("get", "tombol", "idle")
+
+
+def run_profile(url, lean, pages, headless, state=None):
+    """StepTimer berisi langkah login/get/tombol/idle untuk satu profil, dan jumlah request aset per halaman."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    from fasih_browser import POLL, open_driver, wait_idle
+    from fasih_metrics import StepTimer
+
+    timer = StepTimer()
+    review = url + "/survey-review/{aid}/" + fasih_standin.TEMPLATE_ID + "/" + fasih_standin.PERIOD_ID
+    with timer.step("login"):
+        driver = open_driver({}, headless=headless, lean=lean)
+    try:
+        button = EC.element_to_be_clickable((By.ID, "buttonApprove"))
+        wait = WebDriverWait(driver, 30, poll_frequency=POLL)
+        driver.get(review.format(aid="BENCH-PEMANASAN"))
+        wait_idle(driver)
+        assets0 = state.counts.get("aset", 0) if state is not None else 0
+        for i in range(pages):
+            t0 = time.perf_counter()
+            driver.get(review.format(aid=f"BENCH-{i:04d}"))
+            timer.add("get", time.perf_counter() - t0)
+            wait.until(button)
+            timer.add("tombol", time.perf_counter() - t0)
+            wait_idle(driver)
+            timer.add("idle", time.perf_counter() - t0)
+        assets = (state.counts.get("aset", 0) - assets0) / max(pages, 1) if state is not None else None
+    finally:
+        driver.quit()
+    return timer, assets
+
+
+def row_of(name, timer, assets):
+    df = timer.frame()
+    row = {"profil": name, "halaman": int(df.loc["get", "n"]) if "get" in df.index else 0,
+           "login ms": round(df.loc["login", "total detik"] * 1000) if "login" in df.index else None}
+    for step in STEPS:
+        if step in df.index:
+            row[f"{step} p50"] = round(df.loc[step, "p50 ms"])
+            row[f"{step} p95"] = round(df.loc[step, "p95 ms"])
+    row["aset/halaman"] = round(assets, 1) if assets is not None else "n/a"
+    return row
+
+
+def main(argv=None):
+    ap = fasih_standin.add_config_args(argparse.ArgumentParser(description="Benchmark waktu siap halaman Chrome standar vs ringan."))
+    ap.add_argument("--url", help="stand-in yang sudah jalan (opsi data/latensi di bawah lalu diabaikan)")
+    ap.add_argument("--profil", default=",".join(PROFILES), help=f"subset dari {','.join(PROFILES)}")
+    ap.add_argument("--pages", type=int, default=20, help="halaman review yang diukur per profil")
+    ap.add_argument("--show-browser", action="store_true", help="jalankan Chrome dengan jendela (bukan headless)")
+    ap.add_argument("--json", help="simpan semua baris hasil ke file JSON")
+    args = ap.parse_args(argv)
+
+    profiles = [p.strip() for p in args.profil.split(",") if p.strip()]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        ap.error(f"profil tidak dikenal: {', '.join(sorted(unknown))}")
+
+    server = state = None
+    url = args.url
+    if not url:
+        cfg = fasih_standin.config_from_args(args)
+        url, server, state = fasih_standin.start_background(cfg)
+        print(f"stand-in {url} • {cfg.assets} gambar + font + video @ {cfg.asset_kb} KB • latensi {cfg.latency}")
+    url = url.rstrip("/")
+    os.environ["FASIH_BASE_URL"] = url  # sebelum fasih_browser / fasih_client di-import
+    import fasih_client
+    if fasih_client.FASIH_BASE != url:
+        raise SystemExit("fasih_client sudah ter-import dengan FASIH_BASE lain; jalankan bench_browser.py langsung")
+
+    cols = ["profil", "halaman", "login ms"] + [f"{s} {q}" for s in STEPS for q in ("p50", "p95")] + ["aset/halaman"]
+    print(" | ".join(f"{c:>12}" for c in cols))
+    rows = []
+    try:
+        for name in profiles:
+            try:
+                timer, assets = run_profile(url, name == "ringan", args.pages, not args.show_browser, state)
+                row = row_of(name, timer, assets)
+            except Exception as e:
+                row = {"profil": name, "gagal": f"{type(e).__name__}: {e}"}
+            rows.append(row)
+            print(" | ".join(f"{str(row.get(c, '')):>12}" for c in cols) + (f"  ✗ {row['gagal']}" if row.get("gagal") else ""))
+    finally:
+        if server is not None:
+            server.shutdown()
+    ok = {r["profil"]: r for r in rows if "idle p50" in r}
+    if len(ok) == 2 and ok["ringan"]["idle p50"]:
+        print(f"idle p50 standar / ringan = {ok['standar']['idle p50'] / ok['ringan']['idle p50']:.1f}x")
+    print("ms sejak driver.get; aset = request gambar/font/video/analytics yang sampai ke server")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "pages": args.pages, "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
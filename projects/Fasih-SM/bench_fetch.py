@@ -0,0 +1,263 @@
+# bench_fetch.py
+"""
+Benchmark throughput ambil data FASIH terhadap server tiruan (fasih_standin).
+
+    python bench_fetch.py                                   # stand-in lokal, semua strategi
+    python bench_fetch.py --workers 8,16,32 --latency detail=60,20 --error-rate 0.02
+    python bench_fetch.py --strategi serial,thread,async --json hasil.json
+    python bench_fetch.py --url http://10.0.0.5:8765        # stand-in yang sudah jalan
+
+Tiap strategi dijalankan di proses baru (FASIH_BASE_URL diarahkan ke stand-in,
+puncak memori tidak saling mempengaruhi) dan dilaporkan: assignment/detik,
+request/detik, retry, error, waktu, serta puncak RSS proses dan kenaikannya
+selama run.
+
+Strategi:
+
+- serial          : listing lalu detail satu per satu (baseline cara lama)
+- thread          : AssignmentFetcher, hasil di memori (per nilai --workers)
+- async           : AsyncAssignmentFetcher (bila httpx terpasang)
+- export          : AssignmentFetcher + ExportSink ke folder sementara
+- cache           : AssignmentFetcher + DetailCache yang sudah hangat (run kedua)
+- history         : HistoryResolver untuk semua assignment
+- wilayah         : crawl wilayah (load_wilayah, force) engine thread & async
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+import fasih_standin
+
+STRATEGIES = ("serial", "thread", "async", "export", "cache", "history", "wilayah")
+
+try:
+    import resource
+    resource_ok = True
+except Exception:  # Windows
+    resource_ok = False
+
+
+def peak_rss_mb():
+    """Puncak RSS proses ini (MB); None bila tidak tersedia."""
+    if not resource_ok:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # darwin: byte, linux: KB
+
+
+def _client(workers):
+    from fasih_client import FasihClient, fasih_headers
+    return FasihClient(fasih_headers({}), {}, workers)
+
+
+def _smallcodes(sess):
+    """Smallcode dari stand-in (lewat region API, tidak ikut diukur)."""
+    levels = sess.region_metadata(fasih_standin.GROUP_ID)
+    depth = len(levels)
+    frontier = [fasih_standin.KAB_ID]
+    from fasih_wilayah import fetch_region_children
+    codes = []
+    for level in range(3, depth + 1):
+        items = [c for pid in frontier for c in fetch_region_children(sess, fasih_standin.GROUP_ID, level, pid)]
+        frontier = [c["id"] for c in items]
+        codes = [c["fullCode"] for c in items]
+    return codes
+
+
+def _run_fetcher(fetcher, smallcodes):
+    fetcher.start(smallcodes)
+    for _ in fetcher.iter_events():
+        pass
+    return fetcher
+
+
+# ---- strategi (dijalankan di proses anak) ----
+def s_serial(smallcodes, workers, metrics, tmp):
+    from fasih_fetch import fetch_assignment_answers, fetch_principal_values
+    sess = _client(1)
+    sess.hooks.append(metrics)
+    n = 0
+    for sc in smallcodes:
+        for d in fetch_principal_values(sess, fasih_standin.PERIOD_ID, sc):
+            try:
+                fetch_assignment_answers(sess, d.get("assignmentId"))
+            except Exception:
+                continue
+            n += 1
+    sess.close()
+    return n
+
+
+def s_thread(smallcodes, workers, metrics, tmp, sink=None, cache=None):
+    from fasih_fetch import AssignmentFetcher
+    sess = _client(workers)
+    f = _run_fetcher(AssignmentFetcher(sess, sess.headers, fasih_standin.PERIOD_ID, workers, sink=sink,
+                                       cache=cache, hooks=[metrics]), smallcodes)
+    sess.close()
+    return len(f.answers) if sink is None else sink.answers.rows
+
+
+def s_async(smallcodes, workers, metrics, tmp):
+    from fasih_async import AsyncAssignmentFetcher, httpx_ok
+    if not httpx_ok:
+        raise RuntimeError("httpx tidak terpasang")
+    sess = _client(workers)
+    f = _run_fetcher(AsyncAssignmentFetcher(sess, sess.headers, fasih_standin.PERIOD_ID, workers,
+                                            hooks=[metrics]), smallcodes)
+    sess.close()
+    return len(f.answers)
+
+
+def s_export(smallcodes, workers, metrics, tmp):
+    from fasih_writer import ChunkedTableWriter, ExportSink
+    sink = ExportSink(ChunkedTableWriter(os.path.join(tmp, "answers")), ChunkedTableWriter(os.path.join(tmp, "assign")))
+    try:
+        return s_thread(smallcodes, workers, metrics, tmp, sink=sink)
+    finally:
+        sink.close()
+
+
+def s_cache(smallcodes, workers, metrics, tmp):
+    from fasih_detail_cache import DetailCache
+    from fasih_metrics import HttpMetrics
+    cache = DetailCache(os.path.join(tmp, "detail"))
+    s_thread(smallcodes, workers, HttpMetrics(), tmp, cache=cache)  # pemanasan, tidak diukur
+    metrics.started = time.time()
+    return s_thread(smallcodes, workers, metrics, tmp, cache=cache)
+
+
+def s_history(smallcodes, workers, metrics, tmp):
+    from fasih_history import HistoryResolver
+    sess = _client(workers)
+    ids = [f"{sc}-{i:03d}" for sc in smallcodes for i in range(int(os.environ["BENCH_ASSIGNMENTS"]))]
+    sess.hooks.append(metrics)
+    with HistoryResolver(sess, workers) as h:
+        h.prefetch(ids)
+        n = len(ids) - len(h.errors)
+    sess.close()
+    return n
+
+
+def s_wilayah(smallcodes, workers, metrics, tmp, engine="thread"):
+    from fasih_wilayah import RegionCache, load_wilayah
+    sess = _client(workers)
+    sess.hooks.append(metrics)
+    levels = sess.region_metadata(fasih_standin.GROUP_ID)
+    if engine == "async":
+        metrics.install()  # klien async crawl tidak menerima hooks=
+    try:
+        df, _ = load_wilayah(fasih_standin.KAB_ID, levels, fasih_standin.GROUP_ID, sess.headers, sess.cookies,
+                             cache=RegionCache(os.path.join(tmp, "wilayah")), force=True, max_workers=workers,
+                             sess=sess if engine == "thread" else None, engine=engine)
+    finally:
+        metrics.uninstall()
+        sess.close()
+    return len(df)
+
+
+def _child(name, fn_name, kwargs, smallcodes, workers, out):
+    """Isi proses anak: jalankan satu strategi, kirim hasil lewat `out` (Queue)."""
+    from fasih_metrics import HttpMetrics
+    fn = globals()[fn_name]
+    rss0 = peak_rss_mb()
+    metrics = HttpMetrics()
+    row = {"strategi": name, "workers": workers}
+    with tempfile.TemporaryDirectory(prefix="bench_fetch_") as tmp:
+        metrics.started = time.time()  # strategi boleh memajukan ini (mis. setelah pemanasan)
+        try:
+            n, error = fn(smallcodes, workers, metrics, tmp, **kwargs), None
+        except Exception as e:
+            n, error = 0, f"{type(e).__name__}: {e}"
+        elapsed = max(time.time() - metrics.started, 1e-6)
+    total, errors, retries = metrics.total()
+    rss1 = peak_rss_mb()
+    row.update({
+        "item": n, "item/detik": round(n / elapsed, 1), "request": total,
+        "req/detik": round(total / elapsed, 1), "error": errors, "retry": retries, "detik": round(elapsed, 2),
+        "rss puncak MB": round(rss1, 1) if rss1 is not None else "n/a",
+        "rss naik MB": round(rss1 - rss0, 1) if rss1 is not None else "n/a",
+        "gagal": error,
+    })
+    out.put(row)
+
+
+def plan(strategies, workers):
+    """[(nama, fungsi, kwargs, workers)] sesuai pilihan."""
+    out = []
+    for s in strategies:
+        if s == "serial":
+            out.append(("serial", "s_serial", {}, 1))
+        elif s == "wilayah":
+            out += [(f"wilayah-{eng}", "s_wilayah", {"engine": eng}, w) for eng in ("thread", "async") for w in workers]
+        else:
+            out += [(s, f"s_{s}", {}, w) for w in workers]
+    return out
+
+
+def run_all(url, strategies, workers, assignments, timeout=600):
+    os.environ["FASIH_BASE_URL"] = url  # diwarisi proses anak (spawn) sebelum fasih_client di-import
+    os.environ["BENCH_ASSIGNMENTS"] = str(assignments)
+    ctx = mp.get_context("spawn")
+    import fasih_client  # proses induk hanya untuk daftar smallcode
+    if fasih_client.FASIH_BASE != url.rstrip("/"):
+        raise RuntimeError("fasih_client sudah ter-import dengan FASIH_BASE lain; jalankan bench_fetch.py langsung")
+    sess = _client(4)
+    smallcodes = _smallcodes(sess)
+    sess.close()
+    for name, fn_name, kwargs, w in plan(strategies, workers):
+        out = ctx.Queue()
+        p = ctx.Process(target=_child, args=(name, fn_name, kwargs, smallcodes, w, out))
+        p.start()
+        try:
+            row = out.get(timeout=timeout)
+        except Exception:
+            row = {"strategi": name, "workers": w, "gagal": "timeout"}
+            p.terminate()
+        p.join()
+        yield len(smallcodes), row
+
+
+def main(argv=None):
+    ap = fasih_standin.add_config_args(argparse.ArgumentParser(description="Benchmark throughput ambil data FASIH."))
+    ap.add_argument("--url", help="stand-in yang sudah jalan (opsi data/latensi di bawah lalu diabaikan)")
+    ap.add_argument("--strategi", default=",".join(STRATEGIES), help=f"subset dari {','.join(STRATEGIES)}")
+    ap.add_argument("--workers", default="8,32", help="daftar jumlah worker/in-flight, mis. 4,16,64")
+    ap.add_argument("--json", help="simpan semua baris hasil ke file JSON")
+    args = ap.parse_args(argv)
+
+    strategies = [s.strip() for s in args.strategi.split(",") if s.strip()]
+    unknown = set(strategies) - set(STRATEGIES)
+    if unknown:
+        ap.error(f"strategi tidak dikenal: {', '.join(sorted(unknown))}")
+    workers = [int(w) for w in args.workers.split(",")]
+
+    server = None
+    url = args.url
+    if not url:
+        cfg = fasih_standin.config_from_args(args)
+        url, server, _ = fasih_standin.start_background(cfg)
+        print(f"stand-in {url} • {len(cfg.smallcodes())} SLS x {cfg.assignments} assignment • "
+              f"{cfg.keys} jawaban • latensi {cfg.latency} • error {cfg.error_rate:.0%}")
+
+    cols = ["strategi", "workers", "item", "item/detik", "req/detik", "retry", "error", "detik", "rss puncak MB", "rss naik MB"]
+    print(" | ".join(f"{c:>13}" for c in cols))
+    rows, n_sls = [], 0
+    try:
+        for n_sls, row in run_all(url, strategies, workers, args.assignments):
+            rows.append(row)
+            print(" | ".join(f"{str(row.get(c, '')):>13}" for c in cols) + (f"  ✗ {row['gagal']}" if row.get("gagal") else ""))
+    finally:
+        if server is not None:
+            server.shutdown()
+    print("item = assignment (serial/thread/async/export/cache), riwayat (history), atau baris wilayah (wilayah)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "smallcodes": n_sls, "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
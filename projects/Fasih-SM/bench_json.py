@@ -0,0 +1,55 @@
+# bench_json.py
+"""
+Micro-benchmark decode payload detail assignment (get-by-id-with-data-for-scm).
+
+    python bench_json.py                      # payload sintetis (300 dataKey)
+    python bench_json.py rekaman1.json ...    # payload hasil rekaman (body respons mentah)
+
+Membandingkan cara lama (resp.json() → json.loads(data.data)) dengan
+fasih_fetch.decode_detail_answers (orjson bila terpasang).
+"""
+import json
+import sys
+import time
+
+from fasih_fetch import decode_detail_answers, orjson_ok
+
+
+def synthetic_payload(n_keys=300, seed="6310010001000100"):
+    answers = [
+        {"dataKey": f"r{i:03d}", "value": f"{seed}-{i}" if i % 3 else i, "label": f"Pertanyaan {i}",
+         "answer": [{"value": str(i), "label": f"Pilihan {i}"}] if i % 5 == 0 else str(i)}
+        for i in range(n_keys)
+    ]
+    inner = {"answers": answers, "principals": answers[:10], "summary": {"remarks": "x" * 500}}
+    outer = {"success": True, "message": "OK", "data": {"id": seed, "data": json.dumps(inner), "region": {"smallestCode": seed}}}
+    return json.dumps(outer).encode("utf-8")
+
+
+def decode_lama(content):
+    outer = json.loads(content.decode("utf-8"))  # setara resp.json()
+    return json.loads(outer["data"]["data"])["answers"]
+
+
+def bench(fn, payloads, repeat):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for p in payloads:
+            fn(p)
+    return (time.perf_counter() - t) / (repeat * len(payloads))
+
+
+def main(paths):
+    payloads = [open(p, "rb").read() for p in paths] or [synthetic_payload()]
+    assert all(decode_lama(p) == decode_detail_answers(p) for p in payloads)
+    repeat = max(1, 2000 // len(payloads))
+    lama = bench(decode_lama, payloads, repeat)
+    baru = bench(decode_detail_answers, payloads, repeat)
+    size = sum(len(p) for p in payloads) / len(payloads)
+    print(f"payload: {len(payloads)} x rata-rata {size / 1024:.1f} KB • orjson: {'ya' if orjson_ok else 'tidak'}")
+    print(f"lama : {lama * 1e6:8.1f} µs/payload")
+    print(f"baru : {baru * 1e6:8.1f} µs/payload  ({lama / baru:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,345 @@
+# fasih_approve.py
+"""
+Approve assignment tanpa browser: request approve FASIH dikirim langsung lewat
+session login (FasihClient), paralel, dengan aturan role/status yang sama
+dengan tombol Approve di halaman review.
+
+Endpoint approve FASIH tidak terdokumentasi, jadi alamatnya diatur lewat env:
+
+    FASIH_APPROVE_URL     mis. /assignment-general/api/assignment/approve
+                          (relatif ke FASIH_BASE, boleh berisi {assignment_id},
+                          {period}, {template_id})
+    FASIH_APPROVE_METHOD  POST (default) / PUT
+
+Body JSON: {"assignmentId", "surveyPeriodId", "templateId", "role"}. Approve
+dianggap berhasil bila respons berisi `"success": true`, atau (respons 2xx
+tanpa tanda sukses) status terakhir di riwayat sudah bukan status yang boleh
+di-approve role tsb. Bila env kosong, atau server membalas 404/405 (endpoint
+salah), `Approver` jatuh ke Selenium (`approve_via_driver`, klik
+#buttonApprove + konfirmasi) bila driver diberikan: satu driver dipakai
+bergantian, atau fasih_browser.DriverPool berisi N Chrome headless yang
+bekerja paralel.
+
+`plan_approve` menyusun rencana sebelum ada yang di-approve: listing semua
+smallcode dan riwayat status tiap assignment diambil paralel, lalu disaring
+dengan `role_allows`. Hanya entri rencana (`ApprovePlan.entries()`) yang perlu
+dikirim ke `Approver`.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from fasih_browser import POLL, WAIT_TIMEOUT, DriverPool, page_idle, xhr_tracked
+from fasih_client import FASIH_BASE, HISTORY_URL, REVIEW_URL
+from fasih_fetch import SessionExpired, check_status, fetch_principal_values, json_loads
+from fasih_history import HistoryResolver, latest_status
+from fasih_metrics import timed
+
+APPROVE_URL = os.environ.get("FASIH_APPROVE_URL", "").strip()
+APPROVE_METHOD = os.environ.get("FASIH_APPROVE_METHOD", "POST").strip().upper() or "POST"
+APPROVE_WORKERS = 8
+PLAN_WORKERS = 8  # listing smallcode bersamaan saat menyusun rencana
+CONFIRM_XPATH = '//*[@id="fasih"]/div/div/div[6]/button[1]'
+
+# status terakhir yang boleh di-approve per role
+ROLE_APPROVE_FROM = {
+    "Pengawas": ("SUBMITTED BY Pencacah",),
+    "PML": ("SUBMITTED BY PPL",),
+    "Admin Kabupaten": ("APPROVED BY Pengawas", "APPROVED BY PML", "EDITED BY Admin Kabupaten"),
+    "Admin Provinsi": ("COMPLETED BY Admin Kabupaten",),
+}
+
+
+def role_allows(role_name, current_status):
+    return current_status in ROLE_APPROVE_FROM.get(role_name, ())
+
+
+class ApprovePlan:
+    """
+    Hasil `plan_approve`: `rows` = satu baris per assignment (kolom log approve:
+    assignment_id, smallCode, review_url, status_assignment, approved,
+    keterangan) plus `layak` (boleh di-approve role ini); `errors` = smallcode
+    yang listing-nya gagal → exception.
+    """
+
+    def __init__(self, role, rows=None, errors=None):
+        self.role = role
+        self.rows = rows if rows is not None else []
+        self.errors = errors if errors is not None else {}
+
+    def entries(self):
+        return [r for r in self.rows if r["layak"]]
+
+    def summary(self):
+        """DataFrame per smallcode: jumlah assignment, akan di-approve, dilewati, riwayat gagal."""
+        df = pd.DataFrame(self.rows, columns=["smallCode", "layak", "status_assignment"])
+        if df.empty:
+            out = pd.DataFrame(columns=["assignment", "akan approve", "dilewati"])
+        else:
+            g = df.groupby("smallCode", sort=False)
+            out = pd.DataFrame({"assignment": g.size(), "akan approve": g["layak"].sum()})
+            out["dilewati"] = out["assignment"] - out["akan approve"]
+        for sc, e in self.errors.items():
+            out.loc[sc, ["assignment", "akan approve", "dilewati"]] = 0
+            out.loc[sc, "error listing"] = str(e)
+        out[["assignment", "akan approve", "dilewati"]] = out[["assignment", "akan approve", "dilewati"]].astype(int)
+        if "error listing" in out.columns:
+            out["error listing"] = out["error listing"].fillna("")
+        out.index.name = "smallcode"
+        return out
+
+    def status_counts(self):
+        """Jumlah assignment per status terakhir (pd.Series)."""
+        return pd.Series([r["status_assignment"] for r in self.rows], dtype=object).value_counts()
+
+    def text(self):
+        n = len(self.entries())
+        s = f"rencana {self.role}: {n} dari {len(self.rows)} assignment akan di-approve"
+        return s + (f" • listing gagal {len(self.errors)} smallcode" if self.errors else "")
+
+
+def plan_approve(sess, survey_period_id, template_id, smallcodes, role, history=None,
+                 max_workers=PLAN_WORKERS, on_progress=None):
+    """
+    Susun ApprovePlan: listing `smallcodes` paralel (`max_workers`), riwayat
+    tiap assignment diantre ke `history` (HistoryResolver; dibuat & ditutup di
+    sini bila None) begitu listing-nya datang, lalu status terakhir disaring
+    dengan `role_allows`. `on_progress(tahap, selesai, total)` dipanggil per
+    smallcode ("listing") dan per assignment ("riwayat"). SessionExpired
+    menghentikan penyusunan.
+    """
+    own_history = history is None
+    history = HistoryResolver(sess) if own_history else history
+    smallcodes = list(smallcodes)
+    listed, errors = {}, {}
+    pool = ThreadPoolExecutor(max_workers=max(int(max_workers), 1), thread_name_prefix="fasih-plan")
+    try:
+        futures = {pool.submit(fetch_principal_values, sess, survey_period_id, sc): sc for sc in smallcodes}
+        for i, fut in enumerate(as_completed(futures), 1):
+            sc = futures[fut]
+            try:
+                listed[sc] = [d.get("assignmentId") for d in fut.result() if d.get("assignmentId")]
+                history.submit(listed[sc])
+            except SessionExpired:
+                raise
+            except Exception as e:
+                errors[sc] = e
+            if on_progress:
+                on_progress("listing", i, len(smallcodes))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    rows = []
+    total = sum(map(len, listed.values()))
+    try:
+        for sc in smallcodes:  # urutan baris = urutan daftar wilayah
+            for aid in listed.get(sc, ()):
+                status = history.status(aid)
+                ok = role_allows(role, status)
+                if aid in history.errors:
+                    if isinstance(history.errors[aid], SessionExpired):
+                        raise history.errors[aid]
+                    ket = f"Riwayat gagal: {history.errors[aid]}"
+                else:
+                    ket = "" if ok else f"Belum memenuhi syarat (status: {status})"
+                rows.append({
+                    "assignment_id": aid,
+                    "smallCode": sc,
+                    "review_url": REVIEW_URL.format(assignment_id=aid, template_id=template_id, period=survey_period_id),
+                    "status_assignment": status,
+                    "layak": ok,
+                    "approved": False,
+                    "keterangan": ket,
+                })
+                if on_progress:
+                    on_progress("riwayat", len(rows), total)
+    finally:
+        if own_history:
+            history.close()
+    return ApprovePlan(role, rows, errors)
+
+
+class ApproveUnsupported(RuntimeError):
+    """Endpoint approve belum diatur / tidak dikenali server → pakai browser."""
+
+
+def approve_via_driver(driver, review_url, timeout=WAIT_TIMEOUT, timer=None):
+    """
+    Buka halaman review, klik Approve lalu tombol konfirmasi. (approved, keterangan)
+
+    Tanpa sleep tetap: tiap langkah menunggu kondisinya (tombol bisa diklik,
+    spinner hilang, XHR/fetch selesai — lihat fasih_browser.page_idle). `timer`
+    (fasih_metrics.StepTimer) mencatat lama tunggu per langkah.
+    """
+    from selenium.common.exceptions import (
+        ElementClickInterceptedException,
+        InvalidSessionIdException,
+        NoSuchWindowException,
+        StaleElementReferenceException,
+        TimeoutException,
+        WebDriverException,
+    )
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    approve_btn = EC.element_to_be_clickable((By.ID, "buttonApprove"))
+    confirm_btn = EC.element_to_be_clickable((By.XPATH, CONFIRM_XPATH))
+    try:
+        wait = WebDriverWait(driver, timeout, poll_frequency=POLL)
+        driver.get(review_url)
+        with timed(timer, "review siap"):
+            btn = wait.until(approve_btn)
+            wait.until(page_idle)
+        with timed(timer, "klik approve"):
+            for _ in range(5):
+                try:
+                    btn.click()
+                    break
+                except (ElementClickInterceptedException, StaleElementReferenceException):
+                    # tertutup overlay / dirender ulang: tunggu halaman tenang lalu cari lagi
+                    wait.until(page_idle)
+                    btn = wait.until(approve_btn)
+            else:
+                return False, "❌ Gagal klik Approve"
+        def confirm(seconds):
+            try:
+                WebDriverWait(driver, seconds, poll_frequency=POLL).until(confirm_btn).click()
+            except TimeoutException:
+                return False  # dialog tidak muncul: dilewati seperti cara lama
+            wait.until(page_idle)  # request approve selesai
+            return True
+
+        with timed(timer, "konfirmasi"):
+            confirm(timeout)
+            # dialog kedua (opsional) muncul setelah respons; tanpa penghitung XHR beri jeda lebih lama
+            confirm(3 * POLL if xhr_tracked(driver) else 2.0)
+        return True, "✅ Approved"
+    except TimeoutException:
+        return False, "❌ Timeout elemen"
+    except (InvalidSessionIdException, NoSuchWindowException):
+        raise  # Chrome mati / jendela tertutup: DriverPool menggantinya
+    except WebDriverException as e:
+        return False, f"❌ WebDriver error: {e}"
+    except Exception as e:
+        return False, f"❌ Error: {e}"
+
+
+class Approver:
+    """
+    Approve paralel lewat API (`max_workers` request bersamaan, antre lewat
+    limiter FasihClient), fallback ke `driver` (satu driver atau DriverPool)
+    bila API tidak tersedia.
+
+    `submit(assignment_id, review_url)` → Future berisi (approved, keterangan).
+    Sesi habis (401/403) dilempar sebagai SessionExpired dari Future.
+    """
+
+    def __init__(self, sess, survey_period_id, template_id, role, driver=None, url=APPROVE_URL,
+                 method=APPROVE_METHOD, max_workers=APPROVE_WORKERS, timeout=None, timer=None):
+        self.sess = sess
+        self.survey_period_id = survey_period_id
+        self.template_id = template_id
+        self.role = role
+        self.drivers = driver if driver is None or isinstance(driver, DriverPool) else DriverPool(None, drivers=[driver])
+        self.url = (FASIH_BASE + url if url.startswith("/") else url) if url else ""
+        self.method = method
+        self.timeout = timeout
+        self.timer = timer  # fasih_metrics.StepTimer untuk langkah browser (opsional)
+        self.api_ok = bool(self.url)
+        self.api_error = None if self.api_ok else "FASIH_APPROVE_URL belum diatur"
+        self.counts = {"api": 0, "browser": 0}
+        self._lock = threading.Lock()
+        # tanpa API: satu worker per Chrome, antrean assignment dibagi ke semua Chrome
+        workers = max(int(max_workers), 1) if self.api_ok else (self.drivers.size if self.drivers else 1)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fasih-approve")
+
+    @property
+    def engine(self):
+        if self.api_ok:
+            return "api"
+        return f"browser x{self.drivers.size}" if self.drivers is not None else "tidak ada"
+
+    def _api(self, assignment_id):
+        fmt = {"assignment_id": assignment_id, "period": self.survey_period_id, "template_id": self.template_id}
+        payload = {"assignmentId": assignment_id, "surveyPeriodId": self.survey_period_id,
+                   "templateId": self.template_id, "role": self.role}
+        resp = self.sess.request(self.method, self.url.format(**fmt), json=payload, timeout=self.timeout)
+        if resp.status_code in (404, 405):
+            raise ApproveUnsupported(f"{self.method} {self.url} → HTTP {resp.status_code}")
+        if resp.status_code in (401, 403):
+            raise SessionExpired(f"approve HTTP {resp.status_code} (sesi login habis?)")
+        try:
+            body = json_loads(resp.content) if resp.content.strip() else {}
+        except ValueError:
+            # halaman HTML (mis. redirect login SSO) bukan hasil approve
+            raise ApproveUnsupported(f"{self.method} {self.url} → respons bukan JSON (HTTP {resp.status_code})")
+        body = body if isinstance(body, dict) else {}
+        if 200 <= resp.status_code < 300 and body.get("success") is not False:
+            if body.get("success") is True:
+                return True, "✅ Approved (API)"
+            # tanpa tanda sukses (mis. `{}` dari proxy / URL salah): pastikan status di riwayat sudah berubah
+            status = self._status(assignment_id)
+            if status and not role_allows(self.role, status):
+                return True, f"✅ Approved (API, riwayat: {status})"
+            return False, f"❌ HTTP {resp.status_code} tanpa tanda sukses (status riwayat: {status or '-'})"
+        return False, f"❌ HTTP {resp.status_code}: {body.get('message') or resp.reason}"
+
+    def _status(self, assignment_id):
+        """Status terakhir dari endpoint riwayat; "" bila gagal dibaca."""
+        try:
+            resp = self.sess.get(HISTORY_URL.format(assignment_id=assignment_id), timeout=self.timeout)
+            check_status(resp.status_code, "riwayat")
+            return latest_status(json_loads(resp.content) if resp.content.strip() else {})
+        except SessionExpired:
+            raise
+        except Exception:
+            return ""
+
+    def _approve(self, assignment_id, review_url):
+        if self.api_ok:
+            try:
+                result = self._api(assignment_id)
+                with self._lock:
+                    self.counts["api"] += 1
+                return result
+            except ApproveUnsupported as e:
+                with self._lock:
+                    self.api_ok, self.api_error = False, str(e)
+        if self.drivers is None:
+            return False, f"❌ Approve API tidak tersedia ({self.api_error}) dan tidak ada browser"
+        error = None
+        for _ in range(2):  # Chrome rusak → diganti pool, coba sekali lagi
+            try:
+                with self.drivers.lease() as drv:
+                    result = approve_via_driver(drv, review_url, timer=self.timer)
+            except Exception as e:
+                error = e
+                continue
+            with self._lock:
+                self.counts["browser"] += 1
+            return result
+        return False, f"❌ Browser error: {error}"
+
+    def submit(self, assignment_id, review_url):
+        return self._pool.submit(self._approve, assignment_id, review_url)
+
+    def text(self):
+        s = f"approve via API {self.counts['api']} • browser {self.counts['browser']}"
+        if self.drivers is not None and self.counts["browser"]:
+            s += f" ({self.drivers.text()})"
+        return s + (f" • API: {self.api_error}" if self.api_error else "")
+
+    def close(self):
+        """Tunggu antrean selesai lalu tutup Chrome yang dibuka pool (driver pinjaman dibiarkan)."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if self.drivers is not None:
+            self.drivers.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,384 @@
+# fasih_async.py
+"""
+Mesin HTTP asyncio untuk API FASIH (httpx; HTTP/2 lewat `httpx[http2]` di requirements.txt).
+
+Satu `AsyncFasihClient` = satu pool koneksi bersama untuk crawl wilayah,
+listing assignment, dan detail (riwayat status tetap lewat fasih_history).
+Ribuan request bisa berjalan bersamaan di satu thread; jumlahnya dibatasi
+`max_in_flight`.
+
+Request antre lewat AdaptiveLimiter (AIMD, batas atas `max_in_flight`) dan
+429/5xx/timeout dicoba ulang dengan backoff ber-jitter.
+
+Header XSRF dan cookie diambil dari hasil main_login / build_session_from_cookiejar
+(dict header + dict cookie atau RequestsCookieJar).
+"""
+import asyncio
+import queue
+import threading
+import time
+
+from fasih_fetch import (
+    BACKLOG_PER_WORKER,
+    DEFAULT_FETCH_WORKERS,
+    AssignmentFetcher,
+    OrderedEmitter,
+    ResultCollector,
+    SessionExpired,
+    check_status,
+    decode_detail_answers,
+    flatten_answers,
+    json_loads,
+)
+from fasih_client import DETAIL_URL, ENDPOINT_TIMEOUTS, LISTING_URL, REGION_BASE, endpoint_of, notify
+from fasih_limiter import RETRY_STATUS, AdaptiveLimiter, backoff_delay, retry_after
+
+try:
+    import httpx
+    httpx_ok = True
+except Exception:
+    httpx_ok = False
+
+try:
+    import h2  # noqa: F401  (dibutuhkan httpx untuk HTTP/2)
+    http2_ok = True
+except Exception:
+    http2_ok = False
+
+DEFAULT_IN_FLIGHT = 64
+
+
+def _httpx_cookies(cookies):
+    jar = httpx.Cookies()
+    if cookies is None:
+        return jar
+    if isinstance(cookies, dict):
+        for k, v in cookies.items():
+            jar.set(k, v)
+        return jar
+    for c in cookies:  # RequestsCookieJar / CookieJar
+        jar.set(c.name, c.value, domain=c.domain or "", path=c.path or "/")
+    return jar
+
+
+class AsyncFasihClient:
+    """Klien asyncio FASIH; pakai sebagai `async with AsyncFasihClient(...) as client`."""
+
+    def __init__(self, headers, cookies, max_in_flight=DEFAULT_IN_FLIGHT, timeout=None, http2=None,
+                 limiter=None, retries=4, hooks=()):
+        if not httpx_ok:
+            raise RuntimeError("Install: pip install 'httpx[http2]'")
+        self.headers = dict(headers or {})
+        self.cookies = cookies
+        self.max_in_flight = max(int(max_in_flight), 1)
+        self.timeout = timeout
+        self.http2 = http2_ok if http2 is None else (http2 and http2_ok)
+        self.limiter = limiter or AdaptiveLimiter(self.max_in_flight)
+        self.retries = retries
+        self.hooks = tuple(hooks)  # hook instrumentasi khusus klien ini (lihat fasih_client.notify)
+        self._client = None
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+        self._client = httpx.AsyncClient(
+            headers=self.headers, cookies=_httpx_cookies(self.cookies),
+            http2=self.http2, limits=limits,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def get(self, url):
+        endpoint = endpoint_of(url)
+        timeout = self.timeout or ENDPOINT_TIMEOUTS[endpoint]
+        attempt = 0
+        started = time.monotonic()
+        while True:
+            await self.limiter.acquire_async()
+            t0 = time.monotonic()
+            congested = False
+            try:
+                resp = await self._client.get(url, timeout=timeout)
+                congested = resp.status_code in RETRY_STATUS
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                congested = True
+                if attempt >= self.retries:
+                    notify(endpoint, "GET", url, None, time.monotonic() - started, e, self.hooks, retries=attempt)
+                    raise
+                delay = backoff_delay(attempt)
+            else:
+                if not congested or attempt >= self.retries:
+                    notify(endpoint, "GET", url, resp.status_code, time.monotonic() - started, None, self.hooks,
+                           len(resp.content), attempt)
+                    return resp
+                delay = retry_after(resp.headers) or backoff_delay(attempt)
+            finally:
+                # slot selalu kembali, juga saat task dibatalkan / exception lain
+                self.limiter.release(time.monotonic() - t0, congested)
+            self.limiter.note_retry()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def get_bytes(self, url):
+        resp = await self.get(url)
+        check_status(resp.status_code, url.split("?")[0].rsplit("/", 1)[-1])
+        return resp.content
+
+    async def get_json(self, url):
+        content = await self.get_bytes(url)
+        return json_loads(content) if content.strip() else {}
+
+    # ---- endpoint FASIH ----
+    async def region_children(self, region_group_id, level, parent_id):
+        url = f"{REGION_BASE}/level{level}?groupId={region_group_id}&level{level - 1}Id={parent_id}"
+        return (await self.get_json(url)).get("data", []) or []
+
+    async def principal_values(self, survey_period_id, smallcode):
+        url = LISTING_URL.format(period=survey_period_id, smallcode=smallcode)
+        return (await self.get_json(url)).get("data", []) or []
+
+    async def assignment_answers(self, assignment_id):
+        return flatten_answers(decode_detail_answers(await self.get_bytes(DETAIL_URL.format(assignment_id=assignment_id))))
+
+
+def run_async(coro):
+    """Jalankan coroutine dari kode sinkron (thread Streamlit / CLI)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # sudah ada loop di thread ini → jalankan di thread terpisah
+    box = {}
+    t = threading.Thread(target=lambda: box.setdefault("r", asyncio.run(coro)))
+    t.start(); t.join()
+    return box.get("r")
+
+
+# ---- crawl wilayah ----
+async def _crawl_frontier(resolver, kabupaten_id, region_group_id, depth, level_names, client,
+                          on_progress=None, on_error=None):
+    async def children_of(level, parent_id):
+        nodes = resolver.cached(level, parent_id)
+        if nodes is None:
+            nodes = resolver.store(level, parent_id, await client.region_children(region_group_id, level, parent_id))
+        return nodes
+
+    frontier = [(k,) for k in await children_of(3, kabupaten_id)]
+    if on_progress:
+        on_progress(level_names[0], 1, 1)
+
+    for level in range(4, depth + 1):
+        level_name = level_names[level - 3]
+        children = [None] * len(frontier)
+
+        async def one(i, parent_id):
+            try:
+                return i, await children_of(level, parent_id), None
+            except Exception as e:
+                return i, None, e
+
+        tasks = [asyncio.ensure_future(one(i, path[-1][0])) for i, path in enumerate(frontier)]
+        done = 0
+        for fut in asyncio.as_completed(tasks):
+            i, kids, err = await fut
+            children[i] = kids
+            if err is not None:
+                resolver.failed()
+                if on_error:
+                    on_error(level_name, frontier[i][-1][1], err)
+            done += 1
+            if resolver.checkpoint_due():
+                await asyncio.to_thread(resolver.checkpoint)  # pickle node store di luar event loop
+            if on_progress:
+                on_progress(level_name, done, len(frontier))
+
+        frontier = [path + (child,) for path, kids in zip(frontier, children) if kids for child in kids]
+    return frontier
+
+
+def crawl_frontier(resolver, kabupaten_id, region_group_id, depth, level_names, headers, cookies,
+                   max_in_flight=DEFAULT_IN_FLIGHT, timeout=None, on_progress=None, on_error=None):
+    """Versi asyncio dari loop crawl_wilayah; dipanggil lewat crawl_wilayah(engine="async")."""
+    async def main():
+        async with AsyncFasihClient(headers, cookies, max_in_flight, timeout) as client:
+            return await _crawl_frontier(resolver, kabupaten_id, region_group_id, depth, level_names,
+                                         client, on_progress, on_error)
+    return run_async(main())
+
+
+# ---- raw data ----
+class AsyncAssignmentFetcher:
+    """
+    Pengganti AssignmentFetcher (antarmuka sama: start / iter_events / assignments /
+    answers / failed) yang memakai satu event loop asyncio di thread latar.
+    """
+
+    def __init__(self, sess, headers, survey_period_id, max_workers=DEFAULT_FETCH_WORKERS, timeout=None,
+                 need_detail=None, sink=None, cache=None, hooks=()):
+        self.need_detail = need_detail
+        self.cache = cache
+        self.hooks = tuple(hooks)
+        self.sink = sink if sink is not None else ResultCollector()
+        self.headers = headers or dict(sess.headers)
+        self.cookies = sess.cookies
+        self.survey_period_id = survey_period_id
+        self.max_in_flight = max(int(max_workers), 1)
+        self.timeout = timeout
+        self.events = queue.Queue()
+        self.assignments = []
+        self.answers = []
+        self.failed = []
+        self.aborted = None
+        self._stop = threading.Event()
+        self._emit = None
+        self._thread = None
+        self.limiter = AdaptiveLimiter(self.max_in_flight)
+
+    def start(self, smallcodes):
+        smallcodes = list(smallcodes)
+        self._emit = OrderedEmitter(smallcodes, self.sink)
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run(smallcodes)), daemon=True)
+        self._thread.start()
+        return self
+
+    stop = AssignmentFetcher.stop
+    iter_events = AssignmentFetcher.iter_events
+
+    async def _run(self, smallcodes):
+        emit = self._emit
+        loop = asyncio.get_running_loop()
+        room = asyncio.Condition()
+
+        async def changed():
+            async with room:
+                room.notify_all()
+
+        # sink (sinkron inkremental → jurnal → tulis part) jalan di satu thread penulis: flush part &
+        # checkpoint jurnal tidak menahan request lain di event loop. Hasil dikumpulkan per putaran
+        # loop lalu diantre sekaligus; baris listing di antrean ikut dihitung sebagai baris tertahan.
+        outbox = queue.Queue()
+        batch = []
+        counts = {"posted": 0, "accepted": 0}  # baris listing: diantre (loop) / diterima emitter (penulis)
+
+        def send_batch():
+            outbox.put(batch[:])
+            batch.clear()
+
+        def forward(fn, *args):
+            if fn == emit.listing:
+                counts["posted"] += len(args[1])
+            if not batch:
+                loop.call_soon(send_batch)
+            batch.append((fn, args))
+
+        def held():
+            return emit.held + counts["posted"] - counts["accepted"]
+
+        def pump():
+            while True:
+                items = outbox.get()
+                if items is None:
+                    return
+                for fn, args in items:
+                    try:
+                        fn(*args)
+                    except Exception as e:
+                        self.failed.append((None, None, str(e)))
+                        self.stop(f"gagal menulis hasil: {e}")
+                    if fn == emit.listing:
+                        counts["accepted"] += len(args[1])
+                if outbox.empty():
+                    loop.call_soon_threadsafe(lambda: asyncio.ensure_future(changed()))
+
+        writer = threading.Thread(target=pump, daemon=True, name="fasih-sink")
+        writer.start()
+        try:
+            async with AsyncFasihClient(self.headers, self.cookies, self.max_in_flight, self.timeout,
+                                        limiter=self.limiter, hooks=self.hooks) as client:
+                async def detail(i, j, sc, row):
+                    aid = row.get("assignmentId")
+                    if self._stop.is_set():
+                        return
+                    try:
+                        if self.cache is not None:
+                            flat = flatten_answers(await self.cache.answers_async(client, row))
+                        else:
+                            flat = await client.assignment_answers(aid)
+                    except SessionExpired as e:
+                        self.stop(str(e))
+                        return
+                    except Exception as e:
+                        self.failed.append((sc, aid, str(e)))
+                        self.events.put(("detail", sc, aid, e))
+                        forward(emit.result, i, j, None, e)
+                        return
+                    flat["assignment_id"] = aid
+                    flat["smallCode"] = sc
+                    forward(emit.result, i, j, flat)
+                    self.events.put(("detail", sc, aid, None))
+
+                # worker tetap (bukan satu task per smallcode / assignment): antrean detail
+                # terbatas dan listing baru menunggu selama baris tertahan melebihi batas
+                bound = BACKLOG_PER_WORKER * self.max_in_flight
+                details = asyncio.Queue(maxsize=bound)
+                todo = iter(enumerate(smallcodes))
+
+                async def listing_worker():
+                    while True:
+                        # tunggu sebelum mengambil smallcode berikutnya: yang sudah diambil
+                        # (indeks lebih kecil) tetap jalan, jadi baris tertahan pasti berkurang
+                        async with room:
+                            await room.wait_for(lambda: held() <= bound or self._stop.is_set())
+                        i, sc = next(todo, (None, None))
+                        if sc is None or self._stop.is_set():
+                            return
+                        try:
+                            data = await client.principal_values(self.survey_period_id, sc)
+                        except SessionExpired as e:
+                            self.stop(str(e))
+                            await changed()
+                            return
+                        except Exception as e:
+                            self.failed.append((sc, None, str(e)))
+                            self.events.put(("listing", sc, 0, e))
+                            forward(emit.listing, i, [], e)
+                            await changed()
+                            continue
+                        self.events.put(("listing", sc, len(data), None))
+                        forward(emit.listing, i, data)
+                        for j, d in enumerate(data):
+                            if self.need_detail is not None and not self.need_detail(d):
+                                self.events.put(("skip", sc, d.get("assignmentId"), None))
+                                forward(emit.result, i, j, None)
+                            else:
+                                await details.put((i, j, sc, d))
+                        await changed()
+
+                async def detail_worker():
+                    while True:
+                        job = await details.get()
+                        if job is None:
+                            return
+                        await detail(*job)
+                        await changed()
+
+                detail_tasks = [asyncio.ensure_future(detail_worker()) for _ in range(self.max_in_flight)]
+                try:
+                    await asyncio.gather(*(listing_worker() for _ in range(min(self.max_in_flight, len(smallcodes)))))
+                    for _ in detail_tasks:
+                        await details.put(None)
+                    await asyncio.gather(*detail_tasks)
+                finally:
+                    for t in detail_tasks:
+                        t.cancel()
+        except Exception as e:
+            self.failed.append((None, None, str(e)))
+        finally:
+            if batch:
+                send_batch()
+            outbox.put(None)
+            await asyncio.to_thread(writer.join)  # semua hasil sudah sampai sink sebelum "done"
+            if isinstance(self.sink, ResultCollector):
+                self.assignments, self.answers = self.sink.assignments, self.sink.answers
+            self.events.put(("done", None, None, None))
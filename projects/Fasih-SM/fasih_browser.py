@@ -0,0 +1,313 @@
+# fasih_browser.py
+"""
+Chrome untuk approve lewat halaman review (cadangan bila approve API tidak
+tersedia, lihat fasih_approve).
+
+- `open_driver(cookies, headless)`: Chrome baru yang memakai cookie session
+  login (RequestsCookieJar / dict) lalu handshake OAuth ke FASIH.
+- `DriverPool`: N Chrome dengan cookie yang sama. Worker approve meminjam satu
+  driver dari antrean (`lease`), jadi tiap Chrome mengerjakan assignment
+  berbeda dan klik yang gagal diulang di Chrome itu sendiri. Chrome dibuka saat
+  pertama dibutuhkan; Chrome yang rusak (exception keluar dari `lease`) dibuang
+  dan diganti yang baru.
+- `suggested_pool_size()`: batas wajar jumlah Chrome dari CPU & RAM kosong.
+- Profil ringan (`lean_options` + `apply_lean`, default aktif; matikan dengan
+  env FASIH_LEAN_BROWSER=0): page load "eager", ekstensi mati, jendela kecil,
+  dan gambar / font / media / skrip analytics pihak ketiga diblokir lewat CDP
+  (`Network.setBlockedURLs`, pola `BLOCKED_URLS`). Halaman review & SSO hanya
+  perlu DOM + XHR, jadi `document.readyState` complete jauh lebih cepat.
+  Bandingkan dengan profil standar lewat bench_browser.py.
+- Tunggu berbasis kondisi (pengganti `time.sleep` tetap): `wait_ready`
+  (document complete), `wait_idle` (plus tidak ada XHR/fetch yang berjalan dan
+  spinner overlay hilang; penghitung XHR dipasang `track_xhr` lewat CDP),
+  `wait_url` (URL berubah / cocok). `LEGACY_SLEEP` = sleep lama per langkah,
+  baseline untuk fasih_metrics.StepTimer.
+
+selenium di-import saat dipakai.
+"""
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from fasih_client import FASIH_BASE
+
+LEAN_BROWSER = os.environ.get("FASIH_LEAN_BROWSER", "1").strip().lower() not in ("0", "false", "no", "off")
+LEAN_WINDOW = "1024,768"
+# pola URL yang tidak diunduh di profil ringan (wildcard CDP Network.setBlockedURLs)
+BLOCKED_URLS = [
+    *(f"*.{ext}*" for ext in ("png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp")),
+    *(f"*.{ext}*" for ext in ("woff", "woff2", "ttf", "otf", "eot")),
+    *(f"*.{ext}*" for ext in ("mp4", "webm", "ogg", "mp3", "wav")),
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*/gtag/js*", "*doubleclick.net*",
+    "*hotjar.com*", "*clarity.ms*", "*facebook.net*", "*nr-data.net*",
+]
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+
+WAIT_TIMEOUT = 30
+POLL = 0.1  # detik antar cek kondisi
+SPINNER_CSS = ".ngx-spinner-overlay, .ngx-spinner, .loading-overlay"
+# sleep tetap cara lama per langkah (detik), untuk laporan penghematan
+LEGACY_SLEEP = {
+    "cookie host": 2.0,
+    "login sso": 1.0,
+    "otp": 3.0,
+    "login tanpa otp": 2.0,
+    "oauth": 3.0,
+    "halaman survei": 3.0,
+    "review siap": 1.0,
+    "klik approve": 0.5,
+}
+# penghitung request XHR/fetch yang belum selesai, dipasang di tiap dokumen baru
+XHR_TRACKER_JS = """
+(function () {
+  if (window.__fasihPending !== undefined) return;
+  window.__fasihPending = 0;
+  var send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    window.__fasihPending++;
+    this.addEventListener('loadend', function () { window.__fasihPending--; });
+    return send.apply(this, arguments);
+  };
+  if (window.fetch) {
+    var f = window.fetch;
+    window.fetch = function () {
+      window.__fasihPending++;
+      return f.apply(this, arguments).finally(function () { window.__fasihPending--; });
+    };
+  }
+})();
+"""
+PAGE_IDLE_JS = """
+return document.readyState === 'complete' && !(window.__fasihPending > 0) &&
+  !Array.from(document.querySelectorAll(arguments[0])).some(function (e) {
+    return e.getClientRects().length > 0 && getComputedStyle(e).visibility !== 'hidden';
+  });
+"""
+
+DEFAULT_POOL_SIZE = 4
+CHROME_MB = 350  # perkiraan RAM satu Chrome headless yang membuka halaman review
+MAX_POOL_SIZE = 16
+
+
+def cookie_items(cookies):
+    """[(nama, nilai)] dari RequestsCookieJar, dict, atau list cookie selenium."""
+    if isinstance(cookies, dict):
+        return list(cookies.items())
+    try:
+        return [(c.name, c.value) for c in cookies]
+    except AttributeError:
+        return [(c.get("name"), c.get("value")) for c in cookies]
+
+
+def chrome_options(headless=True, lean=LEAN_BROWSER):
+    from selenium.webdriver.chrome.options import Options
+
+    opts = Options()
+    if headless:
+        opts.add_argument("--headless=new")
+    opts.add_argument("--disable-logging")
+    opts.add_argument("--log-level=3")
+    opts.add_argument("--window-size=1366,900")
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-dev-shm-usage")
+    opts.add_experimental_option("excludeSwitches", ["enable-logging"])
+    opts.add_experimental_option("prefs", {
+        "credentials_enable_service": False,
+        "profile.password_manager_enabled": False,
+    })
+    return lean_options(opts) if lean else opts
+
+
+def lean_options(opts):
+    """Profil otomasi ringan untuk Options Chrome / Edge; pasangannya `apply_lean` setelah driver dibuka."""
+    opts.page_load_strategy = "eager"  # driver.get kembali setelah DOMContentLoaded
+    opts.arguments[:] = [a for a in opts.arguments if not a.startswith("--window-size=")]
+    for arg in ("--disable-extensions", "--blink-settings=imagesEnabled=false", "--mute-audio",
+                "--disable-background-networking", f"--window-size={LEAN_WINDOW}"):
+        opts.add_argument(arg)
+    prefs = dict(opts.experimental_options.get("prefs") or {})
+    prefs.update(LEAN_PREFS)
+    opts.add_experimental_option("prefs", prefs)
+    return opts
+
+
+def apply_lean(driver):
+    """Blokir BLOCKED_URLS lewat CDP (Chrome/Edge). False bila tidak didukung."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+        return True
+    except Exception:
+        return False
+
+
+def open_driver(cookies, headless=True, lean=LEAN_BROWSER):
+    """Chrome yang memakai cookie session login (untuk approve)."""
+    from selenium import webdriver
+
+    driver = webdriver.Chrome(options=chrome_options(headless, lean))
+    if lean:
+        apply_lean(driver)
+    track_xhr(driver)
+    items = cookie_items(cookies)
+    for host in ("https://sso.bps.go.id", FASIH_BASE):
+        driver.get(host)
+        for name, value in items:
+            try:
+                driver.add_cookie({"name": name, "value": value, "domain": ".bps.go.id", "path": "/"})
+            except Exception:
+                pass
+    driver.get(FASIH_BASE + "/oauth2/authorization/ics")
+    wait_url(driver, lambda u: u.startswith(FASIH_BASE))
+    driver.get(FASIH_BASE + "/survey-collection/survey")
+    wait_idle(driver)
+    return driver
+
+
+# ---- tunggu berbasis kondisi ----
+def track_xhr(driver):
+    """Pasang penghitung XHR/fetch di setiap dokumen baru (CDP Chrome/Edge). False bila tidak didukung;
+    `wait_idle` lalu hanya memakai readyState + spinner."""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": XHR_TRACKER_JS})
+        return True
+    except Exception:
+        return False
+
+
+def xhr_tracked(driver):
+    try:
+        return bool(driver.execute_script("return window.__fasihPending !== undefined"))
+    except Exception:
+        return False
+
+
+def page_idle(driver):
+    """Dokumen selesai dimuat, tidak ada XHR/fetch berjalan, dan tidak ada spinner overlay terlihat."""
+    return bool(driver.execute_script(PAGE_IDLE_JS, SPINNER_CSS))
+
+
+def _wait(driver, timeout):
+    from selenium.webdriver.support.ui import WebDriverWait
+    return WebDriverWait(driver, timeout, poll_frequency=POLL)
+
+
+def wait_ready(driver, timeout=WAIT_TIMEOUT):
+    _wait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+
+
+def wait_idle(driver, timeout=WAIT_TIMEOUT):
+    _wait(driver, timeout).until(page_idle)
+
+
+def wait_url(driver, predicate, timeout=WAIT_TIMEOUT):
+    """Tunggu sampai `predicate(current_url)` benar; kembalikan URL tsb."""
+    return _wait(driver, timeout).until(lambda d: predicate(d.current_url or "") and (d.current_url or ""))
+
+
+def suggested_pool_size(limit=MAX_POOL_SIZE):
+    """min(CPU, RAM kosong / CHROME_MB), minimal 1."""
+    cpus = os.cpu_count() or 2
+    try:
+        free_mb = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2**20
+    except (ValueError, OSError, AttributeError):  # Windows / macOS tanpa sysconf ini
+        free_mb = None
+    n = cpus if free_mb is None else min(cpus, free_mb // CHROME_MB)
+    return max(1, min(int(n), limit))
+
+
+class DriverPool:
+    """
+    Antrean Chrome untuk worker approve. `factory()` membuka satu Chrome yang
+    sudah login (mis. `partial(open_driver, session.cookies)`); `drivers` =
+    driver yang sudah ada (mis. browser login app) yang ikut dipakai tapi tidak
+    ditutup pool.
+    """
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE, drivers=()):
+        self.factory = factory
+        borrowed = [d for d in drivers if d is not None]
+        self.size = max(int(size), len(borrowed), 1) if factory is not None else max(len(borrowed), 1)
+        self.opened = 0  # driver yang dibuka pool ini
+        self.replaced = 0
+        self._borrowed = set(map(id, borrowed))
+        self._all = list(borrowed)
+        self._starting = 0
+        self._idle = queue.Queue()
+        for d in borrowed:
+            self._idle.put(d)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self):
+        """Pinjam satu driver; Chrome baru dibuka bila semua sibuk dan pool belum penuh."""
+        with self._lock:
+            spawn = (self._idle.empty() and self.factory is not None
+                     and len(self._all) + self._starting < self.size)
+            if spawn:
+                self._starting += 1  # pesan slot agar tidak melebihi `size`
+        while not spawn:
+            driver = self._idle.get()
+            if driver is not None:
+                break
+            with self._lock:  # None = slot kosong bekas driver yang dibuang / gagal dibuka
+                if len(self._all) + self._starting < self.size:
+                    spawn = True
+                    self._starting += 1
+        if spawn:
+            try:
+                driver = self.factory()
+            except BaseException:
+                self._idle.put(None)  # slot dicoba lagi oleh peminjam berikutnya
+                raise
+            finally:
+                with self._lock:
+                    self._starting -= 1
+            with self._lock:
+                self._all.append(driver)
+                self.opened += 1
+        try:
+            yield driver
+        except BaseException:
+            self._discard(driver)
+            raise
+        else:
+            self._idle.put(driver)
+
+    def _discard(self, driver):
+        """Buang driver rusak; slotnya diisi Chrome baru pada `lease` berikutnya."""
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+            self.replaced += 1
+            borrowed = id(driver) in self._borrowed
+        if not borrowed:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if self.factory is None:  # tanpa factory tidak bisa diganti: pakai lagi apa adanya
+            with self._lock:
+                self._all.append(driver)
+            self._idle.put(driver)
+        else:
+            self._idle.put(None)
+
+    def text(self):
+        return f"{self.size} browser • dibuka {self.opened}" + (f" • diganti {self.replaced}" if self.replaced else "")
+
+    def close(self):
+        """Tutup Chrome yang dibuka pool (driver pinjaman dibiarkan)."""
+        with self._lock:
+            drivers, self._all = self._all, []
+        for d in drivers:
+            if id(d) not in self._borrowed:
+                try:
+                    d.quit()
+                except Exception:
+                    pass
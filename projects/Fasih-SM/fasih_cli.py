@@ -0,0 +1,274 @@
+# fasih_cli.py
+"""
+Mode batch tanpa Streamlit / input(), untuk dijadwalkan (cron) di server.
+
+    python fasih_cli.py raw --username budi --survey "MBG25" --period "TAHAP II" --kabupaten 6310
+    python fasih_cli.py approve --username budi --survey 1234-abcd --period 5678-efgh --kabupaten 6310
+    FASIH_APPROVE_URL=... python fasih_cli.py approve --approve-via api --role PML ...   # tanpa browser
+    python fasih_cli.py approve --rencana --role "Admin Kabupaten" ...   # hanya Excel rencana approve
+    python fasih_cli.py raw --multi-akun --survey MBG25 --period "TAHAP II" --kabupaten 6310 --workers 8
+
+Session diambil dari file `sessions/<username>_session.pkl` yang disimpan app
+(login SSO tetap lewat app karena butuh OTP). Survei / periode / kabupaten
+boleh berupa id, kode, atau sebagian nama (harus cocok tepat satu).
+Daftar wilayah dari `--wilayah file.xlsx` atau cache/API (fasih_wilayah).
+
+Kode keluar: 0 selesai, 1 gagal, 2 session tidak valid / habis,
+3 run terhenti (progres tersimpan di jurnal, jalankan ulang untuk melanjutkan).
+"""
+import argparse
+import os
+import sys
+import time
+from functools import partial
+
+import pandas as pd
+
+from fasih_approve import APPROVE_URL, ROLE_APPROVE_FROM
+from fasih_browser import DriverPool, open_driver, suggested_pool_size
+from fasih_fetch import DEFAULT_FETCH_WORKERS
+from fasih_journal import RunJournal
+from fasih_pool import SessionPool, load_session_file, session_ok
+from fasih_runs import approve_assignments, raw_export
+from fasih_wilayah import DEFAULT_WORKERS, RegionCache, load_wilayah
+from fasih_writer import DEFAULT_CHUNK_ROWS
+
+EXIT_OK, EXIT_ERROR, EXIT_SESSION, EXIT_ABORTED = 0, 1, 2, 3
+PRINT_INTERVAL = 10.0  # detik antar baris progress (log cron tidak perlu tiap item)
+
+
+class CliError(Exception):
+    def __init__(self, msg, code=EXIT_ERROR):
+        super().__init__(msg)
+        self.code = code
+
+
+class ConsoleUI:
+    """Pengganti `st` untuk CLI: pesan ke stdout, progress dicetak paling sering tiap `interval` detik."""
+
+    def __init__(self, interval=PRINT_INTERVAL, stream=None):
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.errors = 0
+        self._text = ""
+        self._value = 0.0
+        self._printed = 0.0
+
+    def _print(self, msg):
+        print(f"{time.strftime('%H:%M:%S')} {msg}", file=self.stream, flush=True)
+
+    def _tick(self, force=False):
+        now = time.time()
+        if force or now - self._printed >= self.interval:
+            self._printed = now
+            self._print(f"[{self._value:6.1%}] {self._text}")
+
+    def progress(self, value=0, text=None):
+        self._value = value / 100 if isinstance(value, int) else float(value)
+        if text:
+            self._text = text
+        self._tick(force=self._value >= 1.0)
+        return self
+
+    def empty(self):
+        return self
+
+    def text(self, body):
+        self._text = str(body)
+        self._tick()
+
+    def write(self, *args, **kwargs):
+        self._print(" ".join(str(a) for a in args))
+
+    def info(self, body, **kwargs):
+        self._print(body)
+
+    caption = info
+    success = info
+
+    def warning(self, body, **kwargs):
+        self._print(f"PERINGATAN: {body}")
+
+    def error(self, body, **kwargs):
+        self.errors += 1
+        self._print(f"ERROR: {body}")
+
+    def dataframe(self, *args, **kwargs):
+        pass
+
+    def download_button(self, *args, **kwargs):
+        return False
+
+
+def pilih_satu(items, query, label, keys):
+    """Item yang id/kodenya sama dengan `query`, atau satu-satunya yang namanya memuat `query`."""
+    q = str(query).strip().lower()
+    exact = [x for x in items if any(str(x.get(k, "")).lower() == q for k in keys)]
+    if len(exact) == 1:
+        return exact[0]
+    cocok = [x for x in items if q in str(x.get("name", "")).lower()]
+    if len(cocok) == 1:
+        return cocok[0]
+    pilihan = ", ".join(f"{x.get('name')} ({x.get(keys[0])})" for x in (exact or cocok or items)[:10])
+    raise CliError(f"{label} '{query}' {'ambigu' if (exact or cocok) else 'tidak ditemukan'}; pilihan: {pilihan}")
+
+
+def buka_session(args):
+    """(client, pool) dari session tersimpan; pool None bila satu akun."""
+    if args.multi_akun:
+        pool = SessionPool.from_folder(args.session_folder, max_per_account=args.workers,
+                                       usernames=args.username or None)
+        for name, why in pool.rejected:
+            print(f"session {name} dilewati: {why}", file=sys.stderr)
+        if not pool.accounts:
+            raise CliError(f"Tidak ada session valid di {args.session_folder}", EXIT_SESSION)
+        return pool.accounts[0].client, pool
+    if not args.username:
+        raise CliError("--username wajib tanpa --multi-akun")
+    path = os.path.join(args.session_folder, f"{args.username[0]}_session.pkl")
+    if not os.path.exists(path):
+        raise CliError(f"File session tidak ada: {path} (login dulu lewat app)", EXIT_SESSION)
+    _, client = load_session_file(path, args.workers)
+    ok, why = session_ok(client)
+    if not ok:
+        raise CliError(f"Session {args.username[0]} tidak valid ({why}); login ulang lewat app", EXIT_SESSION)
+    return client, None
+
+
+def resolve_target(client, args):
+    """Survei, template, periode, dan kabupaten dari argumen."""
+    survey = pilih_satu(client.surveys(), args.survey, "Survei", ("id",))
+    meta = client.survey(survey["id"])
+    template_id = meta["surveyTemplates"][-1]["templateId"] if meta.get("surveyTemplates") else None
+    period = pilih_satu(meta.get("surveyPeriods") or [], args.period, "Periode", ("id",))
+    group_id = meta.get("regionGroupId")
+
+    kab_q = str(args.kabupaten).strip()
+    provinces = client.provinces(group_id)
+    if kab_q.isdigit():
+        # kode kabupaten → provinsi lewat prefix kode
+        provinces = [p for p in provinces if kab_q.startswith(str(p.get("fullCode")))] or provinces
+    kab_list = [k for p in provinces for k in client.kabupaten(group_id, p["fullCode"])]
+    kab = pilih_satu(kab_list, kab_q, "Kabupaten", ("fullCode", "id"))
+    return {
+        "survey": survey, "template_id": template_id, "period": period, "group_id": group_id,
+        "level_region": client.region_metadata(group_id), "kab": kab,
+    }
+
+
+def daftar_wilayah(client, target, args, ui):
+    if args.wilayah:
+        df = pd.read_excel(args.wilayah)
+    else:
+        def on_progress(level_name, done, total):
+            ui.progress(done / total if total else 1.0)
+            ui.text(f"wilayah {level_name}: {done}/{total}")
+
+        def on_error(level_name, parent_name, e):
+            ui.warning(f"Gagal mengambil {level_name} dari {parent_name}: {e}")
+
+        df, info = load_wilayah(
+            target["kab"]["id"], target["level_region"], target["group_id"], client.headers, client.cookies,
+            cache=RegionCache(), force=args.refresh_wilayah, max_workers=args.workers_wilayah,
+            on_progress=on_progress, on_error=on_error,
+        )
+        ui.info(f"daftar wilayah: {len(df)} baris dari {info['source']}"
+                + (f", {info['failed']} daftar gagal" if info.get("failed") else ""))
+    if df is None or df.empty or "smallcode" not in df.columns:
+        raise CliError("Daftar wilayah kosong atau tidak mengandung kolom 'smallcode'")
+    if args.prefix:
+        df = df[df["smallcode"].astype(str).str.startswith(tuple(args.prefix))]
+        ui.info(f"dibatasi ke prefix {', '.join(args.prefix)}: {len(df)} wilayah")
+    return df
+
+
+def run(args):
+    ui = ConsoleUI(interval=args.interval)
+    client, pool = buka_session(args)
+    target = resolve_target(client, args)
+    survey, period, kab = target["survey"], target["period"], target["kab"]
+    ui.info(f"{args.aksi}: {survey['name']} • {period['name']} • {kab['name']} ({kab.get('fullCode')})")
+    df = daftar_wilayah(client, target, args, ui)
+
+    common = dict(
+        id_survey=survey["id"], template_id=target["template_id"], nama_survey=survey["name"],
+        daftarwilayah_df=df, headers=client.headers, cookies=client.cookies, sess=client,
+        survey_period_id=period["id"], save_folder=args.output,
+    )
+    if args.aksi == "raw":
+        paths = raw_export(
+            nama_kab=kab.get("fullCode"), ui=ui, max_workers=args.workers, engine=args.engine,
+            incremental=not args.full, excel=not args.no_excel, chunk_rows=args.chunk_rows,
+            resume=not args.no_resume, detail_cache=not args.no_cache, pool=pool, **common,
+        )
+        if ui.errors:
+            return EXIT_ERROR
+        output_dir = os.path.join(args.output, "output", survey["name"])
+        if RunJournal(output_dir, kab.get("fullCode"), period["id"], list(df["smallcode"])).resumable:
+            return EXIT_ABORTED  # jurnal belum di-finish → run terhenti di tengah
+    else:
+        via = "api" if args.rencana else args.approve_via or ("auto" if APPROVE_URL else "browser")
+        if via != "browser" and not APPROVE_URL and not args.rencana:
+            raise CliError("--approve-via api/auto butuh env FASIH_APPROVE_URL")
+        # Chrome dibuka saat dibutuhkan dan ditutup approve_assignments di akhir run
+        drivers = None if via == "api" else DriverPool(
+            partial(open_driver, client.cookies, headless=not args.show_browser), args.browsers)
+        paths = [approve_assignments(nama_kab=kab["name"], driver=drivers, ui=ui, role=args.role,
+                                     approve_url="" if via == "browser" else APPROVE_URL,
+                                     max_workers=args.workers, plan_only=args.rencana, **common)]
+        if ui.errors:
+            return EXIT_ERROR
+    for p in paths:
+        if p:
+            ui.info(f"file: {p}")
+    return EXIT_OK
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(description="FASIH batch: ambil raw data / approve tanpa UI.")
+    ap.add_argument("aksi", choices=["raw", "approve"])
+    ap.add_argument("--survey", required=True, help="id survei atau sebagian nama")
+    ap.add_argument("--period", required=True, help="id periode atau sebagian nama")
+    ap.add_argument("--kabupaten", required=True, help="kode (mis. 6310), id, atau nama kabupaten/kota")
+    ap.add_argument("--username", action="append", help="akun session tersimpan (boleh berulang dengan --multi-akun)")
+    ap.add_argument("--session-folder", default="sessions")
+    ap.add_argument("--multi-akun", action="store_true", help="bagi kerja ke semua session valid di folder")
+    ap.add_argument("--workers", type=int, default=DEFAULT_FETCH_WORKERS, help="worker paralel (per akun)")
+    ap.add_argument("--engine", choices=["thread", "async"], default="thread")
+    ap.add_argument("--output", default=os.getcwd(), help="folder simpan (hasil di <output>/output/<survei>)")
+    ap.add_argument("--wilayah", help="file Excel daftar wilayah (default: cache / API)")
+    ap.add_argument("--prefix", action="append", help="batasi ke prefix smallcode (boleh berulang)")
+    ap.add_argument("--workers-wilayah", type=int, default=DEFAULT_WORKERS)
+    ap.add_argument("--refresh-wilayah", action="store_true", help="abaikan cache daftar wilayah")
+    ap.add_argument("--full", action="store_true", help="raw: ambil semua detail (tanpa sinkron inkremental)")
+    ap.add_argument("--no-excel", action="store_true", help="raw: cukup file part, tanpa Excel")
+    ap.add_argument("--no-resume", action="store_true", help="raw: jangan lanjutkan run yang terputus")
+    ap.add_argument("--no-cache", action="store_true", help="raw: jangan pakai cache detail di disk")
+    ap.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    ap.add_argument("--role", choices=list(ROLE_APPROVE_FROM), default="PML", help="approve: role yang dipakai")
+    ap.add_argument("--approve-via", choices=["auto", "api", "browser"],
+                    help="approve: api (FASIH_APPROVE_URL), browser (Selenium), auto = api + browser cadangan "
+                         "(default auto bila FASIH_APPROVE_URL diatur, selain itu browser)")
+    ap.add_argument("--browsers", type=int, default=1,
+                    help=f"approve lewat browser: jumlah Chrome paralel (saran mesin ini: {suggested_pool_size()})")
+    ap.add_argument("--show-browser", action="store_true", help="approve: tampilkan jendela browser")
+    ap.add_argument("--rencana", action="store_true",
+                    help="approve: hanya susun rencana (status terakhir per assignment & jumlah per smallcode), tanpa approve")
+    ap.add_argument("--interval", type=float, default=PRINT_INTERVAL, help="detik antar baris progress")
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return run(args)
+    except CliError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return e.code
+    except KeyboardInterrupt:
+        print("dihentikan", file=sys.stderr)
+        return EXIT_ABORTED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+# fasih_client.py
+"""
+Klien API FASIH bersama untuk semua app (Fasih-SM, project_c).
+
+Satu tempat untuk:
+- URL endpoint & header XSRF (dulu disalin di tiap app),
+- session keep-alive dengan pool koneksi seukuran worker + AdaptiveLimiter,
+- timeout per endpoint,
+- hook instrumentasi (`REQUEST_HOOKS`, lihat fasih_metrics) dan memo metadata
+  survei/wilayah (Streamlit menjalankan ulang skrip di tiap interaksi; metadata
+  cukup diambil sekali).
+
+API BPS lain (mitra-api, webapi) memakai `MeteredSession` agar ikut terukur.
+
+`FasihClient` kompatibel dengan `requests.Session` untuk `.get/.post/.headers/.cookies`,
+jadi fungsi lama yang menerima `session` tetap jalan.
+"""
+import os
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fasih_limiter import AdaptiveAdapter, AdaptiveLimiter
+
+# FASIH_BASE_URL mengarahkan semua app/benchmark ke server lain, mis. stand-in lokal (fasih_standin)
+FASIH_BASE = os.environ.get("FASIH_BASE_URL", "https://fasih-sm.bps.go.id").rstrip("/")
+REGION_BASE = FASIH_BASE + "/region/api/v1/region"
+SURVEY_BASE = FASIH_BASE + "/survey/api/v1"
+LISTING_URL = FASIH_BASE + "/assignment-general/api/assignments/get-principal-values-by-smallest-code/{period}/{smallcode}"
+LISTING_TEMPLATE_URL = FASIH_BASE + "/assignment-general/api/assignments/get-principal-values-by-smallest-code/{period}/{template_id}/{smallcode}"
+DETAIL_URL = FASIH_BASE + "/assignment-general/api/assignment/get-by-id-with-data-for-scm?id={assignment_id}"
+HISTORY_URL = FASIH_BASE + "/assignment-general/api/assignment-history/get-by-assignment-id?assignmentId={assignment_id}"
+REVIEW_URL = FASIH_BASE + "/survey-collection/survey-review/{assignment_id}/{template_id}/{period}/a/1"
+
+DEFAULT_WORKERS = 16
+ENDPOINT_TIMEOUTS = {  # detik
+    "survey": 30,
+    "region": 20,
+    "listing": 40,
+    "detail": 40,
+    "history": 20,
+    "approve": 30,
+    "mitra_survei": 15,
+    "mitra_kegiatan": 15,
+    "mitra_list": 15,
+    "mitra_detail": 15,
+    "webapi": 10,
+    "lainnya": 40,
+}
+
+# hook(endpoint, method, url, status_code | None, detik, error | None, bytes, retries)
+# dipanggil sekali per request logis (retry di dalam adapter dihitung di `retries`)
+REQUEST_HOOKS = []
+
+
+def endpoint_of(url):
+    """Nama endpoint (kunci ENDPOINT_TIMEOUTS) dari URL."""
+    if "get-principal-values" in url:
+        return "listing"
+    if "get-by-id-with-data-for-scm" in url:
+        return "detail"
+    if "assignment-history" in url:
+        return "history"
+    if "/approve" in url:  # FASIH_APPROVE_URL (fasih_approve)
+        return "approve"
+    if "/region/api/" in url:
+        return "region"
+    if "/survey/api/" in url:
+        return "survey"
+    if "mitra-api." in url:
+        for part, name in (("/mitra/id/", "mitra_detail"), ("/mitra/list", "mitra_list"),
+                           ("/keg/list", "mitra_kegiatan"), ("/survei/list", "mitra_survei")):
+            if part in url:
+                return name
+    if "webapi.bps.go.id" in url:
+        return "webapi"
+    return "lainnya"
+
+
+def notify(endpoint, method, url, status, elapsed, error=None, hooks=(), nbytes=0, retries=0):
+    for hook in (*REQUEST_HOOKS, *hooks):
+        try:
+            hook(endpoint, method, url, status, elapsed, error, nbytes, retries)
+        except Exception:
+            pass  # instrumentasi tidak boleh menggagalkan request
+
+
+def _body_size(resp, stream=False):
+    # body sudah terbaca kecuali stream=True; jangan paksa unduh hanya demi metrik
+    if stream:
+        return int(resp.headers.get("Content-Length") or 0)
+    return len(resp.content or b"")
+
+
+def fasih_headers(cookies):
+    """Header standar FASIH; X-XSRF-TOKEN diambil dari cookie XSRF-TOKEN (dict atau jar)."""
+    xsrf_raw = cookies.get("XSRF-TOKEN", "") if cookies is not None else ""
+    return {
+        "X-Requested-With": "XMLHttpRequest",
+        "X-XSRF-TOKEN": urllib.parse.unquote(xsrf_raw) if xsrf_raw else "",
+        "Referer": FASIH_BASE + "/",
+        "User-Agent": "Mozilla/5.0",
+        "Content-Type": "application/json",
+        "Accept": "application/json, text/plain, */*",
+        "Origin": FASIH_BASE,
+    }
+
+
+def make_session(headers, cookies, max_workers=DEFAULT_WORKERS, limiter=None):
+    """Session requests dengan pool koneksi seukuran jumlah worker (keep-alive).
+    Dengan `limiter` (AdaptiveLimiter), request antre AIMD + retry 429/5xx/timeout."""
+    sess = requests.Session()
+    pool = dict(pool_connections=4, pool_maxsize=max(int(max_workers), 1))
+    adapter = AdaptiveAdapter(limiter, **pool) if limiter is not None else HTTPAdapter(**pool)
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    if headers:
+        sess.headers.update(headers)
+    if cookies is not None:
+        if isinstance(cookies, dict):
+            sess.cookies.update(cookies)
+        else:
+            # RequestsCookieJar / CookieJar: salin apa adanya (domain & path ikut)
+            for c in cookies:
+                sess.cookies.set_cookie(c)
+    return sess
+
+
+class MeteredSession(requests.Session):
+    """requests.Session biasa yang melapor ke REQUEST_HOOKS (untuk mitra-api / webapi)."""
+
+    def __init__(self, pool_size=DEFAULT_WORKERS):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(int(pool_size), 1))
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.metric_hooks = []
+
+    def request(self, method, url, *args, **kwargs):
+        endpoint = endpoint_of(url)
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = ENDPOINT_TIMEOUTS[endpoint]
+        t0 = time.monotonic()
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+        except Exception as e:
+            notify(endpoint, method, url, None, time.monotonic() - t0, e, self.metric_hooks)
+            raise
+        notify(endpoint, method, url, resp.status_code, time.monotonic() - t0, None, self.metric_hooks,
+               _body_size(resp, kwargs.get("stream")))
+        return resp
+
+
+class FasihClient:
+    """Klien FASIH ber-pool; aman dipakai banyak thread dan bisa di-pickle (file session)."""
+
+    def __init__(self, headers=None, cookies=None, max_workers=DEFAULT_WORKERS, limiter=None, adaptive=True):
+        self.max_workers = max(int(max_workers), 1)
+        if limiter is None and adaptive:
+            limiter = AdaptiveLimiter(self.max_workers)
+        self.limiter = limiter
+        if headers is None:
+            headers = fasih_headers(cookies)
+        self.sess = make_session(headers, cookies, self.max_workers, limiter)
+        self.hooks = []
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    # ---- kompatibel requests.Session ----
+    @property
+    def headers(self):
+        return self.sess.headers
+
+    @property
+    def cookies(self):
+        return self.sess.cookies
+
+    def request(self, method, url, timeout=None, **kwargs):
+        endpoint = endpoint_of(url)
+        t0 = time.monotonic()
+        try:
+            resp = self.sess.request(method, url, timeout=timeout or ENDPOINT_TIMEOUTS[endpoint], **kwargs)
+        except Exception as e:
+            notify(endpoint, method, url, None, time.monotonic() - t0, e, self.hooks,
+                   retries=getattr(e, "retries", 0))
+            raise
+        notify(endpoint, method, url, resp.status_code, time.monotonic() - t0, None, self.hooks,
+               _body_size(resp, kwargs.get("stream")), getattr(resp, "retries", 0))
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.sess.close()
+
+    def with_hooks(self, *hooks):
+        """Klien untuk satu run: pool, cookie & memo sama, hook metrik hanya terpasang di sini."""
+        run = object.__new__(type(self))
+        run.__dict__.update(self.__dict__)
+        run.hooks = self.hooks + list(hooks)
+        return run
+
+    def __getstate__(self):
+        return {"headers": dict(self.sess.headers), "cookies": self.sess.cookies, "max_workers": self.max_workers}
+
+    def __setstate__(self, state):
+        self.__init__(state["headers"], state["cookies"], state["max_workers"])
+
+    # ---- helper JSON ----
+    def get_json(self, url, **kwargs):
+        resp = self.get(url, **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _memoized(self, key, fn):
+        with self._memo_lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = fn()
+        with self._memo_lock:
+            self._memo[key] = value
+        return value
+
+    # ---- metadata (di-memo selama umur klien) ----
+    def surveys(self, survey_type="Pencacahan", page_size=100):
+        def load():
+            payload = {"pageNumber": 0, "pageSize": page_size, "sortBy": "CREATED_AT", "sortDirection": "DESC", "keywordSearch": ""}
+            resp = self.post(f"{SURVEY_BASE}/surveys/datatable?surveyType={survey_type}", json=payload)
+            resp.raise_for_status()
+            return resp.json().get("data", {}).get("content", [])
+        return self._memoized(("surveys", survey_type, page_size), load)
+
+    def survey(self, id_survey):
+        return self._memoized(("survey", id_survey), lambda: self.get_json(f"{SURVEY_BASE}/surveys/{id_survey}").get("data", {}))
+
+    def region_metadata(self, group_id):
+        """List level region (prov, kab, kec, ...) untuk regionGroupId."""
+        url = f"{REGION_BASE}-metadata?id={group_id}"
+        return self._memoized(("levels", group_id), lambda: self.get_json(url).get("data", {}).get("level", []))
+
+    def provinces(self, group_id):
+        url = f"{REGION_BASE}/level1?groupId={group_id}"
+        return self._memoized(("prov", group_id), lambda: self.get_json(url).get("data", []))
+
+    def kabupaten(self, group_id, prov_fullcode):
+        url = f"{REGION_BASE}/level2?groupId={group_id}&level1FullCode={prov_fullcode}"
+        return self._memoized(("kab", group_id, prov_fullcode), lambda: self.get_json(url).get("data", []))
+
+    def my_info(self, survey_period_id):
+        return self.get_json(f"{SURVEY_BASE}/users/myinfo?surveyPeriodId={survey_period_id}").get("data", {})
+
+    # ---- data assignment ----
+    def principal_values(self, survey_period_id, smallcode, template_id=None):
+        """Listing assignment; coba URL dengan template_id dulu bila diberikan."""
+        urls = [LISTING_URL.format(period=survey_period_id, smallcode=smallcode)]
+        if template_id:
+            urls.insert(0, LISTING_TEMPLATE_URL.format(period=survey_period_id, template_id=template_id, smallcode=smallcode))
+        for url in urls:
+            resp = self.get(url)
+            if resp.ok and resp.content.strip():
+                try:
+                    return resp.json().get("data", []) or []
+                except ValueError:
+                    pass
+        return []
+
+    def history(self, assignment_id):
+        return self.get_json(HISTORY_URL.format(assignment_id=assignment_id))
+
@@ -0,0 +1,167 @@
+# fasih_columns.py
+"""
+Buffer kolom untuk meratakan jawaban assignment tanpa DataFrame per baris.
+
+Kolom dipelajari dari baris yang masuk (atau diberikan di awal); nilai tiap baris
+langsung ditaruh ke kolom yang sudah dialokasikan. Kolom yang isinya int / float
+disimpan di `array('q')` / `array('d')` + mask terisi (bytearray), kolom lain di list;
+kolom angka yang ketemu nilai bertipe lain diturunkan jadi list. Hasilnya dijadikan
+DataFrame / tabel Arrow dalam satu langkah, bukan `pd.concat` ribuan DataFrame
+satu baris.
+"""
+from array import array
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    pyarrow_ok = True
+except Exception:
+    pyarrow_ok = False
+
+DEFAULT_CAPACITY = 1024
+
+_OBJ = "o"                                # kolom list biasa
+_TYPECODE = {int: "q", float: "d"}        # tipe python -> typecode array
+_DTYPE = {"q": np.int64, "d": np.float64}
+
+
+class ColumnBuffer:
+    """
+    Kumpulan kolom berukuran `capacity` (diperbesar 2x bila penuh).
+    Kolom baru yang muncul belakangan ditambahkan dan baris sebelumnya kosong.
+    Tipe kolom (`kinds`): None = belum ada nilai, "q"/"d" = array angka, "o" = list.
+    """
+
+    def __init__(self, columns=(), capacity=DEFAULT_CAPACITY):
+        self.capacity = max(int(capacity), 1)
+        self.cols = {}
+        self.kinds = {}
+        self.masks = {}   # hanya kolom array: 1 = terisi, 0 = kosong
+        self.n = 0
+        for c in columns:
+            self._add(c)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def columns(self):
+        return list(self.cols)
+
+    def _add(self, name):
+        col = self.cols[name] = [None] * self.capacity
+        self.kinds[name] = None
+        return col
+
+    def _typed(self, name, code):
+        """Kolom yang masih kosong semua -> array angka."""
+        self.cols[name] = array(code, bytes(8 * self.capacity))
+        self.masks[name] = bytearray(self.capacity)
+        self.kinds[name] = code
+
+    def _to_object(self, name):
+        col, mask = self.cols[name], self.masks.pop(name)
+        self.cols[name] = [v if m else None for v, m in zip(col, mask)]
+        self.kinds[name] = _OBJ
+
+    def _put(self, name, i, v):
+        """Isi sel kolom yang belum / sudah bertipe angka."""
+        code, t = self.kinds[name], type(v)
+        if t is float and v != v:  # NaN = kosong
+            return
+        want = _TYPECODE.get(t)  # bool sengaja tidak masuk (type(True) is bool)
+        if code is None:
+            if want is None:
+                self.kinds[name] = _OBJ
+                self.cols[name][i] = v
+                return
+            self._typed(name, want)
+        elif want is None:
+            self._to_object(name)
+            self.cols[name][i] = v
+            return
+        elif want == "d" and code == "q":
+            self.cols[name] = array("d", self.cols[name])
+            self.kinds[name] = "d"
+        try:
+            self.cols[name][i] = v
+        except OverflowError:  # int di luar int64
+            self._to_object(name)
+            self.cols[name][i] = v
+            return
+        self.masks[name][i] = 1
+
+    def _grow(self):
+        cap = self.capacity
+        extra = [None] * cap
+        for name, col in self.cols.items():
+            if name in self.masks:
+                col.frombytes(bytes(8 * cap))
+                self.masks[name].extend(bytes(cap))
+            else:
+                col.extend(extra)
+        self.capacity *= 2
+
+    def append(self, row):
+        """Tambah satu baris dari dict {kolom: nilai}."""
+        if self.n == self.capacity:
+            self._grow()
+        cols, kinds, i = self.cols, self.kinds, self.n
+        for k, v in row.items():
+            col = cols.get(k)
+            if col is None:
+                col = self._add(k)
+            if v is None:
+                continue
+            if kinds[k] == _OBJ:
+                col[i] = v
+            else:
+                self._put(k, i, v)
+        self.n += 1
+
+    def clear(self):
+        """Kosongkan baris, kolom (dan tipenya) yang sudah dipelajari tetap."""
+        for name in self.cols:
+            if name in self.masks:
+                self._typed(name, self.kinds[name])
+            else:
+                self.cols[name] = [None] * self.capacity
+        self.n = 0
+
+    def _numbers(self, name):
+        """(nilai numpy salinan, mask kosong) untuk kolom array."""
+        col, n = self.cols[name], self.n
+        vals = np.frombuffer(col, dtype=_DTYPE[col.typecode], count=n).copy()
+        return vals, np.frombuffer(self.masks[name], dtype=np.uint8, count=n) == 0
+
+    def to_frame(self):
+        """DataFrame; kolom int yang ada kosongnya jadi float NaN (sama seperti pandas)."""
+        data = {}
+        for name, col in self.cols.items():
+            if name not in self.masks:
+                data[name] = col[:self.n]
+                continue
+            vals, null = self._numbers(name)
+            if null.any():
+                vals = vals.astype(np.float64)
+                vals[null] = np.nan
+            data[name] = vals
+        return pd.DataFrame(data, columns=list(self.cols))
+
+    def to_arrow(self):
+        """Tabel Arrow; kolom list bertipe campuran dijadikan string."""
+        n = self.n
+        arrays = []
+        for name, col in self.cols.items():
+            if name in self.masks:
+                vals, null = self._numbers(name)
+                arrays.append(pa.array(vals, mask=null))
+                continue
+            vals = col[:n]
+            try:
+                arrays.append(pa.array(vals, from_pandas=True))
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                arrays.append(pa.array([None if v is None else str(v) for v in vals], type=pa.string()))
+        return pa.Table.from_arrays(arrays, names=list(self.cols))
@@ -0,0 +1,157 @@
+# fasih_detail_cache.py
+"""
+Cache disk detail assignment (get-by-id-with-data-for-scm), dialamatkan oleh isi.
+
+Kunci = sha1(assignment_id + stempel versi). Stempel diambil dari baris listing
+(sidik jari yang sama dengan sinkron inkremental), jadi assignment yang berubah
+otomatis mendapat kunci baru; entri versi lama tinggal menunggu tergusur.
+
+Satu file terkompresi (zlib) per entri di `cached_data/detail/<2 hex>/<kunci>.z`.
+Waktu modifikasi file dipakai sebagai penanda LRU: disentuh saat dibaca, dan
+entri terlama dihapus bila total ukuran melewati `max_bytes`.
+
+Dipakai bersama oleh semua alur yang butuh detail (fetcher thread/async, dan
+loop serial di project_c).
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import zlib
+
+from fasih_client import DETAIL_URL
+from fasih_fetch import check_status, decode_detail_answers
+from fasih_sync import listing_fingerprint
+
+CACHE_DIR = os.path.join("cached_data", "detail")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+EVICT_TO = 0.9  # setelah penggusuran, sisakan 90% dari batas
+COMPRESS_LEVEL = 6
+
+
+def detail_stamp(row):
+    """Stempel versi assignment dari baris listing (status & metadata modifikasi ikut)."""
+    return listing_fingerprint(row)
+
+
+def detail_key(assignment_id, stamp):
+    return hashlib.sha1(f"{assignment_id}\n{stamp}".encode("utf-8")).hexdigest()
+
+
+def fetch_assignment_content(sess, assignment_id, timeout=None):
+    """Body mentah respons detail (bytes)."""
+    resp = sess.get(DETAIL_URL.format(assignment_id=assignment_id), timeout=timeout)
+    check_status(resp.status_code, "detail")
+    return resp.content
+
+
+class DetailCache:
+    """Cache detail assignment; aman dipakai banyak thread."""
+
+    def __init__(self, folder=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._size = None  # dihitung saat put pertama
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], key + ".z")
+
+    # ---- entri ----
+    def get(self, assignment_id, stamp):
+        """Bytes detail bila ada di cache, selain itu None."""
+        path = self._path(detail_key(assignment_id, stamp))
+        try:
+            with open(path, "rb") as f:
+                content = zlib.decompress(f.read())
+            os.utime(path)  # LRU: mtime = terakhir dipakai
+        except (OSError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def put(self, assignment_id, stamp, content):
+        path = self._path(detail_key(assignment_id, stamp))
+        if os.path.exists(path):
+            return
+        blob = zlib.compress(content, COMPRESS_LEVEL)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(blob)
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def _entries(self):
+        out = []
+        if not os.path.isdir(self.folder):
+            return out
+        for sub in os.scandir(self.folder):
+            if not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                if e.name.endswith(".z"):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    out.append((e.path, st.st_size, st.st_mtime))
+        return out
+
+    def evict(self):
+        """Hapus entri yang paling lama tidak dipakai sampai ukuran <= EVICT_TO * max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * EVICT_TO
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evicted += 1
+            self._size = total
+
+    # ---- ambil-atau-unduh ----
+    def answers(self, sess, row, timeout=None):
+        """List answers untuk baris listing `row`; dari disk bila versinya sama, selain itu dari API."""
+        aid, stamp = row.get("assignmentId"), detail_stamp(row)
+        content = self.get(aid, stamp)
+        if content is not None:
+            return decode_detail_answers(content)
+        content = fetch_assignment_content(sess, aid, timeout)
+        answers = decode_detail_answers(content)  # hanya payload yang valid yang disimpan
+        self.put(aid, stamp, content)
+        return answers
+
+    async def answers_async(self, client, row):
+        """Versi AsyncFasihClient; I/O disk dijalankan di thread agar event loop tidak tertahan."""
+        aid, stamp = row.get("assignmentId"), detail_stamp(row)
+        content = await asyncio.to_thread(self.get, aid, stamp)
+        if content is not None:
+            return decode_detail_answers(content)
+        content = await client.get_bytes(DETAIL_URL.format(assignment_id=aid))
+        answers = decode_detail_answers(content)
+        await asyncio.to_thread(self.put, aid, stamp, content)
+        return answers
+
+    # ---- laporan ----
+    def text(self):
+        total = self.hits + self.misses
+        return f"cache detail {self.hits}/{total}" if total else "cache detail 0"
@@ -0,0 +1,377 @@
+# fasih_fetch.py
+"""
+Pipeline paralel pengambilan raw data FASIH: listing assignment per smallcode
+(get-principal-values-by-smallest-code) lalu detail tiap assignment
+(get-by-id-with-data-for-scm).
+
+Semua fungsi di sini murni (tidak menyentuh st.session_state / global), jadi
+aman dijalankan dari thread worker. Progress dikirim lewat `queue.Queue`
+untuk dibaca thread Streamlit.
+"""
+import json
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from fasih_client import DETAIL_URL, LISTING_URL, FasihClient
+from fasih_limiter import AdaptiveLimiter
+
+try:
+    import orjson
+    orjson_ok = True
+except Exception:
+    orjson_ok = False
+
+DEFAULT_FETCH_WORKERS = 8
+BACKLOG_PER_WORKER = 4  # baris belum diteruskan ke sink per worker sebelum listing baru ditahan
+
+
+class SessionExpired(RuntimeError):
+    """401/403 dari FASIH: cookie/XSRF sudah tidak berlaku, run harus dihentikan."""
+
+
+def check_status(status_code, what):
+    if status_code in (401, 403):
+        raise SessionExpired(f"{what} HTTP {status_code} (sesi login habis?)")
+    if status_code != 200:
+        raise RuntimeError(f"{what} HTTP {status_code}")
+
+
+def json_loads(data):
+    """Decode JSON (bytes/str); pakai orjson bila terpasang."""
+    return orjson.loads(data) if orjson_ok else json.loads(data)
+
+
+def fetch_principal_values(sess, survey_period_id, smallcode, timeout=None):
+    """Daftar assignment (principal values) untuk satu smallcode."""
+    resp = sess.get(LISTING_URL.format(period=survey_period_id, smallcode=smallcode), timeout=timeout)
+    check_status(resp.status_code, "listing")
+    if not resp.content.strip():
+        return []
+    return json_loads(resp.content).get("data", []) or []
+
+
+def flatten_answers(answers):
+    """{dataKey: value} dari list answers; `value` diutamakan, lalu `dataValue`."""
+    flat = {}
+    for a in answers:
+        flat[a.get("dataKey")] = a.get("value") if "value" in a else a.get("dataValue")
+    return flat
+
+
+def parse_detail_answers(detail_json):
+    """Ambil list answers dari payload detail (data.data bisa berupa string JSON)."""
+    data = detail_json.get("data")
+    inner = data.get("data") if isinstance(data, dict) else data
+    if isinstance(inner, str):
+        inner = json_loads(inner)
+    elif not isinstance(inner, dict):
+        inner = data if isinstance(data, dict) else {}
+    return inner.get("answers", []) or []
+
+
+def decode_detail_answers(content):
+    """Bytes respons detail → list answers; payload luar & `data.data` di-decode
+    langsung dari bytes (tanpa resp.json() / resp.text)."""
+    return parse_detail_answers(json_loads(content))
+
+
+def fetch_assignment_answers(sess, assignment_id, timeout=None):
+    resp = sess.get(DETAIL_URL.format(assignment_id=assignment_id), timeout=timeout)
+    check_status(resp.status_code, "detail")
+    return flatten_answers(decode_detail_answers(resp.content))
+
+
+class ResultCollector:
+    """Sink default: kumpulkan listing & jawaban di memori."""
+
+    def __init__(self):
+        self.assignments = []
+        self.answers = []
+
+    def listing(self, smallcode, rows, err):
+        self.assignments.extend(rows)
+
+    def assignment(self, smallcode, row, answer, err):
+        if answer is not None:
+            self.answers.append(answer)
+
+
+class OrderedEmitter:
+    """
+    Teruskan hasil ke sink sesuai urutan smallcode & listing walau selesainya acak.
+    Hanya hasil yang mendahului antrean yang ditahan; `held` = baris listing yang
+    sudah diterima tapi belum diteruskan (dipakai fetcher untuk menahan listing
+    baru agar memori tidak ikut besar bila satu smallcode awal lambat).
+
+    Sink: `listing(smallcode, rows, err)` lalu `assignment(smallcode, row, answer, err)`
+    untuk tiap baris listing (answer None bila dilewati / gagal).
+    """
+
+    def __init__(self, smallcodes, sink):
+        self.smallcodes = smallcodes
+        self.sink = sink
+        self._listings = {}  # i → rows
+        self._results = {}   # (i, j) → (answer, err)
+        self._i = 0
+        self._j = 0
+        self._sent = False
+        self.closed = False
+        self.held = 0
+
+    def close(self):
+        """Berhenti meneruskan apa pun ke sink (run dihentikan)."""
+        self.closed = True
+
+    def listing(self, i, rows, err=None):
+        self._listings[i] = (rows, err)
+        self.held += len(rows)
+        self._drain()
+
+    def result(self, i, j, answer, err=None):
+        self._results[(i, j)] = (answer, err)
+        self._drain()
+
+    def _drain(self):
+        while not self.closed and self._i in self._listings:
+            rows, err = self._listings[self._i]
+            sc = self.smallcodes[self._i]
+            if not self._sent:
+                self.sink.listing(sc, rows, err)
+                self._sent = True
+            while not self.closed and self._j < len(rows) and (self._i, self._j) in self._results:
+                answer, e = self._results.pop((self._i, self._j))
+                self.sink.assignment(sc, rows[self._j], answer, e)
+                self._j += 1
+                self.held -= 1
+            if self.closed or self._j < len(rows):
+                return
+            del self._listings[self._i]
+            self._i, self._j, self._sent = self._i + 1, 0, False
+
+
+class AssignmentFetcher:
+    """
+    Ambil listing + detail assignment secara paralel di thread latar.
+
+    Listing dibatasi `max_workers` yang sedang berjalan sehingga detail dari
+    smallcode yang sudah selesai langsung ikut antre (tidak menunggu semua
+    listing). Listing baru juga ditahan selama baris yang belum diteruskan ke
+    sink (antre detail + hasil yang menunggu smallcode sebelumnya) melebihi
+    BACKLOG_PER_WORKER x `max_workers`, jadi memori tidak tumbuh dengan ukuran
+    survei. Event di `self.events`:
+
+    - ("listing", smallcode, jumlah_assignment, error)
+    - ("detail", smallcode, assignment_id, error)
+    - ("skip", smallcode, assignment_id, None)  — detail tidak diambil (`need_detail` False)
+    - ("done", None, None, None)
+
+    Hasil diteruskan berurutan ke `sink` (lihat OrderedEmitter; mis.
+    fasih_writer.ExportSink untuk tulis streaming ke disk). Tanpa sink, hasil
+    dikumpulkan di `assignments` & `answers` setelah event "done". Detail yang
+    gagal dicatat di `failed`.
+
+    401/403 (SessionExpired) atau `stop()` menghentikan run: tidak ada pekerjaan
+    baru dan tidak ada lagi yang diteruskan ke sink; alasannya di `aborted`.
+
+    `need_detail(baris_listing) -> bool` (opsional, dipanggil dari thread koordinator)
+    dipakai sinkron inkremental untuk melewati assignment yang tidak berubah.
+    `cache` (fasih_detail_cache.DetailCache, opsional) melayani detail dari disk
+    bila versi assignment di listing belum berubah.
+    `hooks`: hook instrumentasi request khusus run ini (mis. fasih_metrics.HttpMetrics).
+    """
+
+    def __init__(self, sess, headers, survey_period_id, max_workers=DEFAULT_FETCH_WORKERS, timeout=None,
+                 need_detail=None, sink=None, cache=None, hooks=()):
+        self.need_detail = need_detail
+        self.cache = cache
+        self.hooks = tuple(hooks)
+        self.sink = sink if sink is not None else ResultCollector()
+        self.max_workers = max(int(max_workers), 1)
+        self.sess, self.limiter = self._connect(sess, headers)
+        self.survey_period_id = survey_period_id
+        self.timeout = timeout
+        self.events = queue.Queue()
+        self.assignments = []
+        self.answers = []
+        self.failed = []  # (smallcode, assignment_id | None, pesan error)
+        self.aborted = None
+        self._stop = threading.Event()
+        self._emit = None
+        self._thread = None
+
+    def _connect(self, sess, headers):
+        """Klien khusus worker: pool koneksi seukuran worker, cookie & header disalin, timeout per endpoint."""
+        limiter = AdaptiveLimiter(self.max_workers)
+        client = FasihClient(headers or dict(sess.headers), sess.cookies, self.max_workers, limiter=limiter)
+        client.hooks.extend(self.hooks)
+        return client, limiter
+
+    def start(self, smallcodes):
+        smallcodes = list(smallcodes)
+        self._emit = OrderedEmitter(smallcodes, self.sink)
+        self._thread = threading.Thread(target=self._run, args=(smallcodes,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, reason="dihentikan"):
+        if self.aborted is None:
+            self.aborted = reason
+        self._stop.set()
+        self._emit.close()
+
+    def iter_events(self, poll=0.2):
+        """Dipanggil dari thread Streamlit; berhenti setelah event "done".
+        Bila loop pemanggil putus (rerun Streamlit), run ikut dihentikan."""
+        finished = False
+        try:
+            while True:
+                try:
+                    ev = self.events.get(timeout=poll)
+                except queue.Empty:
+                    continue
+                if ev[0] == "done":
+                    self._thread.join()
+                    finished = True
+                    return
+                yield ev
+        finally:
+            if not finished:
+                self.stop()
+
+    def _listing(self, smallcode):
+        return fetch_principal_values(self.sess, self.survey_period_id, smallcode, self.timeout)
+
+    def _detail(self, row):
+        if self.cache is not None:
+            return flatten_answers(self.cache.answers(self.sess, row, self.timeout))
+        return fetch_assignment_answers(self.sess, row.get("assignmentId"), self.timeout)
+
+    def _run(self, smallcodes):
+        emit = self._emit
+        todo = iter(enumerate(smallcodes))
+        pending = {}
+        listings_in_flight = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                def feed_listings():
+                    nonlocal listings_in_flight
+                    while listings_in_flight < self.max_workers and not self._stop.is_set():
+                        if pending and emit.held > BACKLOG_PER_WORKER * self.max_workers:
+                            return  # tunggu detail yang antre diteruskan ke sink dulu
+                        nxt = next(todo, None)
+                        if nxt is None:
+                            return
+                        i, sc = nxt
+                        pending[pool.submit(self._listing, sc)] = ("listing", i, sc)
+                        listings_in_flight += 1
+
+                feed_listings()
+                while pending:
+                    if self._stop.is_set():
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        kind, *key = pending.pop(fut)
+                        if kind == "listing":
+                            i, sc = key
+                            listings_in_flight -= 1
+                            try:
+                                data = fut.result()
+                            except SessionExpired as e:
+                                self.stop(str(e))
+                                continue
+                            except Exception as e:
+                                self.failed.append((sc, None, str(e)))
+                                self.events.put(("listing", sc, 0, e))
+                                emit.listing(i, [], e)
+                                continue
+                            self.events.put(("listing", sc, len(data), None))
+                            emit.listing(i, data)
+                            for j, d in enumerate(data):
+                                aid = d.get("assignmentId")
+                                if self.need_detail is not None and not self.need_detail(d):
+                                    self.events.put(("skip", sc, aid, None))
+                                    emit.result(i, j, None)
+                                    continue
+                                pending[pool.submit(self._detail, d)] = ("detail", i, j, sc, aid)
+                        else:
+                            i, j, sc, aid = key
+                            try:
+                                flat = fut.result()
+                            except SessionExpired as e:
+                                self.stop(str(e))
+                                continue
+                            except Exception as e:
+                                self.failed.append((sc, aid, str(e)))
+                                self.events.put(("detail", sc, aid, e))
+                                emit.result(i, j, None, e)
+                                continue
+                            flat["assignment_id"] = aid
+                            flat["smallCode"] = sc
+                            emit.result(i, j, flat)
+                            self.events.put(("detail", sc, aid, None))
+                    feed_listings()
+        except Exception as e:
+            self.failed.append((None, None, str(e)))
+        finally:
+            if isinstance(self.sink, ResultCollector):
+                self.assignments, self.answers = self.sink.assignments, self.sink.answers
+            self.sess.close()
+            self.events.put(("done", None, None, None))
+
+
+class FetchProgress:
+    """Hitungan progress sederhana (dipakai UI): smallcode, assignment, error, laju."""
+
+    def __init__(self, total_smallcodes, limiter=None, cache=None):
+        self.total = total_smallcodes
+        self.limiter = limiter
+        self.cache = cache
+        self.listed = 0
+        self.assign_total = 0
+        self.detail_done = 0
+        self.reused = 0
+        self.errors = 0
+        self.start = time.time()
+
+    def update(self, ev):
+        kind, _, n_or_id, err = ev
+        if kind == "listing":
+            self.listed += 1
+            self.assign_total += n_or_id if not err else 0
+        elif kind == "detail":
+            self.detail_done += 1
+        elif kind == "skip":
+            self.reused += 1
+        if err:
+            self.errors += 1
+
+    @property
+    def rate(self):
+        elapsed = time.time() - self.start
+        return self.detail_done / elapsed if elapsed > 0 else 0.0
+
+    def fraction(self):
+        # listing berbobot 1, detail berbobot 1 → progress naik halus
+        denom = self.total + self.assign_total
+        return (self.listed + self.detail_done + self.reused) / denom if denom else 1.0
+
+    def eta(self):
+        """Perkiraan sisa detik (None bila belum bisa dihitung). Jumlah assignment baru
+        diketahui setelah listing, jadi perkiraan awal cenderung terlalu kecil."""
+        frac = self.fraction()
+        if frac <= 0 or frac >= 1:
+            return None
+        return (time.time() - self.start) * (1 - frac) / frac
+
+    def text(self):
+        text = (f"SLS {self.listed}/{self.total} • assignment {self.detail_done + self.reused}/{self.assign_total}"
+                f" • {self.rate:.1f} assignment/detik • error {self.errors}")
+        eta = self.eta()
+        text += f" • sisa ~{int(eta // 60)}m {int(eta % 60)}s" if eta is not None else ""
+        text += f" • tidak berubah {self.reused}" if self.reused else ""
+        text += f" • {self.cache.text()}" if self.cache is not None else ""
+        return text + (f" • {self.limiter.text()}" if self.limiter is not None else "")
@@ -0,0 +1,95 @@
+# fasih_history.py
+"""
+Resolver riwayat status assignment (assignment-history/get-by-assignment-id)
+yang paralel dan ber-cache selama satu run.
+
+Dulu riwayat diambil satu per satu untuk tiap baris (getLastHistory), jadi
+jumlah request per run dua kali lipat dan semuanya menunggu berurutan. Di sini:
+
+- `submit(ids)` langsung mengantre semua id di thread pool (tidak menunggu),
+  jadi riwayat satu smallcode sudah jalan selagi detail/aksi lain berlangsung;
+- `status(aid)` menunggu satu id (dari cache bila sudah ada);
+- `status_column(ids)` memberi kolom status terakhir sekaligus (pd.Series),
+  untuk diisikan ke DataFrame hasil di akhir run.
+
+Cara membaca status terakhir dari JSON riwayat bisa diganti lewat `status_of`
+karena tiap app punya parser sendiri.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from fasih_client import HISTORY_URL
+from fasih_fetch import check_status, json_loads
+
+HISTORY_WORKERS = 16
+
+
+def latest_status(history_json):
+    """Status terakhir dari JSON riwayat; "Open" bila belum ada riwayat."""
+    items = (history_json or {}).get("data") or []
+    if not items:
+        return "Open"
+    last = items[-1]
+    return last.get("status_alias") or last.get("statusName") or last.get("status") or ""
+
+
+class HistoryResolver:
+    """Status terakhir assignment, diambil paralel lewat `sess` (FasihClient) dan di-cache per run."""
+
+    def __init__(self, sess, max_workers=HISTORY_WORKERS, status_of=latest_status, timeout=None):
+        self.sess = sess
+        self.status_of = status_of
+        self.timeout = timeout
+        self.errors = {}  # assignment_id → exception
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(int(max_workers), 1))
+
+    def _fetch(self, assignment_id):
+        resp = self.sess.get(HISTORY_URL.format(assignment_id=assignment_id), timeout=self.timeout)
+        check_status(resp.status_code, "riwayat")
+        return self.status_of(json_loads(resp.content) if resp.content.strip() else {})
+
+    def submit(self, assignment_ids):
+        """Antrekan id yang belum pernah diminta; tidak menunggu hasil."""
+        with self._lock:
+            for aid in assignment_ids:
+                if aid and aid not in self._futures:
+                    self._futures[aid] = self._pool.submit(self._fetch, aid)
+
+    def prefetch(self, assignment_ids):
+        """Seperti submit, tapi tunggu sampai semua id selesai."""
+        self.submit(assignment_ids)
+        wait([self._futures[a] for a in assignment_ids if a])
+
+    def status(self, assignment_id, default=""):
+        if not assignment_id:
+            return default
+        self.submit([assignment_id])
+        try:
+            return self._futures[assignment_id].result()
+        except Exception as e:
+            self.errors[assignment_id] = e
+            return default
+
+    def status_column(self, assignment_ids, default=""):
+        """pd.Series status terakhir yang sejajar dengan `assignment_ids` (list/Series)."""
+        ids = pd.Series(assignment_ids)
+        uniq = [a for a in ids.dropna().unique()]
+        self.submit(uniq)
+        mapping = {a: self.status(a, default) for a in uniq}
+        return ids.map(mapping).fillna(default)
+
+    def summary(self):
+        return f"riwayat {len(self._futures)} assignment • gagal {len(self.errors)}"
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
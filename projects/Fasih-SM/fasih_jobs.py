@@ -0,0 +1,255 @@
+# fasih_jobs.py
+"""
+Job latar untuk pekerjaan panjang (ambil raw data, approve) agar tidak putus
+saat Streamlit rerun / tab ditinggal.
+
+- `JobRunner` hidup sekali per proses server (simpan lewat `st.cache_resource`)
+  dan menjalankan job di thread pool dengan batas job bersamaan `max_jobs`
+  untuk seluruh server; job lain menunggu sebagai "queued".
+- State tiap job (status, progress, teks, log, file output) disimpan ke
+  `cached_data/jobs/<id>.json`, jadi UI cukup membaca dan menggambar ulang.
+  Job yang masih running/queued saat server mati ditandai "interrupted"
+  (ambil raw data bisa dilanjutkan lewat jurnal run).
+- Fungsi job menerima argumen kata kunci `ui`: `JobUI` meniru bagian st.* yang
+  dipakai fungsi-fungsi app (progress, empty().text, write, info, warning, ...),
+  jadi fungsi yang sama bisa jalan inline (`ui=st`) maupun di latar.
+
+Modul ini tidak meng-import streamlit.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+
+JOBS_DIR = os.path.join("cached_data", "jobs")
+DEFAULT_MAX_JOBS = 2
+SAVE_INTERVAL = 1.0  # detik; simpan progress paling sering sekali per detik
+LOG_LINES = 200
+ACTIVE = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Dilempar dari JobUI saat job dibatalkan; fungsi job berhenti di titik progress berikutnya."""
+
+
+def _atomic_json(obj, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, default=str)
+    os.replace(tmp, path)
+
+
+class Job:
+    FIELDS = ("id", "kind", "title", "status", "progress", "text", "log", "outputs", "error",
+              "created_at", "started_at", "finished_at")
+
+    def __init__(self, folder, kind, title, job_id=None):
+        self.folder = folder
+        self.id = job_id or datetime.now().strftime("%Y%m%d_%H%M%S_") + uuid.uuid4().hex[:6]
+        self.kind = kind
+        self.title = title
+        self.status = "queued"
+        self.progress = 0.0
+        self.text = ""
+        self.log = []
+        self.outputs = []
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._saved = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.folder, f"{self.id}.json")
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, folder, d):
+        job = cls(folder, d.get("kind"), d.get("title"), d.get("id"))
+        for k in cls.FIELDS:
+            if k in d:
+                setattr(job, k, d[k])
+        return job
+
+    def save(self, force=True):
+        now = time.time()
+        if not force and now - self._saved < SAVE_INTERVAL:
+            return
+        with self._lock:
+            self._saved = now
+            _atomic_json(self.to_dict(), self.path)
+
+    # ---- dipanggil dari JobUI ----
+    def set_progress(self, value):
+        if self.cancel_event.is_set():
+            raise JobCancelled("dibatalkan")
+        self.progress = max(0.0, min(float(value), 1.0))
+        self.save(force=False)
+
+    def set_text(self, text):
+        self.text = str(text)
+        self.save(force=False)
+
+    def add_log(self, level, msg):
+        self.log = (self.log + [f"{time.strftime('%H:%M:%S')} [{level}] {msg}"])[-LOG_LINES:]
+        self.save(force=False)
+
+    @property
+    def elapsed(self):
+        if not self.started_at:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobUI:
+    """Pengganti `st` di dalam job; semua keluaran masuk ke state `job`."""
+
+    def __init__(self, job):
+        self.job = job
+
+    # st.progress(x) → objek dengan .progress(x); st.empty() → objek dengan .text/.write
+    def progress(self, value=0, text=None):
+        # st.progress menerima int 0..100 atau float 0..1
+        self.job.set_progress(value / 100 if isinstance(value, int) else value)
+        if text:
+            self.job.set_text(text)
+        return self
+
+    def empty(self):
+        return self
+
+    def text(self, body):
+        self.job.set_text(body)
+
+    def write(self, *args, **kwargs):
+        self.job.add_log("info", " ".join(str(a) for a in args))
+
+    def info(self, body, **kwargs):
+        self.job.add_log("info", body)
+
+    def caption(self, body, **kwargs):
+        self.job.add_log("info", body)
+
+    def success(self, body, **kwargs):
+        self.job.add_log("ok", body)
+
+    def warning(self, body, **kwargs):
+        self.job.add_log("warning", body)
+
+    def error(self, body, **kwargs):
+        self.job.add_log("error", body)
+
+    def spinner(self, text="", **kwargs):
+        if text:
+            self.job.set_text(text)
+        return nullcontext()
+
+    # widget tampilan: diabaikan di latar, file hasil muncul di panel job
+    def dataframe(self, *args, **kwargs):
+        pass
+
+    def download_button(self, *args, **kwargs):
+        return False
+
+
+def _paths(result):
+    if isinstance(result, str):
+        return [result] if os.path.exists(result) else []
+    if isinstance(result, (list, tuple)):
+        return [p for r in result for p in _paths(r)]
+    return []
+
+
+class JobRunner:
+    """Antrean job bersama satu server; maksimal `max_jobs` job berjalan bersamaan."""
+
+    def __init__(self, folder=JOBS_DIR, max_jobs=DEFAULT_MAX_JOBS):
+        self.folder = folder
+        self.max_jobs = max(int(max_jobs), 1)
+        os.makedirs(folder, exist_ok=True)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="fasih-job")
+        self._load()
+
+    def _load(self):
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.folder, name), encoding="utf-8") as f:
+                    job = Job.from_dict(self.folder, json.load(f))
+            except Exception:
+                continue
+            if job.status in ACTIVE:
+                # server sempat mati di tengah job
+                job.status, job.finished_at = "interrupted", job.finished_at or time.time()
+                job.save()
+            self._jobs[job.id] = job
+
+    def submit(self, kind, title, fn, *args, **kwargs):
+        """Jalankan `fn(*args, ui=JobUI(job), **kwargs)` di latar; kembalikan Job."""
+        job = Job(self.folder, kind, title)
+        job.save()
+        with self._lock:
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.status, job.finished_at = "cancelled", time.time()
+            job.save()
+            return
+        job.status, job.started_at = "running", time.time()
+        job.save()
+        try:
+            result = fn(*args, ui=JobUI(job), **kwargs)
+            job.outputs = _paths(result)
+            job.status, job.progress = "done", 1.0
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+            job.add_log("error", traceback.format_exc(limit=3))
+        finally:
+            job.finished_at = time.time()
+            job.save()
+
+    # ---- baca / kontrol dari UI ----
+    def jobs(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def active(self):
+        return [j for j in self.jobs() if j.status in ACTIVE]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None and job.status in ACTIVE:
+            job.cancel_event.set()
+
+    def forget_finished(self):
+        """Hapus job yang sudah selesai dari daftar (file output tetap ada)."""
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.status not in ACTIVE:
+                    del self._jobs[job_id]
+                    try:
+                        os.remove(job.path)
+                    except OSError:
+                        pass
@@ -0,0 +1,143 @@
+# fasih_journal.py
+"""
+Jurnal run "Ambil Raw Data" agar run yang terputus (refresh browser, rerun
+Streamlit, cookie habis) bisa dilanjutkan.
+
+Hasil fetcher sudah mengalir berurutan (OrderedEmitter) ke folder part, jadi
+yang perlu dicatat hanya posisi terakhir yang sudah aman di disk: smallcode yang
+selesai, assignment_id yang sudah tertulis dari smallcode yang sedang berjalan,
+dan jumlah file part per folder. Part yang ditulis setelah checkpoint terakhir
+dibuang saat melanjutkan, jadi tidak ada baris ganda.
+"""
+import hashlib
+import json
+import os
+import time
+
+from fasih_writer import part_files
+
+RUNS_DIR = ".runs"
+CHECKPOINT_INTERVAL = 30.0  # detik
+
+
+def _atomic_json(obj, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+class RunJournal:
+    """
+    Sink pembungkus ExportSink yang mencatat progres run ke
+    `<output_dir>/.runs/<kab>_<periode>_<hash smallcode>.json`.
+
+    Pakai: `journal.resumable` → `journal.remaining(smallcodes)` untuk daftar yang
+    belum selesai, `need_detail` sebagai predikat fetcher, `wrap(export)` sebagai
+    sink, lalu `checkpoint()` bila run terhenti atau `finish()` bila selesai.
+    """
+
+    def __init__(self, output_dir, nama_kab, survey_period_id, smallcodes, interval=CHECKPOINT_INTERVAL):
+        key = hashlib.sha1("\n".join(map(str, smallcodes)).encode("utf-8")).hexdigest()[:10]
+        self.path = os.path.join(output_dir, RUNS_DIR, f"{nama_kab}_{survey_period_id}_{key}.json")
+        self.interval = interval
+        self.state = None
+        self.inner = None
+        self._last = time.time()
+        self._skip_ids = set()
+        self._skip_listing = None
+        self._remaining = {}  # smallcode → baris listing yang belum tertulis
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.state = json.load(f)
+            except Exception:
+                self.state = None  # jurnal rusak → mulai baru
+
+    @property
+    def resumable(self):
+        return self.state is not None and os.path.isdir(self.state.get("answers_dir", ""))
+
+    def start(self, answers_dir, assign_dir, timestamp):
+        self.state = {
+            "answers_dir": answers_dir, "assign_dir": assign_dir, "timestamp": timestamp,
+            "parts": {"answers": 0, "assign": 0},
+            "done": [], "current": None, "current_ids": [],
+            "started_at": time.time(), "updated_at": time.time(),
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        _atomic_json(self.state, self.path)
+
+    def resume(self):
+        """Buang part yang lebih baru dari checkpoint; siapkan lewati assignment yang sudah tertulis."""
+        for folder, name in ((self.state["answers_dir"], "answers"), (self.state["assign_dir"], "assign")):
+            for path in part_files(folder)[self.state["parts"][name]:]:
+                os.remove(path)
+        self._skip_listing = self.state.get("current")
+        self._skip_ids = set(self.state.get("current_ids", []))
+        return self.state
+
+    def remaining(self, smallcodes):
+        done = set(self.state["done"])
+        return [sc for sc in smallcodes if str(sc) not in done]
+
+    # ---- predikat & sink ----
+    def need_detail(self, row):
+        return str(row.get("assignmentId")) not in self._skip_ids
+
+    def wrap(self, sink):
+        self.inner = sink
+        return self
+
+    def listing(self, smallcode, rows, err):
+        sc = str(smallcode)
+        if sc == self._skip_listing:
+            self._skip_listing = None  # listing smallcode ini sudah tertulis sebelum terhenti
+        else:
+            self.inner.listing(smallcode, rows, err)
+        self.state["current"], self.state["current_ids"] = sc, []
+        self._remaining[sc] = len(rows)
+        if not rows:
+            self._done(sc)
+
+    def assignment(self, smallcode, row, answer, err):
+        sc = str(smallcode)
+        if sc not in self._remaining:
+            # baris tambahan untuk smallcode yang sudah selesai (mis. jawaban lama dari sinkron inkremental)
+            self.inner.assignment(smallcode, row, answer, err)
+            return
+        aid = str(row.get("assignmentId"))
+        if aid in self._skip_ids:
+            self._skip_ids.discard(aid)
+        else:
+            self.inner.assignment(smallcode, row, answer, err)
+        self.state["current_ids"].append(aid)
+        self._remaining[sc] -= 1
+        if self._remaining[sc] <= 0:
+            self._done(sc)
+        if time.time() - self._last >= self.interval:
+            self.checkpoint()
+
+    def _done(self, sc):
+        self._remaining.pop(sc, None)
+        self.state["done"].append(sc)
+        self.state["current"], self.state["current_ids"] = None, []
+
+    # ---- persistensi ----
+    def checkpoint(self):
+        """Flush part yang masih di buffer lalu catat posisi; aman dipanggil kapan saja."""
+        self.inner.flush()
+        self.state["parts"] = {"answers": self.inner.answers.parts, "assign": self.inner.assignments.parts}
+        self.state["updated_at"] = time.time()
+        _atomic_json(self.state, self.path)
+        self._last = time.time()
+
+    def finish(self):
+        """Hapus jurnal dan lupakan state-nya (run berikutnya wajib `start` baru)."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.state = None
+        self._skip_ids, self._skip_listing, self._remaining = set(), None, {}
+
+    def summary(self):
+        return f"{len(self.state['done'])} smallcode selesai"
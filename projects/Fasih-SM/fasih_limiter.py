@@ -0,0 +1,213 @@
+# fasih_limiter.py
+"""
+Pembatas laju adaptif (AIMD) + retry dengan backoff ber-jitter untuk API FASIH.
+
+- Jumlah request paralel naik +1 per "jendela" (setiap `limit` respons sehat)
+  selama latensi masih wajar, dan dipotong setengah saat 429/502/503/504/timeout.
+- Request yang gagal karena beban server dicoba ulang (full jitter, hormati
+  header Retry-After), jadi baris tidak hilang diam-diam. Method tidak
+  idempoten (POST approve) hanya diulang bila gagal konek.
+- `stats()` melaporkan batas saat ini, request/detik, retry, dan throttle.
+
+Dipakai lewat `AdaptiveAdapter` (requests.Session) atau `AsyncFasihClient`.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+RETRY_STATUS = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+DEFAULT_RETRIES = 4
+BACKOFF_BASE = 0.5   # detik
+BACKOFF_CAP = 30.0
+SLOW_FACTOR = 2.0    # latensi > 2x baseline → jangan tambah paralel
+RATE_WINDOW = 10.0   # detik, untuk hitung request/detik
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full jitter: acak 0..min(cap, base*2^attempt)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after(headers):
+    try:
+        return min(float(headers.get("Retry-After")), BACKOFF_CAP)
+    except (TypeError, ValueError):
+        return None
+
+
+def connect_failed(exc):
+    """True bila request gagal sebelum terkirim (tidak bisa konek), jadi aman diulang untuk method apa pun."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = getattr(exc.args[0] if exc.args else None, "reason", None)
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+def _set_done(fut):
+    if not fut.done():
+        fut.set_result(None)
+
+
+class AdaptiveLimiter:
+    """Batas konkurensi AIMD bersama untuk banyak thread (dan satu event loop)."""
+
+    def __init__(self, max_limit, min_limit=1, initial=None):
+        self.max_limit = max(int(max_limit), 1)
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.limit = float(initial if initial is not None else max(self.min_limit, self.max_limit // 4))
+        self.in_flight = 0
+        self.retries = 0
+        self.throttled = 0
+        self._ok_since_grow = 0
+        self._last_cut = 0.0
+        self._ewma = None
+        self._baseline = None
+        self._done = deque()
+        self._cond = threading.Condition()
+        self._async_waiters = deque()  # (loop, future) dari acquire_async
+
+    # ---- slot ----
+    def try_acquire(self):
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait(0.5)
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """Tunggu slot tanpa polling: future didaftarkan dan dibangunkan `release` (thread-safe)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                fut = loop.create_future()
+                waiter = (loop, fut)
+                self._async_waiters.append(waiter)
+            try:
+                await fut
+            except BaseException:
+                with self._cond:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                    else:
+                        self._wake_async()  # sudah dibangunkan tapi batal: teruskan ke penunggu lain
+                raise
+
+    def _wake_async(self):
+        """Bangunkan penunggu async sebanyak slot kosong (dipanggil dengan `_cond` terkunci)."""
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._async_waiters:
+            loop, fut = self._async_waiters.popleft()
+            loop.call_soon_threadsafe(_set_done, fut)
+            free -= 1
+
+    def release(self, latency, congested=False):
+        """Kembalikan slot + umpan balik: `congested` untuk 429/5xx/timeout."""
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            self._done.append(now)
+            while self._done and now - self._done[0] > RATE_WINDOW:
+                self._done.popleft()
+            if congested:
+                self.throttled += 1
+                # satu potongan per ~latensi, supaya rentetan error serentak tidak menjatuhkan batas ke 1
+                if now - self._last_cut > max(self._ewma or 0.0, 0.5):
+                    self.limit = max(float(self.min_limit), self.limit / 2)
+                    self._last_cut = now
+                    self._ok_since_grow = 0
+            else:
+                self._ewma = latency if self._ewma is None else 0.8 * self._ewma + 0.2 * latency
+                # baseline = latensi terendah, pelan-pelan dilonggarkan agar tidak terpaku pada satu respons cepat
+                self._baseline = self._ewma if self._baseline is None else min(self._baseline * 1.001, self._ewma)
+                if self._ewma <= self._baseline * SLOW_FACTOR:
+                    self._ok_since_grow += 1
+                    if self._ok_since_grow >= int(self.limit):
+                        self.limit = min(float(self.max_limit), self.limit + 1)
+                        self._ok_since_grow = 0
+            self._wake_async()
+            self._cond.notify_all()
+
+    def note_retry(self):
+        with self._cond:
+            self.retries += 1
+
+    # ---- laporan ----
+    def rate(self):
+        """Request selesai per detik dalam RATE_WINDOW terakhir."""
+        with self._cond:
+            if len(self._done) < 2:
+                return 0.0
+            span = max(time.monotonic() - self._done[0], 1e-6)
+            return len(self._done) / span
+
+    def stats(self):
+        return {
+            "limit": int(self.limit), "in_flight": self.in_flight, "rate": self.rate(),
+            "retries": self.retries, "throttled": self.throttled,
+        }
+
+    def text(self):
+        s = self.stats()
+        return f"paralel {s['limit']} • {s['rate']:.1f} req/detik • retry {s['retries']}"
+
+
+class AdaptiveAdapter(HTTPAdapter):
+    """
+    HTTPAdapter yang antre lewat AdaptiveLimiter dan mengulang 429/5xx/timeout.
+
+    Hanya method idempoten (IDEMPOTENT_METHODS) yang diulang untuk status dan
+    timeout baca; POST/PUT (mis. approve) hanya diulang bila gagal sebelum
+    request terkirim (gagal konek), karena server mungkin sudah memprosesnya.
+    """
+
+    def __init__(self, limiter, retries=DEFAULT_RETRIES, **kwargs):
+        self.limiter = limiter
+        self.max_retries_adaptive = retries
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        idempotent = (request.method or "GET").upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            t0 = time.monotonic()
+            congested = False
+            try:
+                resp = super().send(request, **kwargs)
+                congested = resp.status_code in RETRY_STATUS
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                congested = True
+                if attempt >= self.max_retries_adaptive or not (idempotent or connect_failed(e)):
+                    e.retries = attempt  # dibaca instrumentasi (fasih_client.notify)
+                    raise
+                delay = backoff_delay(attempt)
+            else:
+                if not congested or not idempotent or attempt >= self.max_retries_adaptive:
+                    resp.retries = attempt
+                    return resp
+                delay = retry_after(resp.headers) or backoff_delay(attempt)
+                resp.close()
+            finally:
+                # selalu kembalikan slot, termasuk exception lain (mis. URL / SSL tidak valid)
+                self.limiter.release(time.monotonic() - t0, congested)
+            self.limiter.note_retry()
+            attempt += 1
+            time.sleep(delay)
@@ -0,0 +1,209 @@
+# fasih_metrics.py
+"""
+Metrik HTTP per endpoint (listing, detail, history, region, mitra_*, webapi, ...).
+
+`HttpMetrics` adalah hook untuk fasih_client (`REQUEST_HOOKS` global, atau
+`hooks=` per fetcher / `client.hooks` agar hanya menghitung satu run). Per
+endpoint dicatat jumlah request, latensi (p50/p95 dari sampel terakhir),
+byte, status, error, dan retry; laju req/detik dihitung pada jendela
+`window` detik terakhir.
+
+Bila `log_path` diisi, tiap request ditulis satu baris JSON ke file tsb dan
+`close()` menambahkan satu baris ringkasan, jadi antar run bisa dibandingkan
+(mis. `pd.read_json(path, lines=True)`).
+
+`StepTimer` mencatat lama menunggu kondisi siap per langkah browser (login,
+buka review, klik approve) dan membandingkannya dengan sleep tetap yang dulu
+dipakai di langkah yang sama.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+METRICS_DIR = ".metrics"  # di dalam folder output run
+WINDOW = 10.0  # detik, untuk req/detik "sekarang"
+MAX_SAMPLES = 5000  # sampel latensi per endpoint untuk persentil
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[k]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0  # exception atau status >= 400
+        self.retries = 0
+        self.bytes = 0
+        self.status = {}
+        self.latency = deque(maxlen=MAX_SAMPLES)
+        self.recent = deque()  # waktu selesai request dalam jendela
+
+    def row(self, now, window):
+        while self.recent and now - self.recent[0] > window:
+            self.recent.popleft()
+        lat = sorted(self.latency)
+        return {
+            "request": self.count,
+            "req/detik": len(self.recent) / window,
+            "p50 ms": percentile(lat, 0.50) * 1000,
+            "p95 ms": percentile(lat, 0.95) * 1000,
+            "error %": 100.0 * self.errors / self.count if self.count else 0.0,
+            "retry": self.retries,
+            "KB": self.bytes / 1024,
+            "status": ", ".join(f"{k}:{v}" for k, v in sorted(self.status.items(), key=lambda kv: str(kv[0]))),
+        }
+
+
+class HttpMetrics:
+    """Pengumpul metrik request; instance-nya dipanggil sebagai hook fasih_client."""
+
+    def __init__(self, log_path=None, window=WINDOW):
+        self.window = window
+        self.log_path = log_path
+        self.started = time.time()
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        self._log = None
+        if log_path:
+            os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+            # line-buffered: log tetap terbaca selama run / proses server masih hidup
+            self._log = open(log_path, "a", encoding="utf-8", buffering=1)
+
+    @classmethod
+    def for_run(cls, output_dir, name):
+        """Metrik dengan log JSONL di `<output_dir>/.metrics/<name>.jsonl`."""
+        return cls(os.path.join(output_dir, METRICS_DIR, f"{name}.jsonl"))
+
+    def __call__(self, endpoint, method, url, status, seconds, error=None, nbytes=0, retries=0):
+        now = time.time()
+        with self._lock:
+            st = self.endpoints.get(endpoint)
+            if st is None:
+                st = self.endpoints[endpoint] = EndpointStats()
+            st.count += 1
+            st.retries += retries
+            st.bytes += nbytes
+            st.latency.append(seconds)
+            st.recent.append(now)
+            key = status if status is not None else "error"
+            st.status[key] = st.status.get(key, 0) + 1
+            if error is not None or (status or 0) >= 400:
+                st.errors += 1
+            if self._log is not None:
+                self._log.write(json.dumps({
+                    "t": round(now, 3), "endpoint": endpoint, "method": method, "url": url,
+                    "status": status, "ms": round(seconds * 1000, 1), "bytes": nbytes, "retries": retries,
+                    "error": f"{type(error).__name__}: {error}" if error is not None else None,
+                }) + "\n")
+
+    # ---- pasang sebagai hook global (untuk kode yang tidak menerima `hooks=`) ----
+    def install(self):
+        from fasih_client import REQUEST_HOOKS
+        if self not in REQUEST_HOOKS:
+            REQUEST_HOOKS.append(self)
+        return self
+
+    def uninstall(self):
+        from fasih_client import REQUEST_HOOKS
+        if self in REQUEST_HOOKS:
+            REQUEST_HOOKS.remove(self)
+
+    # ---- laporan ----
+    def frame(self):
+        """DataFrame per endpoint (untuk st.dataframe)."""
+        now = time.time()
+        window = min(self.window, max(now - self.started, 1e-3))
+        with self._lock:
+            rows = {ep: st.row(now, window) for ep, st in self.endpoints.items()}
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        if not df.empty:
+            df = df.sort_values("request", ascending=False).round(1)
+            df.index.name = "endpoint"
+        return df
+
+    def total(self):
+        with self._lock:
+            n = sum(st.count for st in self.endpoints.values())
+            err = sum(st.errors for st in self.endpoints.values())
+            retries = sum(st.retries for st in self.endpoints.values())
+        return n, err, retries
+
+    def text(self):
+        n, err, retries = self.total()
+        elapsed = max(time.time() - self.started, 1e-3)
+        return f"HTTP {n} request • rata-rata {n / elapsed:.1f} req/detik • error {err} • retry {retries}"
+
+    def summary(self):
+        df = self.frame()
+        return {
+            "started": self.started, "elapsed": round(time.time() - self.started, 1),
+            "endpoints": df.drop(columns=["req/detik"], errors="ignore").to_dict(orient="index"),
+        }
+
+    def close(self):
+        """Tulis baris ringkasan ke log JSONL dan tutup file."""
+        if self._log is None:
+            return
+        summary = self.summary()
+        with self._lock:
+            self._log.write(json.dumps({"summary": summary}, default=str) + "\n")
+            self._log.close()
+            self._log = None
+
+
+class StepTimer:
+    """Lama tunggu per langkah; `baseline` = {langkah: detik sleep tetap cara lama}."""
+
+    def __init__(self, baseline=None):
+        self.baseline = dict(baseline or {})
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, deque(maxlen=MAX_SAMPLES)).append(seconds)
+
+    def frame(self):
+        """DataFrame per langkah: n, p50/p95 ms, total, total sleep lama, dan selisihnya (hemat)."""
+        with self._lock:
+            items = {k: sorted(v) for k, v in self.samples.items()}
+        rows = {}
+        for name, lat in items.items():
+            old = self.baseline.get(name, 0.0) * len(lat)
+            rows[name] = {
+                "n": len(lat), "p50 ms": percentile(lat, 0.50) * 1000, "p95 ms": percentile(lat, 0.95) * 1000,
+                "total detik": sum(lat), "sleep lama detik": old, "hemat detik": old - sum(lat) if old else 0.0,
+            }
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        if not df.empty:
+            df = df.round(1)
+            df.index.name = "langkah"
+        return df
+
+    def text(self):
+        df = self.frame()
+        if df.empty:
+            return "belum ada langkah browser"
+        return f"tunggu browser {df['total detik'].sum():.1f} detik • hemat {df['hemat detik'].sum():.1f} detik vs sleep tetap"
+
+
+def timed(timer, name):
+    """`timer.step(name)`, atau konteks kosong bila `timer` None."""
+    return timer.step(name) if timer is not None else nullcontext()
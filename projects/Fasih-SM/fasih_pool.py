@@ -0,0 +1,192 @@
+# fasih_pool.py
+"""
+Pool multi-akun dari session SSO tersimpan (`sessions/*_session.pkl`).
+
+Satu run biasanya hanya memakai satu akun, sehingga dibatasi throttling
+server untuk akun itu. `SessionPool` memuat beberapa file session, mengecek
+validitasnya, lalu membagi request ke akun yang paling longgar. Tiap akun punya
+FasihClient + AdaptiveLimiter sendiri, jadi batas konkurensinya per akun.
+
+Pool kompatibel dengan session (`get` / `post` / `close`), jadi bisa langsung
+dipakai fetcher, DetailCache, dan HistoryResolver. Respons 401/403 menandai
+akun itu habis dan request diulang di akun lain; baru bila semua akun habis
+respons 401/403 diteruskan (→ SessionExpired di pemanggil).
+
+`PooledFetcher` adalah AssignmentFetcher yang memakai pool ini.
+"""
+import glob
+import os
+import pickle
+import threading
+
+from requests.cookies import RequestsCookieJar
+
+from fasih_client import SURVEY_BASE, FasihClient, fasih_headers
+from fasih_fetch import DEFAULT_FETCH_WORKERS, AssignmentFetcher
+
+SESSION_GLOB = "*_session.pkl"
+EXPIRED_STATUS = (401, 403)
+
+
+def load_session_file(path, max_workers=DEFAULT_FETCH_WORKERS):
+    """(username, FasihClient) dari file session; menerima format Fasih-SM dan project_c."""
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    username = data.get("username") or os.path.basename(path).replace("_session.pkl", "")
+    session = data.get("session")
+    cookies = session.cookies if session is not None else data.get("cookies")
+    if isinstance(cookies, dict):
+        jar = RequestsCookieJar()
+        for k, v in cookies.items():
+            jar.set(k, v, domain=".bps.go.id", path="/")
+        cookies = jar
+    headers = data.get("headers") or (dict(session.headers) if session is not None else None) or fasih_headers(cookies)
+    return username, FasihClient(headers, cookies, max_workers)
+
+
+def session_ok(client):
+    """Cek ringan: daftar survei (1 baris) harus 200 tanpa redirect ke SSO."""
+    payload = {"pageNumber": 0, "pageSize": 1, "sortBy": "CREATED_AT", "sortDirection": "DESC", "keywordSearch": ""}
+    try:
+        resp = client.post(f"{SURVEY_BASE}/surveys/datatable?surveyType=Pencacahan", json=payload, allow_redirects=False)
+        return resp.status_code == 200, f"HTTP {resp.status_code}"
+    except Exception as e:
+        return False, str(e)
+
+
+class Account:
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+        self.alive = True
+        self.error = None
+        self.requests = 0
+
+    def load(self):
+        lim = self.client.limiter
+        return lim.in_flight / max(lim.limit, 1.0)
+
+
+class SessionPool:
+    """Kumpulan akun FASIH; `get`/`post` diarahkan ke akun aktif yang paling sepi."""
+
+    def __init__(self, accounts):
+        self.accounts = list(accounts)
+        self.rejected = []  # (nama, alasan) dari from_folder
+        self._lock = threading.Lock()
+        self._clients = {}  # id(akun) -> klien per run (lihat with_hooks)
+
+    @classmethod
+    def from_folder(cls, folder="sessions", max_per_account=DEFAULT_FETCH_WORKERS, validate=True, usernames=None):
+        accounts, rejected = [], []
+        for path in sorted(glob.glob(os.path.join(folder, SESSION_GLOB))):
+            name = os.path.basename(path).replace("_session.pkl", "")
+            if usernames is not None and name not in usernames:
+                continue
+            try:
+                name, client = load_session_file(path, max_per_account)
+            except Exception as e:
+                rejected.append((name, f"gagal dibaca: {e}"))
+                continue
+            if validate:
+                ok, why = session_ok(client)
+                if not ok:
+                    rejected.append((name, why))
+                    client.close()
+                    continue
+            accounts.append(Account(name, client))
+        pool = cls(accounts)
+        pool.rejected = rejected
+        return pool
+
+    # ---- routing ----
+    @property
+    def alive(self):
+        return [a for a in self.accounts if a.alive]
+
+    @property
+    def max_workers(self):
+        """Total worker = jumlah batas per akun aktif."""
+        return sum(a.client.max_workers for a in self.alive) or 1
+
+    @property
+    def headers(self):
+        return self.alive[0].client.headers if self.alive else {}
+
+    @property
+    def cookies(self):
+        return self.alive[0].client.cookies if self.alive else RequestsCookieJar()
+
+    def pick(self):
+        with self._lock:
+            alive = self.alive
+            if not alive:
+                return None
+            acc = min(alive, key=Account.load)
+            acc.requests += 1
+            return acc
+
+    def expire(self, acc, reason):
+        with self._lock:
+            if acc.alive:
+                acc.alive, acc.error = False, reason
+
+    def request(self, method, url, **kwargs):
+        resp = None
+        while True:
+            acc = self.pick()
+            if acc is None:
+                if resp is None:
+                    raise RuntimeError("Tidak ada session aktif di pool")
+                return resp  # semua akun habis: biarkan pemanggil melihat 401/403
+            resp = self._clients.get(id(acc), acc.client).request(method, url, **kwargs)
+            if resp.status_code not in EXPIRED_STATUS:
+                return resp
+            self.expire(acc, f"HTTP {resp.status_code}")
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def with_hooks(self, *hooks):
+        """Pool untuk satu run: akun & status habis sama, hook metrik hanya di klien run ini."""
+        run = object.__new__(type(self))
+        run.__dict__.update(self.__dict__)
+        run._clients = {id(a): a.client.with_hooks(*hooks) for a in self.accounts}
+        return run
+
+    def close(self):
+        for a in self.accounts:
+            a.client.close()
+
+    # ---- laporan (dipakai FetchProgress sebagai `limiter`) ----
+    def stats(self):
+        out = {"limit": 0, "in_flight": 0, "rate": 0.0, "retries": 0, "throttled": 0}
+        for a in self.alive:
+            for k, v in a.client.limiter.stats().items():
+                out[k] += v
+        return out
+
+    def text(self):
+        s = self.stats()
+        return (f"akun aktif {len(self.alive)}/{len(self.accounts)} • paralel {s['limit']}"
+                f" • {s['rate']:.1f} req/detik • retry {s['retries']}")
+
+    def summary(self):
+        lines = [f"{a.name}: {a.requests} request" + ("" if a.alive else f" (habis: {a.error})") for a in self.accounts]
+        lines += [f"{name}: ditolak ({why})" for name, why in self.rejected]
+        return lines
+
+
+class PooledFetcher(AssignmentFetcher):
+    """AssignmentFetcher yang membagi listing & detail ke semua akun di `pool`."""
+
+    def __init__(self, pool, survey_period_id, timeout=None, need_detail=None, sink=None, cache=None, hooks=()):
+        super().__init__(pool, None, survey_period_id, max_workers=pool.max_workers, timeout=timeout,
+                         need_detail=need_detail, sink=sink, cache=cache, hooks=hooks)
+
+    def _connect(self, sess, headers):
+        run = sess.with_hooks(*self.hooks)  # klien akun bersama tidak ikut membawa hook run ini
+        return run, run  # pool sekaligus "limiter" untuk laporan progress
@@ -0,0 +1,278 @@
+# fasih_runs.py
+"""
+Inti aksi "Ambil Raw Data" dan "Approve Assignment" tanpa streamlit, dipakai
+app Streamlit (inline / job latar) dan CLI batch (fasih_cli).
+
+Semua keluaran lewat objek `ui` yang meniru bagian st.* yang dipakai
+(progress, empty().text, write, info, caption, warning, success, error,
+dataframe): `st`, fasih_jobs.JobUI, atau fasih_cli.ConsoleUI.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+
+import pandas as pd
+
+from fasih_approve import APPROVE_URL, APPROVE_WORKERS, Approver, plan_approve
+from fasih_browser import LEGACY_SLEEP
+from fasih_detail_cache import DetailCache
+from fasih_fetch import DEFAULT_FETCH_WORKERS, AssignmentFetcher, FetchProgress, SessionExpired
+from fasih_journal import RunJournal
+from fasih_metrics import HttpMetrics, StepTimer
+from fasih_pool import PooledFetcher
+from fasih_sync import IncrementalSync
+from fasih_writer import DEFAULT_CHUNK_ROWS, ChunkedTableWriter, ExportSink, parts_to_excel
+
+
+def raw_export(id_survey, template_id, nama_kab, nama_survey, daftarwilayah_df, headers, cookies, sess, survey_period_id, save_folder, *, ui, max_workers=DEFAULT_FETCH_WORKERS, engine="thread", incremental=False, excel=True, chunk_rows=DEFAULT_CHUNK_ROWS, resume=True, detail_cache=True, pool=None):
+    """Ambil jawaban assignment berdasarkan daftarwilayah_df['smallcode'] dan survey_period_id.
+       Listing & detail diambil paralel (`max_workers`) di thread latar; progress dibaca dari queue.
+       `engine="async"` memakai AsyncAssignmentFetcher (satu pool httpx bersama).
+       `incremental=True`: detail hanya diambil untuk assignment baru/berubah dibanding
+       export sebelumnya di folder output (lihat fasih_sync).
+       Hasil ditulis streaming per `chunk_rows` baris ke folder part (Parquet/CSV);
+       bila `excel`, 2 file Excel (raw answers & assignment list) dibangun dari part tsb.
+       `resume=True`: run yang terputus untuk wilayah & periode yang sama dilanjutkan
+       dari jurnal (fasih_journal), bukan diulang dari awal.
+       `detail_cache=True`: detail yang versinya belum berubah dibaca dari cache disk
+       (fasih_detail_cache) alih-alih diunduh ulang.
+       `pool` (fasih_pool.SessionPool): listing & detail dibagi ke semua akun di pool,
+       akun yang habis sesinya otomatis digantikan akun lain (mesin thread).
+       Metrik HTTP per endpoint tampil selama run dan ditulis ke
+       `<output>/.metrics/Raw_<kab>_<timestamp>.jsonl` (fasih_metrics).
+       `ui`: `st` (app), fasih_jobs.JobUI (job latar) atau fasih_cli.ConsoleUI (CLI).
+       Kembalikan path Excel (None bila tidak dibuat/kosong)."""
+    if daftarwilayah_df is None or 'smallcode' not in daftarwilayah_df.columns:
+        ui.error("Daftar wilayah kosong atau tidak mengandung kolom 'smallcode'.")
+        return None, None
+
+    ui.write("Jumlah wilayah:", len(daftarwilayah_df))
+    ui.dataframe(daftarwilayah_df.head())
+    # prepare filenames
+    
+    # Buat subfolder otomatis di dalam OUTPUT/nama_survey
+    output_dir = os.path.join(save_folder, "output", nama_survey)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    smallcodes = list(daftarwilayah_df['smallcode'])
+    journal = RunJournal(output_dir, nama_kab, survey_period_id, smallcodes)
+    resuming = journal.resumable and resume
+    if resuming:
+        state = journal.resume()
+        timestamp = state["timestamp"]
+        smallcodes = journal.remaining(smallcodes)
+        ui.info(f"⏯️ Melanjutkan run {timestamp}: {journal.summary()}, sisa {len(smallcodes)} smallcode.")
+    else:
+        journal.finish()  # buang jurnal lama bila tidak dilanjutkan
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename_answers = f"Raw_Data_{nama_kab}_{nama_survey}_{timestamp}.xlsx"
+    filename_assign = f"Assignment_{nama_kab}_{nama_survey}_{timestamp}.xlsx"
+    path_answers = os.path.join(output_dir, filename_answers)
+    path_assign = os.path.join(output_dir, filename_assign)
+    parts_answers = os.path.splitext(path_answers)[0]
+    parts_assign = os.path.splitext(path_assign)[0]
+    if not resuming:
+        journal.start(parts_answers, parts_assign, timestamp)
+
+    p = ui.progress(0)
+    status = ui.empty()
+    table = ui.empty()
+    metrics = HttpMetrics.for_run(output_dir, f"Raw_{nama_kab}_{timestamp}")
+
+    sync = None
+    if incremental:
+        sync = IncrementalSync(output_dir, nama_kab, nama_survey, survey_period_id)
+        if sync.known:
+            ui.caption(f"🔁 Sinkron inkremental: {len(sync.known)} assignment di snapshot sebelumnya.")
+        else:
+            ui.caption("🔁 Belum ada snapshot sebelumnya — semua detail diambil.")
+
+    export = ExportSink(ChunkedTableWriter(parts_answers, chunk_rows), ChunkedTableWriter(parts_assign, chunk_rows))
+    sink = journal.wrap(export)
+    if sync:
+        sink = sync.wrap(sink)
+
+    def need_detail(row):
+        # sync dulu (hitung sidik jari), lalu jurnal (lewati yang sudah tertulis sebelum terputus)
+        return (sync.need_detail(row) if sync else True) and journal.need_detail(row)
+
+    start_time = time.time()
+    if engine == "async":
+        from fasih_async import AsyncAssignmentFetcher
+        fetcher_cls = AsyncAssignmentFetcher
+    else:
+        fetcher_cls = AssignmentFetcher
+    cache = DetailCache() if detail_cache else None
+    try:
+        if pool is not None:
+            fetcher = PooledFetcher(pool, survey_period_id, need_detail=need_detail, sink=sink, cache=cache,
+                                    hooks=[metrics])
+        else:
+            fetcher = fetcher_cls(
+                sess, headers, survey_period_id, max_workers=max_workers,
+                need_detail=need_detail, sink=sink, cache=cache, hooks=[metrics],
+            )
+        fetcher.start(smallcodes)
+    except RuntimeError as e:
+        metrics.close()
+        ui.error(str(e))
+        return None, None
+    progress = FetchProgress(len(smallcodes), limiter=fetcher.limiter, cache=cache)
+    last_draw = 0.0
+    for ev in fetcher.iter_events():
+        progress.update(ev)
+        kind, smallCode, _, err = ev
+        if err is not None and kind == "listing":
+            ui.warning(f"Error smallCode {smallCode}: {err}")
+        # batasi frekuensi render agar thread Streamlit tidak jadi bottleneck
+        if time.time() - last_draw >= 0.25:
+            p.progress(min(progress.fraction(), 1.0))
+            status.text(progress.text())
+            table.dataframe(metrics.frame())
+            last_draw = time.time()
+    table.dataframe(metrics.frame())
+    metrics.close()
+    ui.caption(f"📈 {metrics.text()} • log: {metrics.log_path}")
+    if fetcher.aborted:
+        journal.checkpoint()
+        ui.warning(f"⏸️ Run terhenti: {fetcher.aborted}. Progres disimpan ({journal.summary()}); "
+                   "login ulang lalu jalankan aksi yang sama untuk melanjutkan.")
+        return None, None
+    p.progress(1.0)
+    status.text(progress.text())
+    if pool is not None:
+        ui.caption("👥 " + " • ".join(pool.summary()))
+
+    export.close()
+    failed_detail = [f for f in fetcher.failed if f[1] is not None]
+    if failed_detail:
+        ui.warning(f"⚠️ {len(failed_detail)} detail assignment gagal diambil.")
+    ui.caption(f"💾 Data tersimpan bertahap di {parts_answers} ({export.answers.rows} baris) "
+               f"dan {parts_assign} ({export.assignments.rows} baris).")
+
+    # Excel dibangun dari part, tanpa memuat seluruh data ke memori
+    made_answers = made_assign = False
+    if excel and export.answers.rows:
+        status.text("📝 Menyusun Excel raw data...")
+        parts_to_excel(parts_answers, path_answers)
+        made_answers = True
+    if excel and export.assignments.rows:
+        parts_to_excel(parts_assign, path_assign)
+        made_assign = True
+    status.text(progress.text())
+
+    if sync:
+        sync.commit(parts_answers if export.answers.rows else None, parts_assign if export.assignments.rows else None)
+        ui.info(f"🔁 {sync.summary()}")
+    journal.finish()
+
+    elapsed = time.time() - start_time
+    ui.success(f"Selesai ambil data — waktu: {int(elapsed//60)} menit {int(elapsed%60)} detik.")
+    return (path_answers if made_answers else None, path_assign if made_assign else None)
+
+
+def approve_assignments(id_survey, template_id, nama_kab, nama_survey, daftarwilayah_df, headers, cookies, sess, survey_period_id, save_folder, driver=None, *, ui, role="PML", approve_url=APPROVE_URL, max_workers=APPROVE_WORKERS, plan_only=False):
+    """
+    Approve assignment dalam dua tahap:
+
+    1. Rencana (fasih_approve.plan_approve): listing semua smallcode dan
+       riwayat status tiap assignment diambil paralel, lalu disaring dengan
+       aturan role (`role_allows`). Ringkasan per smallcode ditampilkan sebelum
+       ada yang di-approve; `plan_only=True` berhenti di sini dan menyimpan
+       rencana ke Excel.
+    2. Eksekusi: hanya entri rencana yang dikirim ke Approver, lewat API
+       (`approve_url`, default env FASIH_APPROVE_URL) paralel `max_workers`,
+       atau lewat `driver` yang sudah login bila API tidak diatur / tidak
+       dikenali server. `driver` boleh fasih_browser.DriverPool (N Chrome
+       paralel); Chrome yang dibuka pool ditutup di akhir run.
+
+    Log Excel berisi semua assignment beserta hasil / alasan dilewati.
+    """
+    if daftarwilayah_df is None or 'smallcode' not in daftarwilayah_df.columns:
+        ui.error("Daftar wilayah kosong atau tidak mengandung kolom 'smallcode'.")
+        return None
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # metrik listing, riwayat & approve API lewat klien khusus run ini (driver tidak terukur di sini);
+    # session bersama (UI / job lain) tidak ikut tercatat
+    metrics = HttpMetrics.for_run(save_folder, f"Approve_{nama_kab}_{timestamp}")
+    run_sess = sess.with_hooks(metrics)
+    steps = StepTimer(LEGACY_SLEEP)  # lama tunggu langkah browser vs sleep tetap cara lama
+    approver = Approver(run_sess, survey_period_id, template_id, role, driver=driver, url=approve_url,
+                        max_workers=max_workers, timer=steps)
+    if approver.engine == "tidak ada" and not plan_only:
+        ui.error("Approve butuh FASIH_APPROVE_URL atau browser yang sudah login.")
+        approver.close()
+        metrics.close()
+        return None
+
+    prefix = "Rencana_Approve" if plan_only else "Log_Approve"
+    path_log = os.path.join(save_folder, f"{prefix}_{nama_kab}_{nama_survey}_{timestamp}.xlsx")
+
+    pending = {}  # future approve → baris log
+    p = ui.progress(0)
+    status = ui.empty()
+    start_time = time.time()
+
+    def on_plan(tahap, done, total):
+        p.progress(int(done / max(total, 1) * 100))
+        status.text(f"rencana approve • {tahap} {done}/{total}")
+
+    def collect(block=False):
+        done = list(pending) if block else [f for f in pending if f.done()]
+        for fut in done:
+            row = pending.pop(fut)
+            row["approved"], row["keterangan"] = fut.result()  # SessionExpired diteruskan
+
+    plan = None
+    try:
+        plan = plan_approve(run_sess, survey_period_id, template_id, daftarwilayah_df['smallcode'], role,
+                            on_progress=on_plan)
+        entries = plan.entries()
+        ui.info(f"📋 {plan.text()}" + ("" if plan_only else f" (lewat {approver.engine})"))
+        ui.dataframe(plan.summary())
+        for sc, e in plan.errors.items():
+            ui.warning(f"Error smallCode {sc}: {e}")
+        if not plan_only:
+            for row in entries:
+                pending[approver.submit(row["assignment_id"], row["review_url"])] = row
+            total = len(entries)
+            while pending:
+                wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                collect()
+                done = total - len(pending)
+                p.progress(int(done / max(total, 1) * 100))
+                status.text(f"approve {done}/{total} • {approver.text()}")
+            p.progress(100)
+    except SessionExpired as e:
+        ui.error(f"Run dihentikan: {e}")
+    finally:
+        approver.close()
+        metrics.close()
+    for fut, row in pending.items():  # sisa antrean saat run dihentikan (semua sudah selesai/batal)
+        if fut.cancelled() or fut.exception() is not None:
+            row["keterangan"] = "❌ Dibatalkan"
+        else:
+            row["approved"], row["keterangan"] = fut.result()
+    ui.caption(f"📈 {metrics.text()} • {approver.text()} • log: {metrics.log_path}")
+    if steps.samples:
+        ui.caption(f"⏱️ {steps.text()}")
+        ui.dataframe(steps.frame())
+
+    # save log
+    rows = plan.rows if plan is not None else []
+    if plan_only:
+        for row in rows:
+            if row["layak"]:
+                row["keterangan"] = "Akan di-approve"
+    df_log = pd.DataFrame(rows, columns=["assignment_id", "smallCode", "review_url", "status_assignment",
+                                         "layak", "approved", "keterangan"])
+    os.makedirs(save_folder, exist_ok=True)
+    df_log.to_excel(path_log, index=False)
+    elapsed = time.time() - start_time
+    if plan_only:
+        ui.success(f"Rencana approve disimpan — {int(df_log['layak'].sum())}/{len(df_log)} assignment layak.")
+        return path_log
+    n_ok = int(df_log["approved"].sum()) if not df_log.empty else 0
+    ui.success(f"Selesai approve — {n_ok}/{len(df_log)} assignment, waktu: {int(elapsed//60)} menit {int(elapsed%60)} detik.")
+    return path_log
@@ -0,0 +1,383 @@
+# fasih_standin.py
+"""
+Server FASIH tiruan (lokal) untuk mengukur crawl wilayah, ambil raw data, dan
+approve tanpa VPN / server produksi.
+
+    python fasih_standin.py --port 8765 --latency 30 --error-rate 0.01
+    FASIH_BASE_URL=http://127.0.0.1:8765 streamlit run app.py      # app ke stand-in
+    FASIH_BASE_URL=http://127.0.0.1:8765 python fasih_cli.py raw ...
+
+Endpoint yang ditiru (bentuk JSON mengikuti yang dibaca app):
+
+- region level1..6 (`?groupId=&level{n-1}Id=`, level2 `level1FullCode=`) dan region-metadata
+- survey: surveys/datatable (POST), surveys/{id}, users/myinfo
+- assignment: get-principal-values-by-smallest-code (dengan/tanpa template),
+  get-by-id-with-data-for-scm, assignment-history/get-by-assignment-id
+- halaman review (`#buttonApprove` + dialog konfirmasi di XPath yang dipakai app)
+  dan POST `APPROVE_PATH` yang menambah riwayat "APPROVED BY <role>"; halaman
+  memuat `assets` gambar + font + video (`/assets/`, masing-masing `asset_kb`)
+  dan skrip analytics (`/gtag/js`) seperti halaman asli, untuk bench_browser
+
+Data sintetis deterministik (`seed`): pohon wilayah dengan `fanout` per level
+3..6, `assignments` per SLS, `keys` jawaban per assignment. Latensi per
+endpoint (`latency` ms ± `jitter`), error 503 acak (`error_rate`), 429 bila
+request bersamaan melebihi `max_concurrent`, dan 401 setelah `expire_after`
+request bisa diatur untuk menguji retry / AIMD / failover.
+
+Hanya pustaka standar; tidak meng-import modul fasih_* lain.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GROUP_ID = "G-BENCH"
+SURVEY_ID = "SV-BENCH"
+TEMPLATE_ID = "TPL-BENCH"
+PERIOD_ID = "PRD-BENCH"
+PROV_CODE, KAB_CODE = "63", "6310"
+KAB_ID = f"L2-{KAB_CODE}"
+LEVEL_NAMES = ["Provinsi", "Kabupaten", "Kecamatan", "Desa", "SLS", "Sub-SLS"]
+CODE_WIDTH = {3: 3, 4: 3, 5: 4, 6: 2}  # digit kode per level (kec, desa, sls, sub-sls)
+APPROVE_PATH = "/assignment-general/api/assignment/approve"
+STATUSES = [  # (status, bobot) untuk riwayat awal
+    ("SUBMITTED BY PPL", 5), ("SUBMITTED BY Pencacah", 1), ("APPROVED BY PML", 2),
+    ("APPROVED BY Pengawas", 1), ("OPEN", 1),
+]
+
+
+class Config:
+    def __init__(self, fanout=(4, 4, 3, 1), assignments=6, keys=150, value_len=12, latency=None,
+                 jitter=0.3, error_rate=0.0, max_concurrent=0, expire_after=0, page_delay=0.3, assets=8,
+                 asset_kb=40, seed=1):
+        self.fanout = tuple(fanout)  # jumlah anak per induk untuk level 3, 4, 5, 6
+        self.assignments = assignments
+        self.keys = keys
+        self.value_len = value_len
+        self.latency = {"lainnya": 20.0, "aset": 80.0, **(latency or {})}  # ms per endpoint
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_concurrent = max_concurrent
+        self.expire_after = expire_after
+        self.page_delay = page_delay  # detik sampai tombol approve muncul (render SPA)
+        self.assets = assets  # gambar di halaman review (plus satu font & satu video)
+        self.asset_kb = asset_kb
+        self.seed = seed
+
+    @property
+    def depth(self):
+        return 2 + len(self.fanout)
+
+    def smallcodes(self):
+        """Semua kode level terdalam (urut)."""
+        codes = [KAB_CODE]
+        for level in range(3, self.depth + 1):
+            codes = [c + str(i + 1).zfill(CODE_WIDTH[level]) for c in codes for i in range(self.fanout[level - 3])]
+        return codes
+
+
+def parse_latency(text):
+    """"30" atau "detail=80,listing=150,20" → dict ms per endpoint ("lainnya" = default)."""
+    out = {}
+    for part in filter(None, (p.strip() for p in str(text).split(","))):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            out[k.strip()] = float(v)
+        else:
+            out["lainnya"] = float(part)
+    return out
+
+
+class StandinState:
+    """Data sintetis + riwayat approve (satu per server)."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.requests = 0
+        self.in_flight = 0
+        self.approved = {}  # assignment_id → [item riwayat tambahan]
+        self.counts = {}  # endpoint → jumlah request
+        self._lock = threading.Lock()
+
+    def _rand(self, *key):
+        h = hashlib.sha1(("|".join(map(str, (self.cfg.seed,) + key))).encode()).digest()
+        return random.Random(h)
+
+    # ---- wilayah ----
+    def children(self, level, parent_code):
+        width = CODE_WIDTH[level]
+        return [
+            {"id": f"L{level}-{parent_code}{str(i + 1).zfill(width)}",
+             "code": str(i + 1).zfill(width),
+             "fullCode": parent_code + str(i + 1).zfill(width),
+             "name": f"{LEVEL_NAMES[level - 1].upper()} {parent_code}{str(i + 1).zfill(width)}"}
+            for i in range(self.cfg.fanout[level - 3])
+        ]
+
+    # ---- assignment ----
+    def listing(self, smallcode):
+        rows = []
+        for i in range(self.cfg.assignments):
+            aid = f"{smallcode}-{i:03d}"
+            rows.append({
+                "assignmentId": aid,
+                "codeIdentity": aid,
+                "regionFullCode": smallcode,
+                "assignmentStatusAlias": self.last_status(aid),
+                "dateModified": f"2025-11-0{1 + len(self.approved.get(aid, []))}T08:00:00",
+                "data1": f"KK {smallcode[-4:]} {i}", "data2": f"RT {i % 7}",
+            })
+        return rows
+
+    def detail(self, aid):
+        rnd = self._rand("detail", aid)
+        answers = [
+            {"dataKey": f"r{k:03d}",
+             "value": "".join(rnd.choice("abcdefghij0123456789") for _ in range(self.cfg.value_len)) if k % 3 else k,
+             "label": f"Pertanyaan {k}"}
+            for k in range(self.cfg.keys)
+        ]
+        inner = {"answers": answers, "principals": answers[:5]}
+        return {"success": True, "message": "OK",
+                "data": {"id": aid, "data": json.dumps(inner), "region": {"smallestCode": aid.split("-")[0]}}}
+
+    def history(self, aid):
+        rnd = self._rand("history", aid)
+        status = rnd.choices([s for s, _ in STATUSES], [w for _, w in STATUSES])[0]
+        items = [] if status == "OPEN" else [
+            {"statusName": "ASSIGNED", "createdAt": "2025-10-01T08:00:00"},
+            {"statusName": status, "createdAt": "2025-10-20T08:00:00"},
+        ]
+        with self._lock:
+            return items + list(self.approved.get(aid, []))
+
+    def last_status(self, aid):
+        items = self.history(aid)
+        return items[-1]["statusName"] if items else "OPEN"
+
+    def approve(self, aid, role="PML"):
+        with self._lock:
+            self.approved.setdefault(aid, []).append(
+                {"statusName": f"APPROVED BY {role}", "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+
+REVIEW_HTML = """<!doctype html><html><head><title>Review {aid}</title>
+<style>@font-face {{ font-family: Fasih; src: url('/assets/fasih.woff2'); }} body {{ font-family: Fasih, sans-serif; }}</style>
+<script async src="/gtag/js?id=G-STANDIN"></script></head><body>
+{assets_html}
+<div id="fasih"><div><div>
+<div><h3>Assignment {aid}</h3><p>Status: <span id="status">{status}</span></p></div>
+<div><button id="buttonApprove" style="display:none" onclick="showConfirm()">Approve</button></div>
+<div></div><div></div><div></div>
+<div id="dialog" style="display:none"></div>
+</div></div></div>
+<script>
+setTimeout(function () {{ document.getElementById('buttonApprove').style.display = ''; }}, {delay_ms});
+function showConfirm() {{
+  var d = document.getElementById('dialog');
+  d.innerHTML = '<button onclick="doApprove()">Ya, approve</button><button onclick="hide()">Batal</button>';
+  d.style.display = '';
+}}
+function hide() {{ document.getElementById('dialog').style.display = 'none'; }}
+function doApprove() {{
+  fetch('{approve_path}', {{method: 'POST', headers: {{'Content-Type': 'application/json'}},
+        body: JSON.stringify({{assignmentId: '{aid}'}})}})
+    .then(function (r) {{ return r.json(); }})
+    .then(function (j) {{
+      document.getElementById('status').textContent = j.status || '';
+      document.getElementById('dialog').innerHTML = '<button onclick="hide()">OK</button>';
+    }});
+}}
+</script></body></html>"""
+
+
+def endpoint_name(path):
+    for key, name in (("get-principal-values", "listing"), ("get-by-id-with-data-for-scm", "detail"),
+                      ("assignment-history", "history"), ("/region/api/", "region"), ("/survey/api/", "survey"),
+                      (APPROVE_PATH, "approve"), ("/survey-review/", "review"), ("/assets/", "aset"),
+                      ("/gtag/", "aset")):
+        if key in path:
+            return name
+    return "lainnya"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive seperti server asli
+    state = None  # StandinState, diisi make_server
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body, ctype="application/json", headers=None):
+        data = body if isinstance(body, bytes) else (body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8"))
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+
+    def _handle(self, method):
+        st, cfg = self.state, self.state.cfg
+        url = urllib.parse.urlsplit(self.path)
+        q = dict(urllib.parse.parse_qsl(url.query))
+        endpoint = endpoint_name(url.path)
+        body = self._read_body() if method == "POST" else {}
+        with st._lock:
+            st.requests += 1
+            st.in_flight += 1
+            st.counts[endpoint] = st.counts.get(endpoint, 0) + 1
+            n_req, in_flight = st.requests, st.in_flight
+        try:
+            ms = cfg.latency.get(endpoint, cfg.latency["lainnya"])
+            time.sleep(max(ms * (1 + random.uniform(-cfg.jitter, cfg.jitter)), 0) / 1000)
+            if cfg.expire_after and n_req > cfg.expire_after and endpoint not in ("review", "aset", "lainnya"):
+                return self._send(401, {"message": "Unauthorized"})
+            if cfg.max_concurrent and in_flight > cfg.max_concurrent:
+                return self._send(429, {"message": "Too Many Requests"}, headers={"Retry-After": "1"})
+            if cfg.error_rate and random.random() < cfg.error_rate and endpoint not in ("review", "aset", "lainnya"):
+                return self._send(503, {"message": "Service Unavailable"})
+            return self._route(method, url.path, q, body)
+        finally:
+            with st._lock:
+                st.in_flight -= 1
+
+    def _route(self, method, path, q, body):
+        st, cfg = self.state, self.state.cfg
+        m = re.search(r"/region/api/v1/region/level(\d)$", path)
+        if m:
+            level = int(m.group(1))
+            if level == 1:
+                return self._send(200, {"data": [{"id": f"L1-{PROV_CODE}", "code": PROV_CODE, "fullCode": PROV_CODE, "name": "KALIMANTAN SELATAN"}]})
+            if level == 2:
+                return self._send(200, {"data": [{"id": KAB_ID, "code": KAB_CODE[2:], "fullCode": KAB_CODE, "name": "TANAH BUMBU"}]})
+            if level > cfg.depth:
+                return self._send(200, {"data": []})
+            parent = q.get(f"level{level - 1}Id", "")
+            return self._send(200, {"data": st.children(level, parent.split("-", 1)[-1])})
+        if path.endswith("/region/api/v1/region-metadata"):
+            return self._send(200, {"data": {"level": [{"id": i + 1, "name": LEVEL_NAMES[i]} for i in range(cfg.depth)]}})
+        if path.endswith("/surveys/datatable"):
+            return self._send(200, {"data": {"content": [{"id": SURVEY_ID, "name": "SURVEI BENCHMARK"}]}})
+        if path.endswith(f"/surveys/{SURVEY_ID}"):
+            return self._send(200, {"data": {
+                "id": SURVEY_ID, "name": "SURVEI BENCHMARK", "regionGroupId": GROUP_ID,
+                "surveyTemplates": [{"templateId": TEMPLATE_ID}],
+                "surveyPeriods": [{"id": PERIOD_ID, "name": "PERIODE BENCHMARK", "startDate": "2025-10-01", "endDate": "2025-12-31"}],
+            }})
+        if path.endswith("/users/myinfo"):
+            return self._send(200, {"data": {"username": "standin", "roles": ["PML"]}})
+        if "get-principal-values-by-smallest-code" in path:
+            return self._send(200, {"data": st.listing(path.rstrip("/").rsplit("/", 1)[-1])})
+        if "get-by-id-with-data-for-scm" in path:
+            return self._send(200, st.detail(q.get("id", "")))
+        if "assignment-history/get-by-assignment-id" in path:
+            return self._send(200, {"data": st.history(q.get("assignmentId", ""))})
+        if path == APPROVE_PATH and method == "POST":
+            aid = body.get("assignmentId") or q.get("assignmentId")
+            if not aid:
+                return self._send(400, {"success": False, "message": "assignmentId kosong"})
+            st.approve(aid, body.get("role") or q.get("role") or "PML")
+            return self._send(200, {"success": True, "status": st.last_status(aid)})
+        m = re.search(r"/survey-review/([^/]+)/", path)
+        if m:
+            aid = m.group(1)
+            assets_html = "".join(f'<img src="/assets/foto-{i}.jpg" width="64">' for i in range(cfg.assets))
+            if cfg.assets:
+                assets_html += '<video src="/assets/panduan.mp4" preload="auto" muted></video>'
+            html = REVIEW_HTML.format(aid=aid, status=st.last_status(aid), delay_ms=int(cfg.page_delay * 1000),
+                                      approve_path=APPROVE_PATH, assets_html=assets_html)
+            return self._send(200, html, "text/html; charset=utf-8")
+        if path.startswith("/assets/"):
+            ext = path.rsplit(".", 1)[-1]
+            ctype = {"jpg": "image/jpeg", "woff2": "font/woff2", "mp4": "video/mp4"}.get(ext, "application/octet-stream")
+            return self._send(200, bytes(cfg.asset_kb * 1024), ctype, headers={"Cache-Control": "no-store"})
+        if path.startswith("/gtag/"):
+            return self._send(200, "window.dataLayer = window.dataLayer || [];", "application/javascript")
+        if "/api/" in path:
+            return self._send(404, {"message": "Not Found"})
+        # oauth / halaman lain (injeksi cookie driver): halaman kosong
+        return self._send(200, "<!doctype html><html><body>FASIH stand-in</body></html>", "text/html; charset=utf-8")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # antrean listen cukup untuk puluhan worker
+
+
+def make_server(cfg=None, host="127.0.0.1", port=0):
+    """(server, state) — server belum jalan; `serve_forever()` sendiri atau pakai `start_background`."""
+    state = StandinState(cfg or Config())
+    handler = type("StandinHandler", (Handler,), {"state": state})
+    return StandinServer((host, port), handler), state
+
+
+def start_background(cfg=None, host="127.0.0.1", port=0):
+    """Jalankan stand-in di thread daemon; kembalikan (base_url, server, state)."""
+    server, state = make_server(cfg, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True, name="fasih-standin").start()
+    return f"http://{host}:{server.server_port}", server, state
+
+
+def config_from_args(args):
+    return Config(
+        fanout=[int(x) for x in args.fanout.split(",")], assignments=args.assignments, keys=args.keys,
+        latency=parse_latency(args.latency), jitter=args.jitter, error_rate=args.error_rate,
+        max_concurrent=args.max_concurrent, expire_after=args.expire_after, page_delay=args.page_delay,
+        assets=args.assets, asset_kb=args.asset_kb, seed=args.seed,
+    )
+
+
+def add_config_args(ap):
+    ap.add_argument("--fanout", default="4,4,3,1", help="anak per induk untuk level 3..6 (mis. 4,4,3 = tanpa sub-SLS)")
+    ap.add_argument("--assignments", type=int, default=6, help="assignment per SLS")
+    ap.add_argument("--keys", type=int, default=150, help="jawaban per assignment (ukuran payload detail)")
+    ap.add_argument("--latency", default="20", help="ms; per endpoint: 'detail=80,listing=150,20'")
+    ap.add_argument("--jitter", type=float, default=0.3, help="variasi latensi relatif (0.3 = ±30%%)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="peluang 503 per request")
+    ap.add_argument("--max-concurrent", type=int, default=0, help="di atas ini dibalas 429 (0 = tanpa batas)")
+    ap.add_argument("--expire-after", type=int, default=0, help="401 setelah N request (0 = tidak pernah)")
+    ap.add_argument("--page-delay", type=float, default=0.3, help="detik sampai tombol approve muncul")
+    ap.add_argument("--assets", type=int, default=8, help="gambar per halaman review (plus font & video)")
+    ap.add_argument("--asset-kb", type=int, default=40, help="ukuran tiap aset halaman review (KB)")
+    ap.add_argument("--seed", type=int, default=1)
+    return ap
+
+
+def main(argv=None):
+    ap = add_config_args(argparse.ArgumentParser(description="Server FASIH tiruan untuk benchmark lokal."))
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args(argv)
+    cfg = config_from_args(args)
+    server, _ = make_server(cfg, args.host, args.port)
+    print(f"FASIH stand-in di http://{args.host}:{server.server_port} • {len(cfg.smallcodes())} SLS x "
+          f"{cfg.assignments} assignment • survei {SURVEY_ID} periode {PERIOD_ID} kabupaten {KAB_CODE}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# fasih_sync.py
+"""
+Sinkron inkremental raw data: bandingkan listing (principal values, termasuk
+status & metadata modifikasi) dengan snapshot sebelumnya, lalu ambil detail
+hanya untuk assignment yang baru atau berubah.
+
+State per (kabupaten, periode) disimpan di `<output_dir>/.sync/`: sidik jari
+tiap baris listing + path export Raw_Data terakhir. Jawaban assignment yang
+tidak berubah diambil dari export tersebut.
+"""
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import pandas as pd
+
+from fasih_writer import read_parts
+
+STATE_DIR = ".sync"
+
+
+def listing_fingerprint(row):
+    """Sidik jari satu baris listing; nilai dinormalisasi ke string supaya stabil
+    juga saat dibaca ulang dari Excel (None/NaN → '')."""
+    norm = {}
+    for k, v in row.items():
+        if v is None or (isinstance(v, float) and v != v):
+            v = ""
+        norm[str(k)] = v if isinstance(v, str) else json.dumps(v, sort_keys=True, default=str)
+    return hashlib.sha1(json.dumps(norm, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _atomic_pickle(obj, path):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp, path)
+
+
+class SyncState:
+    """{assignment_id: sidik_jari} + path export terakhir untuk satu kab/periode."""
+
+    def __init__(self, output_dir, nama_kab, survey_period_id):
+        self.path = os.path.join(output_dir, STATE_DIR, f"{nama_kab}_{survey_period_id}.pkl")
+        self.output_dir = output_dir
+        self.nama_kab = nama_kab
+        self.fingerprints = {}
+        self.answers_path = None
+        self.assign_path = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    data = pickle.load(f)
+                self.fingerprints = data.get("fingerprints", {})
+                self.answers_path = data.get("answers_path")
+                self.assign_path = data.get("assign_path")
+            except Exception:
+                pass  # state rusak → sinkron penuh
+
+    def previous_exports(self, nama_survey):
+        """(path Raw_Data, path Assignment) terakhir; cari di folder bila state belum ada."""
+        answers_path, assign_path = self.answers_path, self.assign_path
+        if not (answers_path and os.path.exists(answers_path)):
+            answers_path = _latest(self.output_dir, f"Raw_Data_{self.nama_kab}_{nama_survey}_*")
+        if not (assign_path and os.path.exists(assign_path)):
+            assign_path = _latest(self.output_dir, f"Assignment_{self.nama_kab}_{nama_survey}_*")
+        return answers_path, assign_path
+
+    def save(self, answers_path, assign_path):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        _atomic_pickle({
+            "fingerprints": self.fingerprints,
+            "answers_path": answers_path,
+            "assign_path": assign_path,
+            "saved_at": time.time(),
+        }, self.path)
+
+
+def _latest(folder, pattern):
+    """Export terbaru (folder part atau .xlsx). Nama berakhiran timestamp
+    %Y%m%d_%H%M%S → urutan nama = urutan waktu; folder part didahulukan."""
+    paths = glob.glob(os.path.join(glob.escape(folder), pattern))
+    paths = [p for p in paths if os.path.isdir(p) or p.endswith(".xlsx")]
+    paths.sort(key=lambda p: (os.path.splitext(os.path.basename(p))[0], os.path.isdir(p)))
+    return paths[-1] if paths else None
+
+
+def fingerprints_from_export(assign_path):
+    """Sidik jari dari export Assignment lama (untuk export yang dibuat sebelum ada state)."""
+    if os.path.isdir(assign_path):
+        df = read_parts(assign_path)
+    else:
+        df = pd.read_excel(assign_path, dtype=str, keep_default_na=False)
+    if "assignmentId" not in df.columns:
+        return {}
+    return {row["assignmentId"]: listing_fingerprint(row) for row in df.to_dict("records")}
+
+
+def load_previous_answers(answers_path):
+    """{assignment_id: dict jawaban} dari export Raw_Data lama (folder part atau Excel)."""
+    if not answers_path or not os.path.exists(answers_path):
+        return {}
+    df = read_parts(answers_path) if os.path.isdir(answers_path) else pd.read_excel(answers_path)
+    if "assignment_id" not in df.columns:
+        return {}
+    df = df.astype(object).where(df.notna(), "")
+    return {str(r["assignment_id"]): r for r in df.to_dict("records")}
+
+
+class IncrementalSync:
+    """
+    Rencana + penggabungan satu sinkron inkremental.
+
+    Pakai `need_detail` sebagai predikat fetcher dan `wrap(sink)` sebagai sink-nya
+    (jawaban lengkap, urutan listing), lalu `commit(...)` setelah export ditulis.
+    """
+
+    def __init__(self, output_dir, nama_kab, nama_survey, survey_period_id):
+        self.state = SyncState(output_dir, nama_kab, survey_period_id)
+        answers_path, assign_path = self.state.previous_exports(nama_survey)
+        self.previous = load_previous_answers(answers_path)
+        self.known = dict(self.state.fingerprints)
+        if not self.known and assign_path:
+            try:
+                self.known = fingerprints_from_export(assign_path)
+            except Exception:
+                self.known = {}
+        self.current = {}  # assignment_id → sidik jari listing terbaru
+        self.inner = None
+        self.new = self.changed = self.unchanged = 0
+
+    def need_detail(self, row):
+        """True bila detail assignment harus diambil ulang (baru / berubah / tak ada di export lama)."""
+        aid = str(row.get("assignmentId"))
+        fp = listing_fingerprint(row)
+        self.current[aid] = fp
+        if aid not in self.known:
+            self.new += 1
+            return True
+        if self.known[aid] != fp or aid not in self.previous:
+            self.changed += 1
+            return True
+        self.unchanged += 1
+        return False
+
+    def wrap(self, sink):
+        """Bungkus sink fetcher: assignment yang dilewati/gagal diisi jawaban dari
+        export lama; smallcode yang listing-nya gagal tetap memakai baris lamanya."""
+        self.inner = sink
+        return self
+
+    def listing(self, smallcode, rows, err):
+        self.inner.listing(smallcode, rows, err)
+        if err is not None:
+            for answer in self.previous.values():
+                if str(answer.get("smallCode")) == str(smallcode):
+                    self.inner.assignment(smallcode, {}, answer, None)
+
+    def assignment(self, smallcode, row, answer, err):
+        aid = str(row.get("assignmentId"))
+        if err is not None:
+            self.current.pop(aid, None)  # jangan tandai sinkron → dicoba lagi berikutnya
+        if answer is None:
+            answer = self.previous.get(aid)
+        self.inner.assignment(smallcode, row, answer, err)
+
+    def commit(self, answers_path, assign_path):
+        self.state.fingerprints.update(self.current)
+        self.state.save(answers_path, assign_path)
+
+    def summary(self):
+        return f"baru {self.new} • berubah {self.changed} • tidak berubah {self.unchanged}"
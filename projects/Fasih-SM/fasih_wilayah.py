@@ -0,0 +1,521 @@
+# fasih_wilayah.py
+"""
+Crawler daftar wilayah FASIH (kecamatan → desa → SLS → sub-SLS).
+
+Setiap level di-fan-out paralel dengan jumlah worker terbatas, lalu hasilnya
+disusun kembali sesuai urutan dari API sehingga kolom output tetap sama dengan
+versi serial lama: `<level>_id`, `<level>`, ..., `smallcode`.
+
+Hasil crawl disimpan di cache lokal (`RegionCache`) yang dikunci per
+regionGroupId, sehingga survei yang berbagi group (mis. PEMUTAKHIRAN dan
+PENDATAAN) cukup di-crawl sekali. Snapshot disimpan kolumnar (`RegionStore`,
+Parquet bila pyarrow tersedia) dengan indeks prefix smallcode.
+
+Modul ini sengaja tidak meng-import streamlit: progress dan error dilaporkan
+lewat callback yang selalu dipanggil dari thread pemanggil.
+"""
+import bisect
+import json
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from fasih_client import DEFAULT_WORKERS, REGION_BASE, FasihClient
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pyarrow_ok = True
+except Exception:
+    pyarrow_ok = False
+
+MAX_LEVEL = 6  # level terdalam yang dikenal: sub-SLS
+
+CACHE_DIR = os.path.join("cached_data", "wilayah")
+DEFAULT_TTL = 24 * 3600  # detik
+# Umur maksimum daftar anak per level, dalam kelipatan TTL. Kecamatan & desa
+# (kode master BPS) jarang berubah; SLS/sub-SLS berubah saat pemutakhiran,
+# jadi hanya level itu yang diambil ulang ketika snapshot kedaluwarsa.
+LEVEL_TTL_FACTOR = {3: 7, 4: 7, 5: 1, 6: 1}
+FLUSH_INTERVAL = 5.0  # detik antar checkpoint node store selama crawl
+
+
+def fetch_region_children(sess, region_group_id, level, parent_id, timeout=None):
+    """Ambil daftar anak `level` (3..6) dari induk `parent_id` (level-1)."""
+    url = f"{REGION_BASE}/level{level}?groupId={region_group_id}&level{level - 1}Id={parent_id}"
+    resp = sess.get(url, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json().get("data", []) or []
+
+
+def _node(item):
+    return (item.get("id"), item.get("name"), item.get("fullCode"))
+
+
+def _atomic_pickle(obj, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+class RegionStore:
+    """
+    Daftar wilayah satu kabupaten dalam format kolumnar.
+
+    - Baris diurutkan menurut `smallcode`; karena kode BPS hierarkis, semua
+      turunan satu kecamatan/desa menempati satu rentang baris yang bersebelahan.
+    - Kolom nama disimpan sebagai kategori (dictionary-encoded di Parquet).
+    - Metadata file memuat `fetched_at` dan `level_index`:
+      {level: {id: [nama, prefix, start, stop]}} untuk tiap level di atas leaf.
+
+    Parquet (pyarrow) memungkinkan `select()` hanya membaca row group yang
+    beririsan dengan prefix; tanpa pyarrow jatuh ke pickle (dibaca utuh).
+    """
+
+    ROW_GROUP_SIZE = 2048
+
+    def __init__(self, path):
+        self.path = path
+        self._meta = None
+        self._codes = None
+
+    @classmethod
+    def path_for(cls, base):
+        return f"{base}.parquet" if pyarrow_ok else f"{base}.pkl"
+
+    @staticmethod
+    def _level_names(df):
+        return [c[:-3] for c in df.columns if c.endswith("_id") and c[:-3] in df.columns]
+
+    @classmethod
+    def write(cls, path, df, fetched_at=None):
+        df = df.copy()
+        df["smallcode"] = df["smallcode"].astype(str)
+        df = df.sort_values("smallcode", kind="stable").reset_index(drop=True)
+        codes = df["smallcode"].tolist()
+
+        level_index = {}
+        # leaf (level terakhir) tidak perlu diindeks: satu baris = satu smallcode
+        for name in cls._level_names(df)[:-1]:
+            idx = {}
+            for node_id, rows in df.groupby(f"{name}_id", sort=False).indices.items():
+                start, stop = int(rows.min()), int(rows.max()) + 1
+                prefix = os.path.commonprefix([codes[start], codes[stop - 1]])
+                idx[str(node_id)] = [str(df.at[start, name]), prefix, start, stop]
+            level_index[name] = idx
+        for name in cls._level_names(df):
+            df[name] = df[name].astype("category")
+
+        meta = {"fetched_at": fetched_at or time.time(), "level_index": level_index, "rows": len(df)}
+        tmp = f"{path}.tmp"
+        if path.endswith(".parquet"):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"fasih": json.dumps(meta).encode()})
+            pq.write_table(table, tmp, row_group_size=cls.ROW_GROUP_SIZE, use_dictionary=True, compression="zstd")
+        else:
+            with open(tmp, "wb") as f:
+                pickle.dump({"df": df, "meta": meta}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return cls(path)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @property
+    def meta(self):
+        """Metadata (fetched_at, level_index, rows) — untuk Parquet hanya footer yang dibaca."""
+        if self._meta is None:
+            if self.path.endswith(".parquet"):
+                self._meta = json.loads(pq.read_schema(self.path).metadata[b"fasih"])
+            else:
+                with open(self.path, "rb") as f:
+                    self._meta = pickle.load(f)["meta"]
+        return self._meta
+
+    @property
+    def fetched_at(self):
+        return self.meta["fetched_at"]
+
+    def levels(self):
+        """Nama level yang bisa dipakai untuk memilih subset (mis. kecamatan, desa)."""
+        return list(self.meta["level_index"])
+
+    def nodes(self, level):
+        """{id: (nama, prefix)} untuk satu level."""
+        return {k: (v[0], v[1]) for k, v in self.meta["level_index"][level].items()}
+
+    def load(self):
+        if self.path.endswith(".parquet"):
+            return pq.read_table(self.path).to_pandas()
+        with open(self.path, "rb") as f:
+            return pickle.load(f)["df"]
+
+    def smallcodes(self):
+        """Kolom smallcode terurut (indeks prefix); dibaca sekali lalu disimpan."""
+        if self._codes is None:
+            if self.path.endswith(".parquet"):
+                self._codes = pq.read_table(self.path, columns=["smallcode"]).column(0).to_pylist()
+            else:
+                self._codes = self.load()["smallcode"].tolist()
+        return self._codes
+
+    def prefix_range(self, prefix):
+        """Rentang baris [start, stop) yang smallcode-nya diawali `prefix`."""
+        codes = self.smallcodes()
+        start = bisect.bisect_left(codes, prefix)
+        stop = bisect.bisect_left(codes, prefix + "\uffff")
+        return start, stop
+
+    def select(self, prefixes):
+        """Subset baris untuk satu/lebih prefix smallcode, tanpa memuat seluruh file (Parquet)."""
+        if isinstance(prefixes, str):
+            prefixes = [prefixes]
+        prefixes = sorted(set(prefixes))
+        if not prefixes:
+            return self.load().iloc[0:0]
+        if self.path.endswith(".parquet"):
+            # filter DNF: OR atas rentang [prefix, prefix+\uffff); row group di luar rentang dilewati
+            filters = [[("smallcode", ">=", p), ("smallcode", "<", p + "\uffff")] for p in prefixes]
+            return pq.read_table(self.path, filters=filters).to_pandas()
+        df = self.load()
+        parts = [df.iloc[slice(*self.prefix_range(p))] for p in prefixes]
+        return pd.concat(parts).drop_duplicates("smallcode").reset_index(drop=True)
+
+
+class RegionCache:
+    """
+    Cache wilayah di disk, satu folder per regionGroupId:
+
+    - `nodes.pkl`: daftar anak per induk {(level, parent_id): (fetched_at, [node, ...])}
+      dipakai bersama oleh semua kabupaten/survei dalam group tsb.
+    - `snapshot_<kab>_<depth>.parquet`: daftar wilayah hasil rakitan terakhir (RegionStore).
+
+    - `crawl_<kab>_<depth>.json`: checkpoint crawl yang belum selesai. Selama
+      file ini ada, daftar anak yang diambil sejak crawl dimulai dianggap segar,
+      sehingga run berikutnya melanjutkan dari titik terakhir.
+
+    Aman dipakai dari banyak thread (worker crawler).
+    """
+
+    def __init__(self, root=CACHE_DIR, ttl=DEFAULT_TTL, level_ttl_factor=None):
+        self.root = root
+        self.ttl = ttl
+        self.level_ttl_factor = {**LEVEL_TTL_FACTOR, **(level_ttl_factor or {})}
+        self.resume_after = None  # node yang diambil sejak waktu ini selalu dianggap segar
+        self._lock = threading.Lock()
+        self._nodes = {}  # group_id -> dict node store
+        self._dirty = set()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.time()
+
+    def _group_dir(self, group_id):
+        path = os.path.join(self.root, str(group_id))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def snapshot_store(self, group_id, kabupaten_id, depth):
+        base = os.path.join(self._group_dir(group_id), f"snapshot_{kabupaten_id}_{depth}")
+        return RegionStore(RegionStore.path_for(base))
+
+    # ---- snapshot per (group, kabupaten, depth) ----
+    def load_snapshot(self, group_id, kabupaten_id, depth):
+        """Kembalikan (df, fetched_at) atau (None, None) bila belum ada."""
+        store = self.snapshot_store(group_id, kabupaten_id, depth)
+        if not store.exists():
+            return None, None
+        try:
+            return store.load(), store.fetched_at
+        except Exception:
+            return None, None
+
+    def save_snapshot(self, group_id, kabupaten_id, depth, df):
+        store = self.snapshot_store(group_id, kabupaten_id, depth)
+        return RegionStore.write(store.path, df)
+
+    # ---- checkpoint crawl ----
+    def _checkpoint_path(self, group_id, kabupaten_id, depth):
+        return os.path.join(self._group_dir(group_id), f"crawl_{kabupaten_id}_{depth}.json")
+
+    def start_crawl(self, group_id, kabupaten_id, depth):
+        """Mulai / lanjutkan crawl. Kembalikan (started_at, resumed)."""
+        path = self._checkpoint_path(group_id, kabupaten_id, depth)
+        started_at, resumed = time.time(), False
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    started_at, resumed = json.load(f)["started_at"], True
+            except Exception:
+                pass
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"started_at": started_at}, f)
+        self.resume_after = started_at
+        return started_at, resumed
+
+    def finish_crawl(self, group_id, kabupaten_id, depth):
+        path = self._checkpoint_path(group_id, kabupaten_id, depth)
+        if os.path.exists(path):
+            os.remove(path)
+        self.resume_after = None
+
+    def is_fresh(self, fetched_at, level=None):
+        if fetched_at is None:
+            return False
+        if self.resume_after is not None and fetched_at >= self.resume_after:
+            return True
+        factor = self.level_ttl_factor.get(level, 1) if level else 1
+        return (time.time() - fetched_at) < self.ttl * factor
+
+    # ---- node store per group ----
+    def _store(self, group_id):
+        store = self._nodes.get(group_id)
+        if store is None:
+            path = os.path.join(self._group_dir(group_id), "nodes.pkl")
+            store = {}
+            if os.path.exists(path):
+                try:
+                    with open(path, "rb") as f:
+                        store = pickle.load(f)
+                except Exception:
+                    store = {}
+            self._nodes[group_id] = store
+        return store
+
+    def get_children(self, group_id, level, parent_id):
+        """Kembalikan (fetched_at, nodes) dari cache, atau (None, None)."""
+        with self._lock:
+            return self._store(group_id).get((level, parent_id), (None, None))
+
+    def put_children(self, group_id, level, parent_id, nodes):
+        """Simpan daftar anak; kembalikan True bila isinya berubah dari cache lama."""
+        with self._lock:
+            store = self._store(group_id)
+            old = store.get((level, parent_id), (None, None))[1]
+            store[(level, parent_id)] = (time.time(), nodes)
+            self._dirty.add(group_id)
+            return old is not None and old != nodes
+
+    def flush(self):
+        # salin store di bawah _lock, pickle di luarnya: put_children tidak ikut menunggu disk
+        with self._flush_lock:
+            with self._lock:
+                pending = {g: dict(self._nodes[g]) for g in self._dirty}
+                self._dirty.clear()
+                self._last_flush = time.time()
+            for group_id, store in pending.items():
+                _atomic_pickle(store, os.path.join(self._group_dir(group_id), "nodes.pkl"))
+
+    def flush_due(self, interval=FLUSH_INTERVAL):
+        return bool(self._dirty) and time.time() - self._last_flush >= interval
+
+    def maybe_flush(self, interval=FLUSH_INTERVAL):
+        """Checkpoint berkala: tulis node store bila sudah lewat `interval` detik."""
+        if self.flush_due(interval):
+            self.flush()
+
+
+class ChildrenResolver:
+    """
+    Lapisan cache + statistik di atas pengambilan daftar anak wilayah; dipakai
+    bersama oleh mesin thread (crawl_wilayah) dan mesin asyncio (fasih_async).
+    """
+
+    def __init__(self, cache, group_id, stats=None):
+        self.cache = cache
+        self.group_id = group_id
+        self.stats = stats if stats is not None else {}
+        for k in ("reused", "fetched", "changed", "failed"):
+            self.stats.setdefault(k, 0)
+        self._lock = threading.Lock()
+
+    def cached(self, level, parent_id):
+        """Daftar anak dari cache bila masih segar, selain itu None."""
+        if self.cache is None:
+            return None
+        fetched_at, nodes = self.cache.get_children(self.group_id, level, parent_id)
+        if nodes is not None and self.cache.is_fresh(fetched_at, level):
+            with self._lock:
+                self.stats["reused"] += 1
+            return nodes
+        return None
+
+    def store(self, level, parent_id, items):
+        """Simpan hasil API (list dict) ke cache; kembalikan list node."""
+        nodes = [_node(c) for c in items]
+        changed = self.cache.put_children(self.group_id, level, parent_id, nodes) if self.cache is not None else False
+        with self._lock:
+            self.stats["fetched"] += 1
+            self.stats["changed"] += int(changed)
+        return nodes
+
+    def failed(self):
+        with self._lock:
+            self.stats["failed"] += 1
+
+    def checkpoint_due(self):
+        return self.cache is not None and self.cache.flush_due()
+
+    def checkpoint(self, final=False):
+        if self.cache is not None:
+            self.cache.flush() if final else self.cache.maybe_flush()
+
+
+def paths_to_dataframe(paths, level_names):
+    """Ubah list path [(id, name, fullCode), ...] menjadi DataFrame daftar wilayah."""
+    rows = []
+    for path in paths:
+        row = {}
+        for name, (node_id, node_name, _) in zip(level_names, path):
+            row[f"{name}_id"] = node_id
+            row[name] = node_name
+        row["smallcode"] = path[-1][2]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def crawl_wilayah(
+    kabupaten_id,
+    level_region,
+    region_group_id,
+    headers,
+    cookies,
+    max_workers=DEFAULT_WORKERS,
+    timeout=None,
+    on_progress=None,
+    on_error=None,
+    sess=None,
+    cache=None,
+    stats=None,
+    engine="thread",
+):
+    """
+    Telusuri seluruh wilayah di bawah kabupaten secara paralel per level.
+
+    - `level_region` minimal 3 level (prov, kab, kec); level > 6 diabaikan.
+    - `on_progress(level_name, selesai, total)` dan `on_error(level_name, nama_induk, exc)`
+      dipanggil dari thread pemanggil, jadi aman untuk update widget Streamlit.
+    - Gagal ambil daftar kecamatan → exception diteruskan ke pemanggil; gagal di
+      level bawahnya → subtree induk tsb dilewati (sama seperti versi serial).
+    - Dengan `cache` (RegionCache), daftar anak yang masih segar diambil dari disk
+      dan node store di-checkpoint berkala; `stats` (dict) diisi hitungan
+      reused/fetched/changed/failed.
+    - `engine="async"` memakai klien asyncio/httpx (fasih_async) dengan
+      `max_workers` sebagai batas request yang sedang berjalan.
+    """
+    depth = min(len(level_region), MAX_LEVEL)
+    level_names = [level_region[i]["name"] for i in range(2, depth)]
+    resolver = ChildrenResolver(cache, region_group_id, stats)
+
+    if engine == "async":
+        from fasih_async import crawl_frontier  # import lambat: httpx opsional
+        try:
+            frontier = crawl_frontier(
+                resolver, kabupaten_id, region_group_id, depth, level_names, headers, cookies,
+                max_in_flight=max_workers, timeout=timeout, on_progress=on_progress, on_error=on_error,
+            )
+        finally:
+            resolver.checkpoint(final=True)
+        return paths_to_dataframe(frontier, level_names)
+
+    own_session = sess is None
+    if own_session:
+        sess = FasihClient(headers, cookies, max_workers)
+
+    def children_of(level, parent_id):
+        nodes = resolver.cached(level, parent_id)
+        if nodes is None:
+            nodes = resolver.store(level, parent_id, fetch_region_children(sess, region_group_id, level, parent_id, timeout))
+        return nodes
+
+    try:
+        frontier = [(k,) for k in children_of(3, kabupaten_id)]
+        if on_progress:
+            on_progress(level_names[0], 1, 1)
+
+        with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as pool:
+            for level in range(4, depth + 1):
+                level_name = level_names[level - 3]
+                futures = {
+                    pool.submit(children_of, level, path[-1][0]): i
+                    for i, path in enumerate(frontier)
+                }
+                children = [None] * len(frontier)
+                done = 0
+                for fut in as_completed(futures):
+                    i = futures[fut]
+                    try:
+                        children[i] = fut.result()
+                    except Exception as e:
+                        resolver.failed()
+                        if on_error:
+                            on_error(level_name, frontier[i][-1][1], e)
+                    done += 1
+                    resolver.checkpoint()
+                    if on_progress:
+                        on_progress(level_name, done, len(frontier))
+
+                # susun ulang sesuai urutan induk agar output deterministik
+                frontier = [
+                    path + (child,)
+                    for path, kids in zip(frontier, children) if kids
+                    for child in kids
+                ]
+    finally:
+        resolver.checkpoint(final=True)
+        if own_session:
+            sess.close()
+
+    return paths_to_dataframe(frontier, level_names)
+
+
+def load_wilayah(
+    kabupaten_id,
+    level_region,
+    region_group_id,
+    headers,
+    cookies,
+    cache=None,
+    force=False,
+    **crawl_kwargs,
+):
+    """
+    Ambil daftar wilayah lewat cache:
+
+    - snapshot (group, kabupaten, depth) masih dalam TTL → langsung dari disk;
+    - kedaluwarsa / `force` → crawl ulang, hanya daftar anak yang kedaluwarsa
+      (lihat LEVEL_TTL_FACTOR) yang diambil dari API;
+    - crawl sebelumnya terputus (checkpoint ada) → dilanjutkan, daftar anak yang
+      sudah terambil tidak diminta lagi. Bila masih ada subtree gagal, snapshot
+      tidak disimpan dan checkpoint dipertahankan untuk run berikutnya.
+
+    Kembalikan (df, info) dengan info = {"source", "fetched_at", "reused", "fetched",
+    "changed", "failed", "resumed", "store"}; `store` adalah RegionStore snapshot
+    (None bila hasil kosong / belum lengkap).
+    """
+    cache = cache or RegionCache()
+    depth = min(len(level_region), MAX_LEVEL)
+    if not force:
+        df, fetched_at = cache.load_snapshot(region_group_id, kabupaten_id, depth)
+        if df is not None and cache.is_fresh(fetched_at):
+            store = cache.snapshot_store(region_group_id, kabupaten_id, depth)
+            return df, {"source": "cache", "fetched_at": fetched_at, "reused": 0, "fetched": 0,
+                        "changed": 0, "failed": 0, "resumed": False, "store": store}
+
+    if force:
+        # paksa: abaikan umur node, semua daftar anak diambil ulang
+        cache = RegionCache(cache.root, ttl=0, level_ttl_factor=cache.level_ttl_factor)
+    _, resumed = cache.start_crawl(region_group_id, kabupaten_id, depth)
+    stats = {}
+    df = crawl_wilayah(kabupaten_id, level_region, region_group_id, headers, cookies,
+                       cache=cache, stats=stats, **crawl_kwargs)
+    store = None
+    if not stats["failed"]:
+        cache.finish_crawl(region_group_id, kabupaten_id, depth)
+        if not df.empty:
+            store = cache.save_snapshot(region_group_id, kabupaten_id, depth, df)
+    return df, dict(stats, source="api", fetched_at=time.time(), resumed=resumed, store=store)
@@ -0,0 +1,153 @@
+# fasih_writer.py
+"""
+Penulis hasil raw data secara streaming (memori tetap datar berapa pun ukuran survei).
+
+Baris ditampung di ColumnBuffer sampai `chunk_rows`, lalu ditulis sebagai satu
+file part (`part-00000.parquet`, atau `.csv` bila pyarrow tidak ada) di satu folder.
+Kolom boleh berbeda antar part (jawaban tiap assignment tidak selalu sama);
+Excel akhir dibangun part demi part dengan openpyxl mode write_only.
+"""
+import glob
+import json
+import os
+
+import pandas as pd
+
+from fasih_columns import ColumnBuffer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pyarrow_ok = True
+except Exception:
+    pyarrow_ok = False
+
+DEFAULT_CHUNK_ROWS = 2000
+EXCEL_MAX_ROWS = 1_048_575  # batas baris sheet Excel dikurangi header
+
+
+def _cell(v):
+    """Nilai aman untuk Parquet/Excel: list/dict → JSON, NaN → None."""
+    if isinstance(v, (list, dict)):
+        return json.dumps(v, ensure_ascii=False)
+    if isinstance(v, float) and v != v:
+        return None
+    return v
+
+
+class ChunkedTableWriter:
+    """Tulis dict baris ke folder part berukuran `chunk_rows`."""
+
+    def __init__(self, folder, chunk_rows=DEFAULT_CHUNK_ROWS, fmt=None, columns=()):
+        self.folder = folder
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.fmt = fmt or ("parquet" if pyarrow_ok else "csv")
+        self.rows = 0
+        # kolom dipelajari sekali dan dipertahankan antar part → skema part seragam
+        self._buf = ColumnBuffer(columns, capacity=self.chunk_rows)
+        os.makedirs(folder, exist_ok=True)
+        self._parts = len(part_files(folder))  # lanjutkan penomoran bila folder sudah berisi (resume)
+
+    @property
+    def parts(self):
+        return self._parts
+
+    def append(self, row):
+        self._buf.append({k: _cell(v) for k, v in row.items()})
+        self.rows += 1
+        if len(self._buf) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not len(self._buf):
+            return
+        path = os.path.join(self.folder, f"part-{self._parts:05d}.{self.fmt}")
+        tmp = path + ".tmp"
+        if self.fmt == "parquet":
+            pq.write_table(self._buf.to_arrow(), tmp, compression="zstd")
+        else:
+            self._buf.to_frame().to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        self._parts += 1
+        self._buf.clear()
+
+    def close(self):
+        self.flush()
+        return self.folder
+
+
+def part_files(folder):
+    return sorted(glob.glob(os.path.join(glob.escape(folder), "part-*.parquet"))
+                  + glob.glob(os.path.join(glob.escape(folder), "part-*.csv")))
+
+
+def iter_parts(folder):
+    """DataFrame per part, urut sesuai penulisan."""
+    for path in part_files(folder):
+        if path.endswith(".parquet"):
+            yield pd.read_parquet(path)
+        else:
+            yield pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def part_columns(folder):
+    """Gabungan kolom semua part (urutan kemunculan pertama) tanpa memuat datanya."""
+    cols = {}
+    for path in part_files(folder):
+        if path.endswith(".parquet"):
+            names = pq.read_schema(path).names
+        else:
+            names = pd.read_csv(path, nrows=0).columns
+        for c in names:
+            cols.setdefault(c, None)
+    return list(cols)
+
+
+def read_parts(folder):
+    """Semua part sebagai satu DataFrame (untuk data kecil / pratinjau)."""
+    frames = list(iter_parts(folder))
+    return pd.concat(frames, ignore_index=True, sort=False) if frames else pd.DataFrame()
+
+
+def parts_to_excel(folder, path):
+    """Bangun file Excel dari folder part, streaming per part. Kembalikan jumlah baris."""
+    from openpyxl import Workbook
+
+    columns = part_columns(folder)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(columns)
+    n = 0
+    for df in iter_parts(folder):
+        df = df.reindex(columns=columns)
+        for row in df.itertuples(index=False, name=None):
+            if n >= EXCEL_MAX_ROWS:
+                break
+            ws.append(["" if v is None or (isinstance(v, float) and v != v) else v for v in row])
+            n += 1
+    wb.save(path)
+    return n
+
+
+class ExportSink:
+    """Sink fetcher → dua ChunkedTableWriter (jawaban & listing assignment)."""
+
+    def __init__(self, answers_writer, assign_writer):
+        self.answers = answers_writer
+        self.assignments = assign_writer
+
+    def listing(self, smallcode, rows, err):
+        for row in rows:
+            self.assignments.append(row)
+
+    def assignment(self, smallcode, row, answer, err):
+        if answer is not None:
+            self.answers.append(answer)
+
+    def flush(self):
+        self.answers.flush()
+        self.assignments.flush()
+
+    def close(self):
+        self.answers.close()
+        self.assignments.close()
@@ -0,0 +1,52 @@
+# tests/conftest.py
+"""
+Fixture bersama: modul Fasih-SM di sys.path dan satu stand-in FASIH lokal.
+FASIH_BASE_URL di-set di sini, sebelum modul test meng-import fasih_client.
+
+    cd projects/Fasih-SM && python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fasih_standin  # noqa: E402  (hanya pustaka standar, aman sebelum FASIH_BASE_URL)
+
+CFG = fasih_standin.Config(fanout=(2, 2, 2), assignments=3, keys=8, latency={"lainnya": 0.0}, jitter=0.0)
+URL, SERVER, STATE = fasih_standin.start_background(CFG)
+os.environ["FASIH_BASE_URL"] = URL
+
+
+@pytest.fixture(scope="session")
+def standin():
+    """(base_url, StandinState) stand-in bersama; jangan ubah cfg-nya dari test."""
+    return URL, STATE
+
+
+@pytest.fixture
+def client():
+    from fasih_client import FasihClient
+
+    c = FasihClient(max_workers=4)
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def server():
+    """Stand-in tambahan dengan Config sendiri: `server(error_rate=1.0)` → (base_url, state)."""
+    started = []
+
+    def make(**cfg):
+        cfg.setdefault("latency", {"lainnya": 0.0})
+        cfg.setdefault("jitter", 0.0)
+        url, srv, state = fasih_standin.start_background(fasih_standin.Config(**cfg))
+        started.append(srv)
+        return url, state
+
+    yield make
+    for srv in started:
+        srv.shutdown()
+        srv.server_close()
@@ -0,0 +1,45 @@
+import math
+
+import pandas as pd
+import pytest
+
+from fasih_columns import ColumnBuffer, pyarrow_ok
+
+
+def fill(buf, rows):
+    for r in rows:
+        buf.append(r)
+    return buf
+
+
+def test_numeric_columns_are_typed_with_null_mask():
+    buf = fill(ColumnBuffer(capacity=2), [{"a": 1, "b": 1.5, "c": "x"}, {"a": 2, "c": "y"}, {"a": 3, "b": 2.5}])
+    assert buf.kinds == {"a": "q", "b": "d", "c": "o"} and buf.capacity == 4
+    df = buf.to_frame()
+    assert str(df["a"].dtype) == "int64" and list(df["a"]) == [1, 2, 3]
+    assert math.isnan(df["b"][1]) and df["b"][2] == 2.5
+    assert list(df["c"][:2]) == ["x", "y"] and pd.isna(df["c"][2])
+
+
+def test_mixed_values_fall_back_to_list():
+    buf = fill(ColumnBuffer(), [{"a": 1}, {"a": None}, {"a": 2.5}, {"b": 7}, {"b": "tujuh"}, {"c": True}, {"d": 2**70}])
+    assert buf.kinds == {"a": "d", "b": "o", "c": "o", "d": "o"}
+    df = buf.to_frame()
+    assert list(df["a"][[0, 2]]) == [1.0, 2.5] and math.isnan(df["a"][1])
+    assert list(df["b"][3:5]) == [7, "tujuh"] and df["c"][5] is True and df["d"][6] == 2**70
+
+
+def test_clear_keeps_kinds_and_empties_cells():
+    buf = fill(ColumnBuffer(capacity=2), [{"a": 1}, {"a": 2}])
+    buf.clear()
+    fill(buf, [{"b": "x"}])
+    assert buf.kinds["a"] == "q" and len(buf) == 1
+    assert math.isnan(buf.to_frame()["a"][0])
+
+
+@pytest.mark.skipif(not pyarrow_ok, reason="pyarrow tidak terpasang")
+def test_to_arrow_uses_mask_for_nulls():
+    table = fill(ColumnBuffer(), [{"a": 1, "b": "x"}, {"b": "y"}, {"a": 3, "b": float("nan")}]).to_arrow()
+    assert str(table.schema.field("a").type) == "int64"
+    assert table.column("a").to_pylist() == [1, None, 3]
+    assert table.column("b").to_pylist() == ["x", "y", None]
@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import pytest
+
+from fasih_detail_cache import DetailCache, detail_key
+
+
+@pytest.fixture
+def row(standin):
+    state = standin[1]
+    return state.listing(state.cfg.smallcodes()[0])[0]
+
+
+def detail_requests(state):
+    return state.counts.get("detail", 0)
+
+
+def test_second_read_comes_from_disk(tmp_path, standin, client, row):
+    state = standin[1]
+    cache = DetailCache(str(tmp_path))
+    before = detail_requests(state)
+    first = cache.answers(client, row)
+    second = cache.answers(client, row)
+    assert first == second and len(first) == state.cfg.keys
+    assert detail_requests(state) - before == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.text() == "cache detail 1/2"
+
+
+def test_changed_listing_row_refetches(tmp_path, standin, client, row):
+    state = standin[1]
+    cache = DetailCache(str(tmp_path))
+    cache.answers(client, row)
+    before = detail_requests(state)
+    cache.answers(client, {**row, "assignmentStatusAlias": "APPROVED BY PML"})
+    assert detail_requests(state) - before == 1
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = DetailCache(str(tmp_path))
+    cache.put("A-1", "s", b'{"data": {}}')
+    with open(cache._path(detail_key("A-1", "s")), "wb") as f:
+        f.write(b"bukan zlib")
+    assert cache.get("A-1", "s") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    blob = os.urandom(1000)  # tidak terkompresi → ukuran entri ~1000 byte
+    cache = DetailCache(str(tmp_path), max_bytes=3500)
+    for i in range(3):
+        cache.put(f"A-{i}", "s", blob)
+        os.utime(cache._path(detail_key(f"A-{i}", "s")), (1000 + i, 1000 + i))
+    assert cache.get("A-0", "s") == blob  # A-0 baru dipakai → A-1 yang tertua
+    cache.put("A-3", "s", blob)
+    assert cache.evicted >= 1
+    assert cache.get("A-1", "s") is None
+    assert cache.get("A-0", "s") == blob and cache.get("A-3", "s") == blob
+
+
+def test_async_path_shares_entries(tmp_path, standin, client, row):
+    pytest.importorskip("httpx")
+    from fasih_async import AsyncFasihClient
+
+    state = standin[1]
+    cache = DetailCache(str(tmp_path))
+    expected = cache.answers(client, row)
+    before = detail_requests(state)
+
+    async def main():
+        async with AsyncFasihClient(dict(client.headers), client.cookies, 2) as aclient:
+            return await cache.answers_async(aclient, row)
+
+    assert asyncio.run(main()) == expected
+    assert detail_requests(state) == before
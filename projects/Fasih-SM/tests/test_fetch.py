@@ -0,0 +1,151 @@
+import random
+
+import pytest
+
+import fasih_standin
+from fasih_fetch import BACKLOG_PER_WORKER, AssignmentFetcher, OrderedEmitter
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def listing(self, smallcode, rows, err):
+        self.calls.append(("listing", smallcode, len(rows), err))
+
+    def assignment(self, smallcode, row, answer, err):
+        self.calls.append(("assignment", smallcode, row["assignmentId"], answer))
+
+
+# ---- OrderedEmitter ----
+LISTINGS = [[{"assignmentId": f"{sc}-{j}"} for j in range(n)] for sc, n in (("A", 2), ("B", 0), ("C", 3))]
+
+
+def emit_all(emitter, order):
+    for kind, i, j in order:
+        if kind == "listing":
+            emitter.listing(i, LISTINGS[i])
+        else:
+            emitter.result(i, j, f"jawaban {i}.{j}")
+
+
+def all_events():
+    events = [("listing", i, None) for i in range(3)]
+    return events + [("result", i, j) for i, rows in enumerate(LISTINGS) for j in range(len(rows))]
+
+
+def in_order(events):
+    """Urutan valid: listing i sebelum hasilnya."""
+    seen = set()
+    for kind, i, _ in events:
+        if kind == "result" and i not in seen:
+            return False
+        if kind == "listing":
+            seen.add(i)
+    return True
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_emitter_forwards_in_listing_order(seed):
+    events = all_events()
+    rnd = random.Random(seed)
+    while True:
+        rnd.shuffle(events)
+        if in_order(events):
+            break
+    sink = Recorder()
+    emitter = OrderedEmitter(["A", "B", "C"], sink)
+    emit_all(emitter, events)
+    assert sink.calls == [
+        ("listing", "A", 2, None), ("assignment", "A", "A-0", "jawaban 0.0"), ("assignment", "A", "A-1", "jawaban 0.1"),
+        ("listing", "B", 0, None),
+        ("listing", "C", 3, None), ("assignment", "C", "C-0", "jawaban 2.0"), ("assignment", "C", "C-1", "jawaban 2.1"),
+        ("assignment", "C", "C-2", "jawaban 2.2"),
+    ]
+    assert emitter.held == 0
+
+
+def test_emitter_holds_results_behind_slow_smallcode():
+    sink = Recorder()
+    emitter = OrderedEmitter(["A", "B", "C"], sink)
+    emit_all(emitter, [("listing", 2, None), ("result", 2, 0), ("result", 2, 1)])
+    assert sink.calls == [] and emitter.held == 3
+    emit_all(emitter, [("listing", 0, None), ("result", 0, 0), ("result", 0, 1), ("listing", 1, None)])
+    assert [c[1] for c in sink.calls if c[0] == "listing"] == ["A", "B", "C"]
+    assert emitter.held == 1  # C-2 belum ada hasilnya
+
+
+def test_closed_emitter_forwards_nothing():
+    sink = Recorder()
+    emitter = OrderedEmitter(["A", "B", "C"], sink)
+    emitter.close()
+    emit_all(emitter, all_events())
+    assert sink.calls == []
+
+
+# ---- fetcher (thread & async) terhadap stand-in ----
+@pytest.fixture(params=["thread", "async"])
+def fetcher_cls(request):
+    if request.param == "async":
+        pytest.importorskip("httpx")
+        from fasih_async import AsyncAssignmentFetcher
+        return AsyncAssignmentFetcher
+    return AssignmentFetcher
+
+
+def run(fetcher):
+    return [ev for ev in fetcher.iter_events()]
+
+
+def test_fetcher_collects_everything_in_order(standin, client, fetcher_cls):
+    state = standin[1]
+    codes = state.cfg.smallcodes()
+    fetcher = fetcher_cls(client, client.headers, fasih_standin.PERIOD_ID, max_workers=4).start(codes)
+    events = run(fetcher)
+    expected = [r["assignmentId"] for sc in codes for r in state.listing(sc)]
+    assert [a["assignment_id"] for a in fetcher.answers] == expected
+    assert [a["assignmentId"] for a in fetcher.assignments] == expected
+    assert fetcher.failed == [] and fetcher.aborted is None
+    assert sum(ev[0] == "detail" for ev in events) == len(expected)
+
+
+def test_fetcher_skips_details_not_needed(standin, client, fetcher_cls):
+    codes = standin[1].cfg.smallcodes()
+    sink = Recorder()
+    fetcher = fetcher_cls(client, client.headers, fasih_standin.PERIOD_ID, max_workers=4, sink=sink,
+                          need_detail=lambda row: row["assignmentId"].endswith("-000"))
+    events = run(fetcher.start(codes))
+    answered = [c[2] for c in sink.calls if c[0] == "assignment" and c[3] is not None]
+    assert answered == [f"{sc}-000" for sc in codes]
+    assert sum(ev[0] == "skip" for ev in events) == 2 * len(codes)
+
+
+def test_fetcher_bounds_rows_held_back(standin, client, fetcher_cls, monkeypatch):
+    peak = [0]
+    drain = OrderedEmitter._drain
+
+    def watch(self):
+        peak[0] = max(peak[0], self.held)
+        return drain(self)
+
+    monkeypatch.setattr(OrderedEmitter, "_drain", watch)
+    state = standin[1]
+    workers = 1
+    fetcher = fetcher_cls(client, client.headers, fasih_standin.PERIOD_ID, max_workers=workers)
+    run(fetcher.start(state.cfg.smallcodes()))
+    # batas + satu listing per worker yang sudah terlanjur berjalan saat batas tercapai
+    assert peak[0] <= (BACKLOG_PER_WORKER + state.cfg.assignments) * workers
+    assert len(fetcher.answers) == len(state.cfg.smallcodes()) * state.cfg.assignments
+
+
+def test_stop_halts_forwarding(standin, client, fetcher_cls):
+    class StopAfterFirst(Recorder):
+        def assignment(self, smallcode, row, answer, err):
+            super().assignment(smallcode, row, answer, err)
+            fetcher.stop("tes")
+
+    sink = StopAfterFirst()
+    fetcher = fetcher_cls(client, client.headers, fasih_standin.PERIOD_ID, max_workers=2, sink=sink)
+    run(fetcher.start(standin[1].cfg.smallcodes()))
+    assert fetcher.aborted == "tes"
+    assert [c[0] for c in sink.calls] == ["listing", "assignment"]
@@ -0,0 +1,94 @@
+import os
+
+from fasih_journal import RunJournal
+from fasih_writer import ChunkedTableWriter, ExportSink, part_files, read_parts
+
+SMALLCODES = ["A", "B", "C"]
+LISTINGS = {sc: [{"assignmentId": f"{sc}-{i}", "smallCode": sc} for i in range(3)] for sc in SMALLCODES}
+
+
+def export_sink(tmp_path):
+    return ExportSink(ChunkedTableWriter(str(tmp_path / "answers"), chunk_rows=2, fmt="csv"),
+                      ChunkedTableWriter(str(tmp_path / "assign"), chunk_rows=2, fmt="csv"))
+
+
+def start_run(tmp_path):
+    journal = RunJournal(str(tmp_path), "kab", "P1", SMALLCODES, interval=1e9)
+    journal.start(str(tmp_path / "answers"), str(tmp_path / "assign"), "20250101_000000")
+    return journal, journal.wrap(export_sink(tmp_path))
+
+
+def feed(journal, sink, smallcodes, limit=None):
+    """Alirkan listing + jawaban seperti OrderedEmitter; berhenti setelah `limit` assignment."""
+    n = 0
+    for sc in smallcodes:
+        rows = LISTINGS[sc]
+        sink.listing(sc, rows, None)
+        for row in rows:
+            if limit is not None and n >= limit:
+                return
+            answer = {"assignment_id": row["assignmentId"], "smallCode": sc} if journal.need_detail(row) else None
+            sink.assignment(sc, row, answer, None)
+            n += 1
+
+
+def test_resume_writes_every_row_once(tmp_path):
+    journal, sink = start_run(tmp_path)
+    feed(journal, sink, SMALLCODES, limit=5)  # A selesai, B baru 2 dari 3
+    journal.checkpoint()
+    sink.assignment("B", LISTINGS["B"][2], {"assignment_id": "B-2", "smallCode": "B"}, None)
+    sink.listing("C", LISTINGS["C"], None)
+    sink.inner.flush()  # part setelah checkpoint: harus dibuang saat melanjutkan
+
+    journal = RunJournal(str(tmp_path), "kab", "P1", SMALLCODES, interval=1e9)
+    assert journal.resumable
+    state = journal.resume()
+    assert len(part_files(state["answers_dir"])) == state["parts"]["answers"]
+    remaining = journal.remaining(SMALLCODES)
+    assert remaining == ["B", "C"]
+    sink = journal.wrap(export_sink(tmp_path))
+    feed(journal, sink, remaining)
+    sink.inner.close()
+
+    answers = read_parts(str(tmp_path / "answers"))
+    assign = read_parts(str(tmp_path / "assign"))
+    expected = [r["assignmentId"] for sc in SMALLCODES for r in LISTINGS[sc]]
+    assert list(answers["assignment_id"]) == expected
+    assert list(assign["assignmentId"]) == expected
+    assert journal.summary() == "3 smallcode selesai"
+
+
+def test_resume_skips_details_already_written(tmp_path):
+    journal, sink = start_run(tmp_path)
+    feed(journal, sink, SMALLCODES, limit=4)
+    journal.checkpoint()
+
+    journal = RunJournal(str(tmp_path), "kab", "P1", SMALLCODES)
+    journal.resume()
+    assert not journal.need_detail({"assignmentId": "B-0"})
+    assert journal.need_detail({"assignmentId": "B-1"})
+
+
+def test_other_smallcode_list_gets_its_own_journal(tmp_path):
+    journal, sink = start_run(tmp_path)
+    journal.checkpoint()
+    assert not RunJournal(str(tmp_path), "kab", "P1", ["A", "B"]).resumable
+    assert RunJournal(str(tmp_path), "kab", "P1", SMALLCODES).resumable
+
+
+def test_finish_removes_journal_and_resets_state(tmp_path):
+    journal, sink = start_run(tmp_path)
+    feed(journal, sink, SMALLCODES, limit=4)
+    journal.checkpoint()
+    journal.finish()
+    assert not os.path.exists(journal.path)
+    assert journal.state is None and not journal.resumable
+    assert journal.need_detail({"assignmentId": "B-0"})
+    assert not RunJournal(str(tmp_path), "kab", "P1", SMALLCODES).resumable
+
+
+def test_corrupt_journal_starts_fresh(tmp_path):
+    journal, _ = start_run(tmp_path)
+    with open(journal.path, "w", encoding="utf-8") as f:
+        f.write("{rusak")
+    assert not RunJournal(str(tmp_path), "kab", "P1", SMALLCODES).resumable
@@ -0,0 +1,146 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+import fasih_limiter
+import fasih_standin
+from fasih_client import make_session
+from fasih_limiter import AdaptiveLimiter, connect_failed
+
+LISTING_PATH = "/assignment-general/api/assignments/get-principal-values-by-smallest-code/P/1"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(fasih_limiter, "backoff_delay", lambda attempt: 0.0)
+
+
+def fill(lim, n, latency=0.01, congested=False):
+    for _ in range(n):
+        assert lim.try_acquire()
+        lim.release(latency, congested)
+
+
+# ---- AIMD ----
+def test_limit_grows_by_one_per_healthy_window():
+    lim = AdaptiveLimiter(8, initial=2)
+    fill(lim, 2)
+    assert lim.limit == 3
+    fill(lim, 3)
+    assert lim.limit == 4
+
+
+def test_limit_capped_at_max():
+    lim = AdaptiveLimiter(3, initial=3)
+    fill(lim, 20)
+    assert lim.limit == 3
+
+
+def test_congestion_halves_limit_once_per_burst():
+    lim = AdaptiveLimiter(16, initial=8)
+    fill(lim, 3, congested=True)  # rentetan serentak = satu potongan
+    assert lim.limit == 4
+    assert lim.throttled == 3
+
+
+def test_limit_never_below_min():
+    lim = AdaptiveLimiter(8, min_limit=2, initial=2)
+    lim._last_cut = -1e9
+    fill(lim, 1, congested=True)
+    assert lim.limit == 2
+
+
+def test_try_acquire_respects_limit():
+    lim = AdaptiveLimiter(4, initial=2)
+    assert lim.try_acquire() and lim.try_acquire()
+    assert not lim.try_acquire()
+    lim.release(0.01)
+    assert lim.try_acquire()
+
+
+# ---- acquire_async ----
+def test_acquire_async_woken_by_release_from_thread():
+    lim = AdaptiveLimiter(1, initial=1)
+    lim.try_acquire()
+
+    async def main():
+        timer = threading.Timer(0.05, lim.release, args=(0.01,))
+        timer.start()
+        t0 = time.monotonic()
+        await asyncio.wait_for(lim.acquire_async(), 2)
+        return time.monotonic() - t0
+
+    assert asyncio.run(main()) < 1
+    assert lim.in_flight == 1
+    assert not lim._async_waiters
+
+
+def test_cancelled_async_waiter_passes_slot_on():
+    lim = AdaptiveLimiter(1, initial=1)
+    lim.try_acquire()
+
+    async def main():
+        first = asyncio.ensure_future(lim.acquire_async())
+        second = asyncio.ensure_future(lim.acquire_async())
+        await asyncio.sleep(0)
+        lim.release(0.01)  # membangunkan `first`...
+        first.cancel()     # ...yang batal sebelum sempat jalan
+        await asyncio.wait_for(second, 2)
+
+    asyncio.run(main())
+    assert lim.in_flight == 1
+    assert not lim._async_waiters
+
+
+# ---- AdaptiveAdapter ----
+def session_for(limiter):
+    return make_session({}, None, 4, limiter)
+
+
+def test_get_retried_on_503(server):
+    url, state = server(error_rate=1.0)
+    lim = AdaptiveLimiter(4)
+    resp = session_for(lim).get(url + LISTING_PATH)
+    assert resp.status_code == 503
+    assert state.counts["listing"] == fasih_limiter.DEFAULT_RETRIES + 1
+    assert resp.retries == fasih_limiter.DEFAULT_RETRIES
+    assert lim.in_flight == 0
+
+
+def test_post_not_retried_on_503(server):
+    url, state = server(error_rate=1.0)
+    lim = AdaptiveLimiter(4)
+    resp = session_for(lim).post(url + fasih_standin.APPROVE_PATH, json={"assignmentId": "A"})
+    assert resp.status_code == 503
+    assert state.counts["approve"] == 1
+    assert lim.in_flight == 0
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_post_retried_when_connect_fails():
+    lim = AdaptiveLimiter(4)
+    with pytest.raises(requests.exceptions.ConnectionError) as info:
+        session_for(lim).post(f"http://127.0.0.1:{free_port()}/x", json={})
+    assert connect_failed(info.value)
+    assert info.value.retries == fasih_limiter.DEFAULT_RETRIES
+    assert lim.in_flight == 0
+
+
+def test_slot_released_on_unexpected_error(monkeypatch, standin):
+    def boom(self, request, **kwargs):
+        raise ValueError("SSL / URL rusak")
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, "send", boom)
+    lim = AdaptiveLimiter(4)
+    with pytest.raises(ValueError):
+        session_for(lim).get(standin[0] + LISTING_PATH)
+    assert lim.in_flight == 0
@@ -0,0 +1,99 @@
+import pandas as pd
+
+from fasih_sync import IncrementalSync, SyncState, fingerprints_from_export, listing_fingerprint
+from fasih_writer import ChunkedTableWriter
+
+ROW = {"assignmentId": "A-1", "assignmentStatusAlias": "SUBMITTED BY PPL", "dateModified": "2025-11-01",
+       "data1": "KK 1", "data2": None, "n": 3}
+
+
+class Collector:
+    def __init__(self):
+        self.listings, self.answers = [], []
+
+    def listing(self, smallcode, rows, err):
+        self.listings.append((smallcode, rows, err))
+
+    def assignment(self, smallcode, row, answer, err):
+        self.answers.append(answer)
+
+
+# ---- sidik jari ----
+def test_fingerprint_ignores_key_order():
+    assert listing_fingerprint(ROW) == listing_fingerprint(dict(reversed(list(ROW.items()))))
+
+
+def test_fingerprint_treats_none_nan_and_empty_alike():
+    base = listing_fingerprint({**ROW, "data2": None})
+    assert listing_fingerprint({**ROW, "data2": float("nan")}) == base
+    assert listing_fingerprint({**ROW, "data2": ""}) == base
+
+
+def test_fingerprint_changes_with_status_or_modification():
+    base = listing_fingerprint(ROW)
+    assert listing_fingerprint({**ROW, "assignmentStatusAlias": "APPROVED BY PML"}) != base
+    assert listing_fingerprint({**ROW, "dateModified": "2025-11-02"}) != base
+
+
+def test_fingerprint_stable_through_excel_export(tmp_path):
+    row = {k: v for k, v in ROW.items() if not isinstance(v, int)}  # Excel dibaca ulang sebagai string
+    path = tmp_path / "Assignment.xlsx"
+    pd.DataFrame([row]).to_excel(path, index=False)
+    assert fingerprints_from_export(str(path)) == {"A-1": listing_fingerprint(row)}
+
+
+def test_fingerprint_stable_through_part_folder(tmp_path):
+    row = {k: v for k, v in ROW.items() if not isinstance(v, int)}
+    writer = ChunkedTableWriter(str(tmp_path / "assign"), fmt="csv")
+    writer.append(row)
+    writer.close()
+    assert fingerprints_from_export(str(tmp_path / "assign")) == {"A-1": listing_fingerprint(row)}
+
+
+# ---- rencana sinkron ----
+def previous_run(tmp_path, rows, answers):
+    """State + export Raw_Data dari run sebelumnya."""
+    answers_path = tmp_path / "Raw_Data_kab_SURVEI_20250101_000000.xlsx"
+    pd.DataFrame(answers).to_excel(answers_path, index=False)
+    state = SyncState(str(tmp_path), "kab", "P1")
+    state.fingerprints = {r["assignmentId"]: listing_fingerprint(r) for r in rows}
+    state.save(str(answers_path), None)
+
+
+def test_need_detail_only_for_new_or_changed(tmp_path):
+    old = [{**ROW, "assignmentId": "A-1"}, {**ROW, "assignmentId": "A-2"}]
+    previous_run(tmp_path, old, [{"assignment_id": "A-1", "smallCode": "S1", "r001": "x"},
+                                 {"assignment_id": "A-2", "smallCode": "S1", "r001": "y"}])
+    sync = IncrementalSync(str(tmp_path), "kab", "SURVEI", "P1")
+    assert not sync.need_detail(old[0])
+    assert sync.need_detail({**old[1], "assignmentStatusAlias": "APPROVED BY PML"})
+    assert sync.need_detail({**ROW, "assignmentId": "A-3"})
+    assert (sync.new, sync.changed, sync.unchanged) == (1, 1, 1)
+
+
+def test_skipped_assignment_gets_previous_answers(tmp_path):
+    previous_run(tmp_path, [ROW], [{"assignment_id": "A-1", "smallCode": "S1", "r001": "lama"}])
+    sync = IncrementalSync(str(tmp_path), "kab", "SURVEI", "P1")
+    sink = sync.wrap(Collector())
+    assert not sync.need_detail(ROW)
+    sink.listing("S1", [ROW], None)
+    sink.assignment("S1", ROW, None, None)
+    assert sink.inner.answers[0]["r001"] == "lama"
+
+
+def test_failed_detail_is_retried_next_run(tmp_path):
+    sync = IncrementalSync(str(tmp_path), "kab", "SURVEI", "P1")
+    sink = sync.wrap(Collector())
+    assert sync.need_detail(ROW)
+    sink.assignment("S1", ROW, None, RuntimeError("timeout"))
+    sync.commit(None, None)
+    assert "A-1" not in SyncState(str(tmp_path), "kab", "P1").fingerprints
+
+
+def test_failed_listing_keeps_previous_rows(tmp_path):
+    previous_run(tmp_path, [ROW], [{"assignment_id": "A-1", "smallCode": "S1", "r001": "lama"},
+                                   {"assignment_id": "B-1", "smallCode": "S2", "r001": "lain"}])
+    sync = IncrementalSync(str(tmp_path), "kab", "SURVEI", "P1")
+    sink = sync.wrap(Collector())
+    sink.listing("S1", [], RuntimeError("503"))
+    assert [a["assignment_id"] for a in sink.inner.answers] == ["A-1"]
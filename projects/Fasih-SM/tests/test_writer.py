@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from fasih_writer import (ChunkedTableWriter, ExportSink, part_columns, part_files, parts_to_excel, pyarrow_ok,
+                          read_parts)
+
+FORMATS = ["csv", pytest.param("parquet", marks=pytest.mark.skipif(not pyarrow_ok, reason="pyarrow tidak terpasang"))]
+
+
+@pytest.fixture(params=FORMATS)
+def fmt(request):
+    return request.param
+
+
+def rows(n, start=0):
+    return [{"assignment_id": f"A-{i}", "r001": f"nilai {i}"} for i in range(start, start + n)]
+
+
+def test_parts_split_at_chunk_rows(tmp_path, fmt):
+    writer = ChunkedTableWriter(str(tmp_path / "p"), chunk_rows=4, fmt=fmt)
+    for r in rows(10):
+        writer.append(r)
+    assert writer.parts == 2  # 8 baris tertulis, 2 masih di buffer
+    writer.close()
+    assert writer.parts == 3 and writer.rows == 10
+    assert [p.rsplit("-", 1)[1] for p in part_files(str(tmp_path / "p"))] == [f"0000{i}.{fmt}" for i in range(3)]
+    assert list(read_parts(str(tmp_path / "p"))["assignment_id"]) == [f"A-{i}" for i in range(10)]
+
+
+def test_columns_may_differ_between_parts(tmp_path, fmt):
+    writer = ChunkedTableWriter(str(tmp_path / "p"), chunk_rows=2, fmt=fmt)
+    writer.append({"a": "1", "b": "x"})
+    writer.append({"a": "2"})
+    writer.append({"a": "3", "c": "baru"})
+    writer.close()
+    assert part_columns(str(tmp_path / "p")) == ["a", "b", "c"]
+    df = read_parts(str(tmp_path / "p")).fillna("")
+    assert df.to_dict("records")[2] == {"a": "3", "b": "", "c": "baru"}
+
+
+def test_lists_and_dicts_stored_as_json(tmp_path):
+    writer = ChunkedTableWriter(str(tmp_path / "p"), fmt="csv")
+    writer.append({"a": [1, 2], "b": {"k": "ü"}, "c": float("nan")})
+    writer.close()
+    assert read_parts(str(tmp_path / "p")).to_dict("records") == [{"a": "[1, 2]", "b": '{"k": "ü"}', "c": ""}]
+
+
+def test_reopened_folder_continues_numbering(tmp_path, fmt):
+    first = ChunkedTableWriter(str(tmp_path / "p"), chunk_rows=2, fmt=fmt)
+    for r in rows(3):
+        first.append(r)
+    first.close()
+    second = ChunkedTableWriter(str(tmp_path / "p"), chunk_rows=2, fmt=fmt)
+    assert second.parts == 2
+    for r in rows(2, start=3):
+        second.append(r)
+    second.close()
+    assert list(read_parts(str(tmp_path / "p"))["assignment_id"]) == [f"A-{i}" for i in range(5)]
+
+
+def test_parts_to_excel_streams_all_rows(tmp_path, fmt):
+    writer = ChunkedTableWriter(str(tmp_path / "p"), chunk_rows=3, fmt=fmt)
+    for r in rows(7):
+        writer.append(r)
+    writer.append({"assignment_id": "A-7", "r002": "kolom baru"})
+    writer.close()
+    path = tmp_path / "out.xlsx"
+    assert parts_to_excel(str(tmp_path / "p"), str(path)) == 8
+    df = pd.read_excel(path, dtype=str, keep_default_na=False)
+    assert list(df.columns) == ["assignment_id", "r001", "r002"]
+    assert list(df["assignment_id"]) == [f"A-{i}" for i in range(8)]
+    assert df.iloc[7]["r002"] == "kolom baru" and df.iloc[0]["r002"] == ""
+
+
+def test_export_sink_skips_missing_answers(tmp_path):
+    sink = ExportSink(ChunkedTableWriter(str(tmp_path / "answers"), fmt="csv"),
+                      ChunkedTableWriter(str(tmp_path / "assign"), fmt="csv"))
+    listing = [{"assignmentId": "A-0"}, {"assignmentId": "A-1"}]
+    sink.listing("S1", listing, None)
+    sink.assignment("S1", listing[0], {"assignment_id": "A-0"}, None)
+    sink.assignment("S1", listing[1], None, RuntimeError("gagal"))
+    sink.close()
+    assert len(read_parts(str(tmp_path / "assign"))) == 2
+    assert list(read_parts(str(tmp_path / "answers"))["assignment_id"]) == ["A-0"]
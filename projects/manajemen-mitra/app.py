@@ -3,7 +3,8 @@ import pandas as pd
 import time
 import json
 import os
-import requests
+import sys
+from pathlib import Path
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -13,22 +14,41 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
-from multiprocessing import Pool, cpu_count
+from requests.exceptions import RequestException, Timeout
 from functools import partial
 from tqdm import tqdm
 
+# klien HTTP terukur + metrik bersama ada di projects/Fasih-SM
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Fasih-SM"))
+from fasih_client import MeteredSession
+from fasih_metrics import HttpMetrics
+
 
 # === Konfigurasi dasar ===
 KEY_ID = '687e204db62094de46edbcd7ed7cb204'
 CACHE_DIR = "cached_data"
+METRICS_DIR = "metrics"  # JSONL metrik HTTP per proses server (di luar CACHE_DIR yang bisa dikosongkan)
+DETAIL_WORKERS = 16
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# === Klien HTTP & metrik (sekali per proses server) ===
+@st.cache_resource
+def http_metrics():
+    return HttpMetrics(os.path.join(METRICS_DIR, f"mitra_{time.strftime('%Y%m%d_%H%M%S')}.jsonl"))
+
+@st.cache_resource
+def http():
+    """Session keep-alive bersama; semua request mitra-api / webapi tercatat di http_metrics()."""
+    sess = MeteredSession(pool_size=DETAIL_WORKERS)
+    sess.metric_hooks.append(http_metrics())
+    return sess
+
 # === Helper: caching sederhana ===
 @st.cache_data
 def getReq(url):
     """Ambil data dari URL dan kembalikan hasil JSON jika sukses, None jika gagal."""
     try:
-        response = requests.get(url, timeout=10)
+        response = http().get(url, timeout=10)
         if response.status_code == 200:
             data = response.json()
             return data
@@ -55,25 +75,26 @@ def clear_all_cache():
         os.remove(os.path.join(CACHE_DIR, f))
 
 # === Fungsi Helper HTTP ===
-def safe_request(url, headers, max_retries=3, timeout=15):
+def safe_request(url, headers, max_retries=3, timeout=15, sess=None):
+    sess = sess or http()
     for attempt in range(max_retries):
         try:
-            resp = requests.get(url, headers=headers, timeout=timeout)
+            resp = sess.get(url, headers=headers, timeout=timeout)
             if resp.status_code == 200:
                 return resp
             else:
                 st.warning(f"⚠️ Status {resp.status_code} untuk {url}")
-        except requests.exceptions.Timeout:
+        except Timeout:
             st.warning(f"⏳ Timeout ({attempt+1}/{max_retries}) untuk {url}")
-        except requests.exceptions.RequestException as e:
+        except RequestException as e:
             st.warning(f"❌ Error koneksi: {e}")
         time.sleep(2 * (attempt + 1))
     return None
 
-def worker_detail_mitra(id_mitra, headers):
+def worker_detail_mitra(id_mitra, headers, sess=None):
     try:
         url = f'https://mitra-api.bps.go.id/api/mitra/id/{id_mitra}'
-        resp = safe_request(url, headers)
+        resp = safe_request(url, headers, sess=sess)
 
         if resp and resp.status_code == 200 and resp.json():
             df = pd.json_normalize(resp.json())
@@ -130,16 +151,16 @@ def ambil_detail_kegiatan(row, headers, kode_prov, kode_kab, versi=3):
         return pd.DataFrame()
 
     # =========================================================
-    #   MULTIPROCESSING + tqdm
+    #   THREAD POOL + tqdm
+    #   (kerjanya menunggu jaringan; thread berbagi session keep-alive dan
+    #    metrik, proses terpisah tidak)
     # =========================================================
-    worker = partial(worker_detail_mitra, headers=headers)
+    worker = partial(worker_detail_mitra, headers=headers, sess=http())
 
-    total_cpu = max(cpu_count() - 1, 1)
-
-    with Pool(total_cpu) as pool:
+    with ThreadPoolExecutor(max_workers=DETAIL_WORKERS) as pool:
         detail_list = list(
-            tqdm(pool.imap(worker, list_id), 
-                 total=len(list_id), 
+            tqdm(pool.map(worker, list_id),
+                 total=len(list_id),
                  desc=f"Ambil detail mitra {nama_keg}")
         )
 
@@ -347,8 +368,8 @@ if "survei_df" not in st.session_state:
     survei_df = cached_dataframe("list_survey.xlsx")
     if survei_df.empty:
         with st.spinner("Mengambil daftar survei..."):
-            berjalan = requests.get('https://mitra-api.bps.go.id/api/survei/list/1', headers=headers).json()['surveis']
-            selesai = requests.get('https://mitra-api.bps.go.id/api/survei/list/2', headers=headers).json()['surveis']
+            berjalan = http().get('https://mitra-api.bps.go.id/api/survei/list/1', headers=headers).json()['surveis']
+            selesai = http().get('https://mitra-api.bps.go.id/api/survei/list/2', headers=headers).json()['surveis']
             survei_df = pd.concat([
                 pd.json_normalize(berjalan).assign(**{'status survei': 'Berjalan'}),
                 pd.json_normalize(selesai).assign(**{'status survei': 'Selesai'})
@@ -601,4 +622,9 @@ if not survei_df.empty:
 else:
     st.warning("Belum ada data survei untuk ditampilkan.")
 
+# === METRIK HTTP ===
+with st.expander("📈 Metrik HTTP (mitra-api / webapi)"):
+    st.caption(f"{http_metrics().text()} • log: {http_metrics().log_path}")
+    st.dataframe(http_metrics().frame(), use_container_width=True)
+
     
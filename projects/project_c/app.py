@@ -1,5 +1,6 @@
 # app.py
-import os, io, re, time, json, pickle, urllib.parse
+import os, io, re, sys, time, json, pickle, urllib.parse
+from functools import partial
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
@@ -7,19 +8,38 @@ import streamlit as st
 import requests
 from requests.cookies import RequestsCookieJar
 
+# modul bersama FASIH ada di projects/Fasih-SM
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Fasih-SM"))
+from fasih_approve import APPROVE_URL, Approver, role_allows
+from fasih_browser import (LEAN_BROWSER, LEGACY_SLEEP, DriverPool, apply_lean, lean_options, open_driver,
+                           suggested_pool_size, track_xhr, wait_idle, wait_ready, wait_url)
+from fasih_client import LISTING_TEMPLATE_URL, LISTING_URL, REVIEW_URL, FasihClient, fasih_headers
+from fasih_wilayah import load_wilayah, DEFAULT_WORKERS
+from fasih_columns import ColumnBuffer
+from fasih_detail_cache import DetailCache
+from fasih_history import HistoryResolver
+from fasih_jobs import DEFAULT_MAX_JOBS, JobRunner
+from fasih_metrics import HttpMetrics, StepTimer, timed
+
 # =================== Setup ===================
 st.set_page_config(page_title="FASIH — DW/RAW/Approve", layout="wide")
 st.title("🧭 FASIH — Login • DaftarWilayah • Raw Data • Approve")
 
+# sleep tetap lama di app ini (detik) sebagai baseline laporan waktu tunggu login
+LOGIN_SLEEP = {**LEGACY_SLEEP, "cookie host": 0.8, "halaman survei": 2.0, "oauth login": 5.0, "survei login": 3.0}
+
 def init_state():
     for k,v in dict(
         driver=None, logged_in=False, username="",
         headers=None, cookies_dict=None, session_obj=None,
         otp_needed=False, daftarwilayah=None,
         survey_meta=None, survey_period_id=None, survey_period_name=None,
+        login_steps=None,
     ).items():
         if k not in st.session_state: st.session_state[k] = v
 init_state()
+if st.session_state.login_steps is None:
+    st.session_state.login_steps = StepTimer(LOGIN_SLEEP)
 
 # =================== Utils ===================
 def slugify(text: str) -> str:
@@ -44,6 +64,39 @@ def clear_screen():
     try: os.system("cls" if os.name=="nt" else "clear")
     except Exception: pass
 
+# =================== Job latar ===================
+@st.cache_resource
+def job_runner():
+    # satu runner per server; job tetap jalan walau halaman di-rerun / ditutup
+    return JobRunner(max_jobs=int(os.environ.get("FASIH_MAX_JOBS", DEFAULT_MAX_JOBS)))
+
+def baca_file(path):
+    with open(path, "rb") as fh:
+        return fh.read()
+
+@st.fragment(run_every=2)
+def panel_job():
+    runner = job_runner()
+    jobs = runner.jobs()
+    if not jobs:
+        return
+    st.subheader(f"🧵 Job latar ({len(runner.active())} aktif, maks {runner.max_jobs} bersamaan)")
+    for job in jobs:
+        menit, detik = divmod(int(job.elapsed), 60)
+        with st.expander(f"[{job.status}] {job.title} — {menit}m {detik}s", expanded=job.status == "running"):
+            st.progress(job.progress, text=job.text or None)
+            if job.log:
+                st.code("\n".join(job.log[-10:]), language=None)
+            if job.error:
+                st.error(job.error)
+            for path in job.outputs:
+                st.download_button(f"⬇️ {os.path.basename(path)}", partial(baca_file, path),
+                                   file_name=os.path.basename(path), key=f"dl_{job.id}_{path}")
+            if job.status in ("queued", "running") and st.button("⏹️ Batalkan", key=f"batal_{job.id}"):
+                runner.cancel(job.id)
+    if st.button("🧹 Bersihkan job yang sudah selesai"):
+        runner.forget_finished()
+
 # =================== Selenium / Driver ===================
 try:
     from selenium import webdriver as _webdriver
@@ -64,7 +117,7 @@ try:
 except Exception:
     webdriver_ok = False
 
-def get_chrome_or_edge(headless=False):
+def get_chrome_or_edge(headless=False, lean=LEAN_BROWSER):
     if not webdriver_ok:
         raise RuntimeError("Install: pip install selenium webdriver-manager")
     # Prefer Chrome
@@ -77,6 +130,7 @@ def get_chrome_or_edge(headless=False):
         copts.add_argument("--disable-gpu")
         copts.add_experimental_option("excludeSwitches", ["enable-automation"])
         copts.add_experimental_option("useAutomationExtension", False)
+        if lean: lean_options(copts)  # eager + jendela kecil + tanpa gambar/ekstensi
         candidates = [
             os.getenv("CHROME_PATH"),
             r"C:\Program Files\Google\Chrome\Application\chrome.exe",
@@ -86,13 +140,17 @@ def get_chrome_or_edge(headless=False):
         if chrome_binary:
             copts.binary_location = chrome_binary
         service = ChromeService(ChromeDriverManager().install())
-        return _webdriver.Chrome(service=service, options=copts)
+        drv = _webdriver.Chrome(service=service, options=copts)
     except Exception:
         # Fallback Edge
         eopts = EdgeOptions()
         if headless: eopts.add_argument("--headless=new")
         eopts.add_argument("--window-size=1920,1080")
-        return _webdriver.Edge(service=EdgeService(EdgeChromiumDriverManager().install()), options=eopts)
+        if lean: lean_options(eopts)
+        drv = _webdriver.Edge(service=EdgeService(EdgeChromiumDriverManager().install()), options=eopts)
+    if lean: apply_lean(drv)  # blokir gambar/font/media/analytics lewat CDP
+    track_xhr(drv)  # penghitung XHR untuk wait_idle
+    return drv
 
 # ---------- NEW: injeksi cookies + handshake OAuth ----------
 def _cookies_to_items(cookies):
@@ -106,9 +164,10 @@ def _cookies_to_items(cookies):
     except Exception:
         return []
 
-def _add_all_cookies_to_host(driver, host_url, items):
+def _add_all_cookies_to_host(driver, host_url, items, timer=None):
     driver.get(host_url)                # harus berada di host tsb
-    time.sleep(0.8)
+    with timed(timer, "cookie host"):
+        wait_ready(driver)
     for name, value in items:
         if not name: 
             continue
@@ -122,7 +181,7 @@ def _add_all_cookies_to_host(driver, host_url, items):
             except Exception:
                 pass
 
-def inject_cookies_and_handshake(session_or_cookies, headless=False):
+def inject_cookies_and_handshake(session_or_cookies, headless=False, timer=None):
     """
     1) Buat / reuse driver
     2) Suntik cookies ke sso.bps.go.id dan fasih-sm.bps.go.id
@@ -136,18 +195,22 @@ def inject_cookies_and_handshake(session_or_cookies, headless=False):
         drv = get_chrome_or_edge(headless=headless)
 
     # siapkan pairs cookies
-    if isinstance(session_or_cookies, requests.Session):
+    if isinstance(session_or_cookies, (requests.Session, FasihClient)):
         items = _cookies_to_items(session_or_cookies.cookies)
     else:
         items = _cookies_to_items(session_or_cookies)
 
     # injeksi ke kedua host (beberapa cookie host-only)
-    _add_all_cookies_to_host(drv, "https://sso.bps.go.id", items)
-    _add_all_cookies_to_host(drv, "https://fasih-sm.bps.go.id", items)
+    _add_all_cookies_to_host(drv, "https://sso.bps.go.id", items, timer)
+    _add_all_cookies_to_host(drv, "https://fasih-sm.bps.go.id", items, timer)
 
     # refresh + handshake oauth
-    drv.get("https://fasih-sm.bps.go.id/oauth2/authorization/ics"); time.sleep(3)
-    drv.get("https://fasih-sm.bps.go.id/survey-collection/survey"); time.sleep(2)
+    drv.get("https://fasih-sm.bps.go.id/oauth2/authorization/ics")
+    with timed(timer, "oauth"):
+        wait_url(drv, _back_on_fasih)
+    drv.get("https://fasih-sm.bps.go.id/survey-collection/survey")
+    with timed(timer, "halaman survei"):
+        wait_idle(drv)
 
     st.session_state.driver = drv
     return drv
@@ -163,21 +226,8 @@ def cookies_dict_from_cookiejar(jar: RequestsCookieJar) -> dict:
     return {c.name: c.value for c in jar}
 
 def build_session_from_cookiejar(cookie_jar: RequestsCookieJar):
-    sess = requests.Session()
-    sess.cookies = cookie_jar
-    xsrf_raw = cookie_jar.get("XSRF-TOKEN", "")
-    xsrf_token = urllib.parse.unquote(xsrf_raw) if xsrf_raw else ""
-    headers = {
-        'X-Requested-With': 'XMLHttpRequest',
-        'X-XSRF-TOKEN': xsrf_token,
-        'Referer': 'https://fasih-sm.bps.go.id/',
-        'User-Agent': 'Mozilla/5.0',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json, text/plain, */*',
-        'Origin': 'https://fasih-sm.bps.go.id'
-    }
-    sess.headers.update(headers)
-    return headers, sess
+    headers = fasih_headers(cookie_jar)
+    return headers, FasihClient(headers, cookie_jar)
 
 def simpan_session(username, headers, cookies_dict):
     sessions_dir = os.path.join(os.getcwd(), "sessions")
@@ -194,10 +244,10 @@ def muat_session(username):
     data = pickle.load(open(path, "rb"))
     headers = data.get("headers") or {}
     cookies_dict = data.get("cookies") or {}
-    sess = requests.Session()
+    jar = RequestsCookieJar()
     for k,v in cookies_dict.items():
-        sess.cookies.set(k, v, domain=".bps.go.id", path="/")
-    if headers: sess.headers.update(headers)
+        jar.set(k, v, domain=".bps.go.id", path="/")
+    sess = FasihClient(headers or fasih_headers(jar), jar)
     return headers, cookies_dict, sess, data.get("ts")
 
 # =================== SSO / OTP / OAuth ===================
@@ -221,9 +271,17 @@ def sso_submit_otp(driver, otp_value, timeout=120):
     except Exception: pass
     WebDriverWait(driver, timeout).until(lambda d: "fasih-sm.bps.go.id" in (d.current_url or "") or len(d.find_elements(By.CSS_SELECTOR, "#otp, input#otp"))==0)
 
-def fasih_handshake_and_session(driver):
-    driver.get("https://fasih-sm.bps.go.id/oauth2/authorization/ics"); time.sleep(5)
-    driver.get("https://fasih-sm.bps.go.id/survey-collection/survey"); time.sleep(3)
+def _back_on_fasih(url):
+    # redirect SSO → callback oauth2 → kembali ke host FASIH
+    return url.startswith("https://fasih-sm.bps.go.id") and "oauth2" not in url
+
+def fasih_handshake_and_session(driver, timer=None):
+    driver.get("https://fasih-sm.bps.go.id/oauth2/authorization/ics")
+    with timed(timer, "oauth login"):
+        wait_url(driver, _back_on_fasih)
+    driver.get("https://fasih-sm.bps.go.id/survey-collection/survey")
+    with timed(timer, "survei login"):
+        wait_idle(driver)
     jar = cookiejar_from_driver(driver)
     headers, sess = build_session_from_cookiejar(jar)
     return headers, cookies_dict_from_cookiejar(jar), sess
@@ -246,18 +304,7 @@ def extract_answers(answers):
     return res
 
 def try_fetch_assignments(session, headers, survey_period_id, template_id, smallcode):
-    base = "https://fasih-sm.bps.go.id/assignment-general/api/assignments/get-principal-values-by-smallest-code"
-    urlA = f"{base}/{survey_period_id}/{template_id}/{smallcode}"
-    r = session.get(urlA, headers=headers, timeout=40)
-    if r.ok:
-        try: return r.json().get("data", []) or []
-        except Exception: pass
-    urlB = f"{base}/{survey_period_id}/{smallcode}"
-    r2 = session.get(urlB, headers=headers, timeout=40)
-    if r2.ok:
-        try: return r2.json().get("data", []) or []
-        except Exception: pass
-    return []
+    return session.principal_values(survey_period_id, smallcode, template_id)
 
 def parse_assignment_status(history_json):
     out = []
@@ -271,9 +318,14 @@ def parse_assignment_status(history_json):
         pass
     return out
 
+def status_terakhir(history_json):
+    hist_list = parse_assignment_status(history_json)
+    return hist_list[-1]['status_assignment'] if hist_list else ""
+
 # =================== Ambil DaftarWilayah (hierarkis) ===================
 def ambil_semua_sls_smallcode_dari_kabupaten(
     kabupaten_id, level_region, region_group_id, headers, cookies, region_level1, region_level2,
+    max_workers=DEFAULT_WORKERS, force=False,
 ):
     st.write("=== Mengambil kecamatan → desa → SLS (→ SubSLS bila ada) ===")
     if not isinstance(level_region, list) or len(level_region) < 3:
@@ -284,77 +336,23 @@ def ambil_semua_sls_smallcode_dari_kabupaten(
         else:
             st.error("❌ Regionlevel tidak valid."); return pd.DataFrame()
 
-    result = []
+    prog = st.progress(0.0); status = st.empty()
+    def on_progress(level_name, done, total):
+        prog.progress(done / total if total else 1.0); status.write(f"📍 {level_name}: {done}/{total}")
+    def on_error(level_name, parent_name, e):
+        st.warning(f"❌ Gagal mengambil {level_name} dari {parent_name}: {e}")
+
     try:
-        url_kec = f"https://fasih-sm.bps.go.id/region/api/v1/region/level3?groupId={region_group_id}&level2Id={kabupaten_id}"
-        resp_kec = requests.get(url_kec, headers=headers, cookies=cookies, timeout=40)
-        resp_kec.raise_for_status()
-        daftar_kecamatan = resp_kec.json().get('data', [])
+        df, info = load_wilayah(kabupaten_id, level_region, region_group_id, headers, cookies, force=force,
+                                max_workers=max_workers, on_progress=on_progress, on_error=on_error)
     except Exception as e:
         st.error(f"❌ Gagal mengambil data kecamatan: {e}"); return pd.DataFrame()
 
-    for kec in daftar_kecamatan:
-        kec_id = kec['id']; kec_name = kec['name']; kec_code = kec['fullCode']
-        # st.write(f"📍 Kecamatan: {kec_name}")
-        if len(level_region) == 3:
-            result.append({f"{level_region[2]['name']}_id": kec_id, f"{level_region[2]['name']}": kec_name, 'smallcode': kec_code})
-            continue
-        try:
-            url_desa = f"https://fasih-sm.bps.go.id/region/api/v1/region/level4?groupId={region_group_id}&level3Id={kec_id}"
-            resp_desa = requests.get(url_desa, headers=headers, cookies=cookies, timeout=40)
-            resp_desa.raise_for_status()
-            daftar_desa = resp_desa.json().get('data', [])
-        except Exception as e:
-            st.warning(f"❌ Gagal mengambil desa dari {kec_name}: {e}"); continue
-
-        for desa in daftar_desa:
-            desa_id = desa['id']; desa_name = desa['name']; desa_code = desa['fullCode']
-            # st.write(f"🏘️ Desa: {desa_name}")
-            if len(level_region) == 4:
-                result.append({
-                    f"{level_region[2]['name']}_id": kec_id, f"{level_region[2]['name']}": kec_name,
-                    f"{level_region[3]['name']}_id": desa_id, f"{level_region[3]['name']}": desa_name,
-                    'smallcode': desa_code
-                }); continue
-            try:
-                url_sls = f"https://fasih-sm.bps.go.id/region/api/v1/region/level5?groupId={region_group_id}&level4Id={desa_id}"
-                resp_sls = requests.get(url_sls, headers=headers, cookies=cookies, timeout=40)
-                resp_sls.raise_for_status()
-                daftar_sls = resp_sls.json().get('data', [])
-            except Exception as e:
-                st.warning(f"❌ Gagal mengambil SLS dari {desa_name}: {e}"); continue
-
-            for sls in daftar_sls:
-                sls_id = sls['id']; sls_name = sls['name']; sls_code = sls['fullCode']
-                # st.write(f"🧾 SLS: {sls_name} ({sls_code})")
-                if len(level_region) == 5:
-                    result.append({
-                        f"{level_region[2]['name']}_id": kec_id, f"{level_region[2]['name']}": kec_name,
-                        f"{level_region[3]['name']}_id": desa_id, f"{level_region[3]['name']}": desa_name,
-                        f"{level_region[4]['name']}_id": sls_id, f"{level_region[4]['name']}": sls_name,
-                        'smallcode': sls_code
-                    }); continue
-                try:
-                    url_subsls = f"https://fasih-sm.bps.go.id/region/api/v1/region/level6?groupId={region_group_id}&level5Id={sls_id}"
-                    resp_subsls = requests.get(url_subsls, headers=headers, cookies=cookies, timeout=40)
-                    resp_subsls.raise_for_status()
-                    daftar_subsls = resp_subsls.json().get('data', [])
-                except Exception as e:
-                    st.warning(f"❌ Gagal mengambil SubSLS dari {sls_name}: {e}"); continue
-                for subsls in daftar_subsls:
-                    subsls_id = subsls['id']; subsls_name = subsls['name']; subsls_code = subsls['fullCode']
-                    # st.write(f"📄 SubSLS: {subsls_name} ({subsls_code})")
-                    result.append({
-                        f"{level_region[2]['name']}_id": kec_id, f"{level_region[2]['name']}": kec_name,
-                        f"{level_region[3]['name']}_id": desa_id, f"{level_region[3]['name']}": desa_name,
-                        f"{level_region[4]['name']}_id": sls_id, f"{level_region[4]['name']}": sls_name,
-                        f"{level_region[5]['name']}_id": subsls_id, f"{level_region[5]['name']}": subsls_name,
-                        'smallcode': subsls_code
-                    })
-
-    if not result: st.warning("⚠️ Tidak ada data yang berhasil diambil.")
-    else: st.success(f"✅ Total baris wilayah: {len(result)}")
-    return pd.DataFrame(result)
+    if info["failed"]:
+        st.warning(f"⚠️ {info['failed']} daftar gagal diambil; klik lagi untuk melanjutkan dari checkpoint.")
+    if df.empty: st.warning("⚠️ Tidak ada data yang berhasil diambil.")
+    else: st.success(f"✅ Total baris wilayah: {len(df)} (sumber: {'cache lokal' if info['source'] == 'cache' else 'API'})")
+    return df
 
 # =================== Sidebar: Login / Session ===================
 st.sidebar.header("🔐 Session")
@@ -390,7 +388,7 @@ if mode == "Muat Session":
 
         # Coba injeksi + handshake ke browser
         try:
-            drv = inject_cookies_and_handshake(sess, headless=headless_after_load)
+            drv = inject_cookies_and_handshake(sess, headless=headless_after_load, timer=st.session_state.login_steps)
             st.sidebar.success(f"Driver siap (cookies diinjeksikan).")
         except Exception as e:
             st.sidebar.error(f"Gagal injeksi ke driver: {e}")
@@ -419,7 +417,7 @@ if mode == "Login SSO":
                     st.session_state.otp_needed = True
                     st.sidebar.warning("Masukkan OTP di bawah, lalu Kirim.")
                 else:
-                    h, cdict, sess = fasih_handshake_and_session(drv)
+                    h, cdict, sess = fasih_handshake_and_session(drv, st.session_state.login_steps)
                     st.session_state.headers = h
                     st.session_state.cookies_dict = cdict
                     st.session_state.session_obj = sess
@@ -440,7 +438,7 @@ if mode == "Login SSO":
         if st.sidebar.button("Kirim OTP", type="primary"):
             try:
                 sso_submit_otp(st.session_state.driver, otp)
-                h, cdict, sess = fasih_handshake_and_session(st.session_state.driver)
+                h, cdict, sess = fasih_handshake_and_session(st.session_state.driver, st.session_state.login_steps)
                 st.session_state.headers = h
                 st.session_state.cookies_dict = cdict
                 st.session_state.session_obj = sess
@@ -450,6 +448,10 @@ if mode == "Login SSO":
             except Exception as e:
                 st.sidebar.error(f"Gagal submit OTP: {e}")
 
+if st.session_state.login_steps.samples:
+    st.sidebar.caption(f"⏱️ {st.session_state.login_steps.text()}")
+    st.sidebar.dataframe(st.session_state.login_steps.frame())
+
 if st.session_state.logged_in and st.session_state.headers and st.session_state.cookies_dict:
     if st.sidebar.button("💾 Simpan Session"):
         try:
@@ -458,6 +460,8 @@ if st.session_state.logged_in and st.session_state.headers and st.session_state.
         except Exception as e:
             st.sidebar.error(f"Gagal simpan: {e}")
 
+panel_job()
+
 # Guard
 if not st.session_state.logged_in or st.session_state.session_obj is None:
     st.info("Silakan Login SSO atau Muat Session di sidebar.")
@@ -470,21 +474,17 @@ st.success(f"Login sebagai: {st.session_state.username}")
 
 # =================== 1) SURVEY + period ===================
 st.header("1) Pilih Survei")
-payload = {"pageNumber": 0,"pageSize": 100,"sortBy": "CREATED_AT","sortDirection": "DESC","keywordSearch": ""}
-url_survey = "https://fasih-sm.bps.go.id/survey/api/v1/surveys/datatable?surveyType=Pencacahan"
-resp = session.post(url_survey, headers=headers, json=payload, timeout=40); resp.raise_for_status()
-surveys = resp.json()["data"]["content"]
+surveys = session.surveys()
 idx = st.selectbox("Survei", list(range(len(surveys))), format_func=lambda i: f"{surveys[i]['name']} (id:{surveys[i]['id']})")
 id_survey = surveys[idx]["id"]; nama_survey = surveys[idx]["name"]
 
 # metadata + level_region
-meta = session.get(f"https://fasih-sm.bps.go.id/survey/api/v1/surveys/{id_survey}", headers=headers, timeout=40).json()["data"]
+meta = session.survey(id_survey)
 st.session_state.survey_meta = meta
 group_id = meta["regionGroupId"]
 template_id = meta["surveyTemplates"][-1]["templateId"]
 
-resp_level_region = session.get(f'https://fasih-sm.bps.go.id/region/api/v1/region-metadata?id={group_id}', headers=headers, timeout=40)
-level_region = resp_level_region.json()["data"]["level"]
+level_region = session.region_metadata(group_id)
 
 # pilih period
 periods = meta.get("surveyPeriods", [])
@@ -495,11 +495,11 @@ st.session_state.survey_period_name = survey_period_name
 
 # =================== 2) Wilayah ===================
 st.header("2) Wilayah")
-prov = session.get(f"https://fasih-sm.bps.go.id/region/api/v1/region/level1?groupId={group_id}", headers=headers, timeout=40).json().get("data", [])
+prov = session.provinces(group_id)
 idx_prov = st.selectbox("Provinsi", list(range(len(prov))), format_func=lambda i: prov[i]["name"])
 fullcode_prov = prov[idx_prov]["fullCode"]; id_prov = prov[idx_prov]["id"]; code_prov = prov[idx_prov]["code"]; name_prov = prov[idx_prov]["name"]
 
-kab = session.get(f"https://fasih-sm.bps.go.id/region/api/v1/region/level2?groupId={group_id}&level1FullCode={fullcode_prov}", headers=headers, timeout=40).json().get("data", [])
+kab = session.kabupaten(group_id, fullcode_prov)
 idx_kab = st.selectbox("Kabupaten/Kota", list(range(len(kab))), format_func=lambda i: kab[i]["name"])
 id_kab = kab[idx_kab]["id"]; nama_kab = kab[idx_kab]["name"]; fullcode_kab = kab[idx_kab]["fullCode"]; code_kab = kab[idx_kab]["code"]; name_kab = kab[idx_kab]["name"]
 
@@ -516,6 +516,8 @@ st.header("3) DaftarWilayah (API / Upload)")
 up = st.file_uploader("Unggah Excel daftarwilayah (opsional)", type=["xlsx","xls"])
 col_dw1, col_dw2 = st.columns(2)
 with col_dw1:
+    n_workers_dw = st.number_input("Worker paralel", min_value=1, max_value=64, value=DEFAULT_WORKERS)
+    force_dw = st.checkbox("Abaikan cache wilayah", value=False)
     if st.button("🌐 Ambil dari API (hierarkis)"):
         with st.spinner("Mengambil daftar wilayah…"):
             df_dw = ambil_semua_sls_smallcode_dari_kabupaten(
@@ -525,7 +527,9 @@ with col_dw1:
                 headers=headers,
                 cookies=session.cookies,            # **pakai session aktif**
                 region_level1=region_level1,
-                region_level2=region_level2
+                region_level2=region_level2,
+                max_workers=int(n_workers_dw),
+                force=force_dw,
             )
             st.session_state.daftarwilayah = df_dw
             st.success(f"OK: {len(df_dw)} baris")
@@ -555,54 +559,71 @@ else:
 
 # =================== 4) Ambil Raw Data (opsional) ===================
 st.header("4) Ambil Raw Data (opsional)")
-def ambil_raw():
-    res_rows, assign_parts = [], []
-    total = len(st.session_state.daftarwilayah['smallcode'])
-    prog = st.progress(0); status = st.empty()
-    for i, small in enumerate(st.session_state.daftarwilayah['smallcode'], start=1):
-        try:
-            data_assign = try_fetch_assignments(session, headers, survey_period_id, template_id, small)
-            if data_assign: assign_parts.append(pd.DataFrame(data_assign))
-            for d in data_assign:
-                aid = d.get("assignmentId")
-                if not aid: continue
-                r = session.get("https://fasih-sm.bps.go.id/assignment-general/api/assignment/get-by-id-with-data-for-scm",
-                                headers=headers, params={"id": aid}, timeout=40)
-                if not r.ok:
-                    status.write(f"❌ {small}: gagal detail {aid} ({r.status_code})"); continue
-                inner = json.loads(r.json()["data"]["data"])
-                row = pd.DataFrame([extract_answers(inner.get("answers", []))])
-                row["assignment_id"] = aid
-                row["link_preview"] = f"https://fasih-sm.bps.go.id/survey-collection/survey-review/{aid}/{template_id}/{survey_period_id}/a/1"
-                res_rows.append(row)
-            status.write(f"✅ {small}: {len(data_assign)} assignment")
-        except Exception as e:
-            status.write(f"❌ {small}: {e}")
-        finally:
-            prog.progress(int(i/total*100))
-
+def ambil_raw(smallcodes, ui=st):
+    # ui = st (inline) atau JobUI (job latar); smallcodes diambil di thread utama
+    res_buf, assign_buf = ColumnBuffer(), ColumnBuffer()
+    cache = DetailCache()  # detail yang versinya belum berubah dibaca dari disk
+    total = len(smallcodes)
+    prog = ui.progress(0); status = ui.empty()
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # metrik HTTP per endpoint (listing / detail) → panel + OUTPUT/RAW DATA/<survei>/.metrics
+    table = ui.empty()
+    metrics = HttpMetrics.for_run(RAW_DIR, f"Raw_{fullcode_kab}_{ts}")
+    sess = session.with_hooks(metrics)  # hook per run, session bersama tidak disentuh
+    try:
+        for i, small in enumerate(smallcodes, start=1):
+            try:
+                data_assign = try_fetch_assignments(sess, headers, survey_period_id, template_id, small)
+                for d in data_assign: assign_buf.append(d)
+                for d in data_assign:
+                    aid = d.get("assignmentId")
+                    if not aid: continue
+                    try:
+                        answers = cache.answers(sess, d)
+                    except Exception as e:
+                        status.write(f"❌ {small}: gagal detail {aid} ({e})"); continue
+                    row = extract_answers(answers)
+                    row["assignment_id"] = aid
+                    row["link_preview"] = f"https://fasih-sm.bps.go.id/survey-collection/survey-review/{aid}/{template_id}/{survey_period_id}/a/1"
+                    res_buf.append(row)
+                status.write(f"✅ {small}: {len(data_assign)} assignment • {cache.text()}")
+            except Exception as e:
+                status.write(f"❌ {small}: {e}")
+            finally:
+                prog.progress(int(i/total*100))
+                table.dataframe(metrics.frame())
+    finally:
+        metrics.close()
+    ui.caption(f"📈 {metrics.text()} • log: {metrics.log_path}")
+
     # RAW
     out1 = io.BytesIO()
-    df_main = pd.concat(res_rows, ignore_index=True) if res_rows else pd.DataFrame()
+    df_main = res_buf.to_frame()
     with pd.ExcelWriter(out1, engine="openpyxl") as w: df_main.to_excel(w, index=False, sheet_name="raw_answers")
     out1.seek(0)
     file_raw = f"Raw_Data_{fullcode_kab}_{nama_survey}_{survey_period_name}_{ts}.xlsx"
     with open(os.path.join(RAW_DIR, file_raw), "wb") as f: f.write(out1.getvalue())
-    st.download_button("⬇️ Download RAW", out1.getvalue(), file_name=file_raw,
+    ui.download_button("⬇️ Download RAW", out1.getvalue(), file_name=file_raw,
                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
     # ASSIGN
     out2 = io.BytesIO()
-    df_assign = pd.concat(assign_parts, ignore_index=True) if assign_parts else pd.DataFrame()
+    df_assign = assign_buf.to_frame()
     with pd.ExcelWriter(out2, engine="openpyxl") as w: df_assign.to_excel(w, index=False, sheet_name="assignments")
     out2.seek(0)
     file_assign = f"Assignment_{fullcode_kab}_{nama_survey}_{survey_period_name}_{ts}.xlsx"
     with open(os.path.join(RAW_DIR, file_assign), "wb") as f: f.write(out2.getvalue())
-    st.download_button("⬇️ Download ASSIGN", out2.getvalue(), file_name=file_assign,
+    ui.download_button("⬇️ Download ASSIGN", out2.getvalue(), file_name=file_assign,
                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    return [os.path.join(RAW_DIR, file_raw), os.path.join(RAW_DIR, file_assign)]
 
+raw_di_latar = st.checkbox("🧵 Jalankan ambil raw data sebagai job latar", value=False)
 if st.button("▶️ Mulai Ambil Raw Data"):
-    ambil_raw()
+    smalls_raw = list(st.session_state.daftarwilayah['smallcode'])
+    if raw_di_latar:
+        job = job_runner().submit("raw", f"Ambil raw {nama_survey} — {nama_kab}", ambil_raw, smalls_raw)
+        st.success(f"🧵 Job {job.id} diantrekan; pantau di panel job di atas.")
+    else:
+        ambil_raw(smalls_raw)
 
 # =================== 5) APPROVE (UI) ===================
 st.header("5) Approve Assignments (UI)")
@@ -615,117 +636,108 @@ if subset_mode:
     subset_smalls = st.multiselect("Pilih smallcode", options=smalls_all, default=smalls_all[:10])
 headless_browser = st.checkbox("Browser headless (lebih cepat, kadang kurang stabil)", value=False)
 
-def _role_allows(role_name: str, current_status: str) -> bool:
-    return (
-        (role_name == 'Pengawas' and current_status == 'SUBMITTED BY Pencacah')
-        or (role_name == 'PML' and current_status == 'SUBMITTED BY PPL')
-        or (role_name == 'Admin Kabupaten' and current_status in ['APPROVED BY Pengawas', 'APPROVED BY PML', 'EDITED BY Admin Kabupaten'])
-        or (role_name == 'Admin Provinsi' and current_status == 'COMPLETED BY Admin Kabupaten')
-    )
+approve_api = st.checkbox(
+    "⚡ Approve lewat API tanpa browser (browser hanya cadangan bila endpoint ditolak)", value=bool(APPROVE_URL),
+    disabled=not APPROVE_URL, help="Atur env FASIH_APPROVE_URL untuk mengaktifkan.",
+)
+approve_fallback = st.checkbox("Siapkan browser sebagai cadangan approve API", value=False, disabled=not approve_api)
+approve_browsers = st.number_input(
+    "Jumlah browser paralel (approve lewat halaman review)", min_value=1, max_value=suggested_pool_size(), value=1,
+    help="Browser tambahan dibuka headless dengan cookie login yang sama; batas atas dari CPU & RAM mesin ini.",
+)
 
-def run_approve_ui():
-    # pastikan injeksi + handshake (jika user hanya Muat Session)
-    drv = inject_cookies_and_handshake(session, headless=headless_browser)
+def run_approve_ui(drv, smcodes, ui=st):
+    # drv sudah di-inject cookies di thread utama (inject_cookies_and_handshake pakai session_state);
+    # DriverPool bila beberapa browser paralel, None bila approve hanya lewat API
 
-    base_assign = "https://fasih-sm.bps.go.id/assignment-general/api/assignments/get-principal-values-by-smallest-code"
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     logfile = os.path.join(APPR_DIR, f"Log_Approve_{nama_kab}_{nama_survey}_{survey_period_name}_{ts}.xlsx")
 
     log_rows = []
-    smcodes = subset_smalls if subset_mode else list(st.session_state.daftarwilayah['smallcode'])
+    pending = {}  # future approve → baris log
+    metrics = HttpMetrics.for_run(APPR_DIR, f"Approve_{nama_kab}_{ts}")  # listing + riwayat + approve API
+    sess = session.with_hooks(metrics)  # hook per run, session bersama tidak disentuh
+    history = HistoryResolver(sess, status_of=status_terakhir)  # riwayat paralel + cache per run
+    steps = StepTimer(LEGACY_SLEEP)  # waktu tunggu per langkah browser vs sleep lama
+    approver = Approver(sess, survey_period_id, template_id, role, driver=drv,
+                        url=APPROVE_URL if approve_api else "", timer=steps)  # API paralel, driver bergantian
     total = len(smcodes)
-    prog = st.progress(0)
-    status = st.empty()
+    prog = ui.progress(0)
+    status = ui.empty()
 
-    for i, smallCode in enumerate(smcodes, start=1):
-        try:
-            # ambil assignments (dua pola)
-            urlA = f'{base_assign}/{survey_period_id}/{template_id}/{smallCode}'
-            rA = session.get(urlA, headers=headers, timeout=40)
-            data = []
-            if rA.ok:
-                try: data = rA.json().get('data', []) or []
-                except Exception: data = []
-            if not data:
-                urlB = f'{base_assign}/{survey_period_id}/{smallCode}'
-                rB = session.get(urlB, headers=headers, timeout=40)
-                if rB.ok:
-                    try: data = rB.json().get('data', []) or []
-                    except Exception: data = []
+    def collect(block=False):
+        done = list(pending) if block else [f for f in pending if f.done()]
+        for fut in done:
+            row = pending.pop(fut)
+            try:
+                row["approved"], row["keterangan"] = fut.result()
+            except Exception as e:
+                row["keterangan"] = f"❌ Error: {e}"
+            if row["approved"]:
+                status.write(f"✅ {row['smallCode']}: approved {row['assignment_id']}")
 
-            if not data:
-                status.write(f"ℹ️ {smallCode}: tidak ada data isian.")
+    table = ui.empty()
+    try:
+        for i, smallCode in enumerate(smcodes, start=1):
+            try:
+                # ambil assignments (dua pola)
+                urlA = LISTING_TEMPLATE_URL.format(period=survey_period_id, template_id=template_id, smallcode=smallCode)
+                rA = sess.get(urlA, headers=headers)
+                data = []
+                if rA.ok:
+                    try: data = rA.json().get('data', []) or []
+                    except Exception: data = []
+                if not data:
+                    urlB = LISTING_URL.format(period=survey_period_id, smallcode=smallCode)
+                    rB = sess.get(urlB, headers=headers)
+                    if rB.ok:
+                        try: data = rB.json().get('data', []) or []
+                        except Exception: data = []
+
+                if not data:
+                    status.write(f"ℹ️ {smallCode}: tidak ada data isian.")
+                    continue
+
+                history.submit([d.get('assignmentId') for d in data])
+                for d in data:
+                    assignment_id = d.get('assignmentId')
+                    if not assignment_id: continue
+                    review_url = REVIEW_URL.format(assignment_id=assignment_id, template_id=template_id, period=survey_period_id)
+                    status_assignment = history.status(assignment_id)
+                    row = {
+                        "smallCode": smallCode,
+                        "assignment_id": assignment_id,
+                        "status_assignment": status_assignment,
+                        "approved": False,
+                        "keterangan": "",
+                        "link_assignment": review_url,
+                    }
+                    log_rows.append(row)
+                    if assignment_id in history.errors:
+                        # riwayat gagal diambil (jaringan / session) → bukan soal syarat status
+                        row["keterangan"] = f"❌ Gagal ambil riwayat: {history.errors[assignment_id]}"
+                        status.write(f"⚠️ {smallCode}: gagal riwayat {assignment_id}: {history.errors[assignment_id]}")
+                        continue
+                    if not role_allows(role, status_assignment):
+                        row["keterangan"] = f"❌ Belum memenuhi syarat (status: {status_assignment})"
+                        continue
+                    pending[approver.submit(assignment_id, review_url)] = row
+                collect()
+            except Exception as e:
+                status.write(f"🚨 {smallCode}: error {e}")
+            finally:
                 prog.progress(int(i/total*100))
-                continue
-
-            for d in data:
-                assignment_id = d.get('assignmentId')
-                if not assignment_id: continue
-                review_url = f'https://fasih-sm.bps.go.id/survey-collection/survey-review/{assignment_id}/{template_id}/{survey_period_id}/a/1'
-                hist_url   = f'https://fasih-sm.bps.go.id/assignment-general/api/assignment-history/get-by-assignment-id?assignmentId={assignment_id}'
-                try:
-                    r = session.get(hist_url, headers=headers, timeout=30)
-                    hist_list = parse_assignment_status(r.json())
-                    status_assignment = hist_list[-1]['status_assignment'] if hist_list else ""
-                except Exception as e:
-                    status_assignment = ""
-                    status.write(f"⚠️ {smallCode}: gagal riwayat {assignment_id}: {e}")
-
-                approved = False
-                ket = ""
-                try:
-                    if not _role_allows(role, status_assignment):
-                        ket = f"❌ Belum memenuhi syarat (status: {status_assignment})"
-                    else:
-                        drv.get(review_url)
-                        wait = WebDriverWait(drv, 30)
-                        btn = wait.until(EC.element_to_be_clickable((By.ID, "buttonApprove")))
-                        clicked, attempt, max_attempts = False, 0, 5
-                        while not clicked and attempt < max_attempts:
-                            try:
-                                time.sleep(0.5)
-                                btn.click(); clicked = True
-                            except (ElementClickInterceptedException, StaleElementReferenceException):
-                                attempt += 1
-                                btn = wait.until(EC.element_to_be_clickable((By.ID, "buttonApprove")))
-                        if not clicked:
-                            raise RuntimeError("Gagal klik Approve")
-
-                        # Konfirmasi 1
-                        try:
-                            conf = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="fasih"]/div/div/div[6]/button[1]')))
-                            conf.click()
-                        except TimeoutException:
-                            pass
-                        # Konfirmasi 2 (opsional)
-                        try:
-                            conf2 = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="fasih"]/div/div/div[6]/button[1]')))
-                            conf2.click()
-                        except TimeoutException:
-                            pass
-
-                        approved = True
-                        ket = "✅ Approved"
-                        status.write(f"✅ {smallCode}: approved {assignment_id}")
-                except TimeoutException:
-                    ket = "❌ Timeout elemen"
-                except WebDriverException as e:
-                    ket = f"❌ WebDriver error: {e}"
-                except Exception as e:
-                    ket = f"❌ Error: {e}"
-
-                log_rows.append({
-                    "smallCode": smallCode,
-                    "assignment_id": assignment_id,
-                    "status_assignment": status_assignment,
-                    "approved": approved,
-                    "keterangan": ket,
-                    "link_assignment": review_url,
-                })
-        except Exception as e:
-            status.write(f"🚨 {smallCode}: error {e}")
-        finally:
-            prog.progress(int(i/total*100))
+                table.dataframe(metrics.frame())
+        status.write(f"⏳ menunggu {len(pending)} approve terakhir...")
+        collect(block=True)
+    finally:
+        approver.close()
+        history.close()
+        metrics.close()
+    ui.caption(f"📈 {metrics.text()} • {approver.text()} • log: {metrics.log_path}")
+    if steps.samples:
+        ui.caption(f"⏱️ {steps.text()}")
+        ui.dataframe(steps.frame())
 
     df_log = pd.DataFrame(log_rows)
     out = io.BytesIO()
@@ -733,17 +745,33 @@ def run_approve_ui():
         df_log.to_excel(w, index=False, sheet_name="approve_log")
     out.seek(0)
     with open(logfile, "wb") as f: f.write(out.getvalue())
-    st.success(f"✅ Log disimpan: {logfile}")
-    st.download_button("⬇️ Download Log Approve", out.getvalue(),
+    ui.success(f"✅ Log disimpan: {logfile}")
+    ui.download_button("⬇️ Download Log Approve", out.getvalue(),
                        file_name=os.path.basename(logfile),
                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    st.dataframe(df_log, use_container_width=True)
+    ui.dataframe(df_log, use_container_width=True)
+    return logfile
 
+approve_di_latar = st.checkbox("🧵 Jalankan approve sebagai job latar (Chrome headless sendiri)", value=False)
 if st.button("🚀 Jalankan Approve"):
     if st.session_state.daftarwilayah is None or st.session_state.daftarwilayah.empty:
         st.warning("Daftarwilayah kosong.")
     else:
         try:
-            run_approve_ui()
+            # pastikan injeksi + handshake (jika user hanya Muat Session)
+            drv = None
+            if (not approve_api or approve_fallback) and approve_di_latar:
+                # job latar punya Chrome headless sendiri dari cookie session; browser halaman ini tetap bebas
+                drv = DriverPool(partial(open_driver, session.cookies), int(approve_browsers))
+            elif not approve_api or approve_fallback:
+                drv = inject_cookies_and_handshake(session, headless=headless_browser, timer=st.session_state.login_steps)
+                if approve_browsers > 1:  # Chrome headless tambahan, dibuka saat dibutuhkan & ditutup di akhir run
+                    drv = DriverPool(partial(open_driver, session.cookies), int(approve_browsers), drivers=[drv])
+            smcodes = subset_smalls if subset_mode else list(st.session_state.daftarwilayah['smallcode'])
+            if approve_di_latar:
+                job = job_runner().submit("approve", f"Approve {role} {nama_survey} — {nama_kab}", run_approve_ui, drv, smcodes)
+                st.success(f"🧵 Job {job.id} diantrekan; pantau di panel job di atas.")
+            else:
+                run_approve_ui(drv, smcodes)
         except Exception as e:
             st.error(f"Gagal menjalankan approve: {e}")
@@ -18,10 +18,25 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, StaleElementReferenceException
 # import browser_cookie3
 import os, io, re, time, json, pickle, urllib.parse
+from functools import partial
 from datetime import datetime
 from pathlib import Path
+import sys
 import streamlit as st
 
+# modul bersama FASIH ada di projects/Fasih-SM
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Fasih-SM"))
+from fasih_approve import Approver, role_allows
+from fasih_browser import DriverPool, open_driver
+from fasih_client import HISTORY_URL, LISTING_URL, REVIEW_URL, SURVEY_BASE, FasihClient, fasih_headers
+from fasih_wilayah import crawl_wilayah, DEFAULT_WORKERS
+from fasih_columns import ColumnBuffer
+from fasih_detail_cache import DetailCache
+from fasih_history import HistoryResolver
+
+# cache disk detail assignment, dipakai bersama semua alur di app ini
+detail_cache = DetailCache()
+
 def simpan_session(username, headers, cookies, session, password=None):
     session_path = pilih_folder_simpan("Pilih Folder untuk Menyimpan Session Login")
 
@@ -151,12 +166,13 @@ def get_authenticated_cookies(driver: webdriver.Chrome) -> RequestsCookieJar:
     return jar
 
 
-def ambil_semua_sls_smallcode_dari_kabupaten(kabupaten_id, level_region, region_group_id, headers, cookies, region_level1, region_level2):
+def ambil_semua_sls_smallcode_dari_kabupaten(kabupaten_id, level_region, region_group_id, headers, cookies, region_level1, region_level2, max_workers=DEFAULT_WORKERS):
     print("\n=== Mengambil semua kecamatan, desa, dan sls dari kabupaten berdasarkan ID ===")
     print(":param kabupaten_id: ID kabupaten (level2Id)")
     print(":param region_group_id: groupId dari region metadata")
     print(":param headers: headers berisi XSRF dan lainnya")
     print(":param cookies: cookies hasil login SSO")
+    print(f":param max_workers: jumlah request paralel ({max_workers})")
     print(":return: DataFrame berisi daftar sls beserta id dan struktur wilayahnya\n")
 
     if not isinstance(level_region, list) or len(level_region) < 3:
@@ -170,117 +186,29 @@ def ambil_semua_sls_smallcode_dari_kabupaten(kabupaten_id, level_region, region_
             print("❌ Regionlevel tidak valid.")
             return pd.DataFrame()
 
-    result = []
+    bars = {}
+
+    def on_progress(level_name, done, total):
+        bar = bars.get(level_name)
+        if bar is None:
+            bar = bars[level_name] = tqdm(total=total, desc=f"Mengambil {level_name}", unit="wilayah")
+        bar.update(done - bar.n)
+        if done == total:
+            bar.close()
+
+    def on_error(level_name, parent_name, e):
+        print(f"❌ Gagal mengambil {level_name} dari {parent_name}: {e}")
 
     try:
-        # Ambil semua kecamatan
-        url_kecamatan = f"https://fasih-sm.bps.go.id/region/api/v1/region/level3?groupId={region_group_id}&level2Id={kabupaten_id}"
-        resp_kec = requests.get(url_kecamatan, headers=headers, cookies=cookies)
-        resp_kec.raise_for_status()
-        daftar_kecamatan = resp_kec.json().get('data', [])
+        result = crawl_wilayah(kabupaten_id, level_region, region_group_id, headers, cookies,
+                               max_workers=max_workers, on_progress=on_progress, on_error=on_error)
     except Exception as e:
         print(f"❌ Gagal mengambil data kecamatan: {e}")
         return pd.DataFrame()
 
-    for kec in daftar_kecamatan:
-        kecamatan_id = kec['id']
-        kecamatan_name = kec['name']
-        kecamatan_kode = kec['fullCode']
-        print(f"📍 Kecamatan: {kecamatan_name}")
-
-        if len(level_region) == 3:
-            result.append({
-                f'{level_region[2]['name']}_id': kecamatan_id,
-                f'{level_region[2]['name']}': kecamatan_name,
-                'smallcode': kecamatan_kode,
-            })
-            continue
-
-        try:
-            # Ambil semua desa dari kecamatan
-            url_desa = f"https://fasih-sm.bps.go.id/region/api/v1/region/level4?groupId={region_group_id}&level3Id={kecamatan_id}"
-            resp_desa = requests.get(url_desa, headers=headers, cookies=cookies)
-            resp_desa.raise_for_status()
-            daftar_desa = resp_desa.json().get('data', [])
-        except Exception as e:
-            print(f"❌ Gagal mengambil desa dari {kecamatan_name}: {e}")
-            continue
-
-        for desa in daftar_desa:
-            desa_id = desa['id']
-            desa_name = desa['name']
-            desa_kode = desa['fullCode']
-            print(f"  🏘️ Desa: {desa_name}")
-
-            if len(level_region) == 4:
-                result.append({
-                    f'{level_region[2]['name']}_id': kecamatan_id,
-                    f'{level_region[2]['name']}': kecamatan_name,
-                    f'{level_region[3]['name']}_id': desa_id,
-                    f'{level_region[3]['name']}': desa_name,
-                    'smallcode': desa_kode,
-                })
-                continue
-
-            try:
-                # Ambil semua SLS dari desa
-                url_sls = f"https://fasih-sm.bps.go.id/region/api/v1/region/level5?groupId={region_group_id}&level4Id={desa_id}"
-                resp_sls = requests.get(url_sls, headers=headers, cookies=cookies)
-                resp_sls.raise_for_status()
-                daftar_sls = resp_sls.json().get('data', [])
-            except Exception as e:
-                print(f"❌ Gagal mengambil SLS dari {desa_name}: {e}")
-                continue
-
-            for sls in daftar_sls:
-                sls_id = sls['id']
-                sls_name = sls['name']
-                sls_kode = sls['fullCode']
-                print(f"    🧾 SLS: {sls_name} ({sls_kode})")
-
-                if len(level_region) == 5:
-                    result.append({
-                        f'{level_region[2]['name']}_id': kecamatan_id,
-                        f'{level_region[2]['name']}': kecamatan_name,
-                        f'{level_region[3]['name']}_id': desa_id,
-                        f'{level_region[3]['name']}': desa_name,
-                        f'{level_region[4]['name']}_id': sls_id,
-                        f'{level_region[4]['name']}': sls_name,
-                        'smallcode': sls_kode,
-                    })
-                    continue
-
-                try:
-                    # Ambil semua SUB SLS dari SLS
-                    url_subsls = f"https://fasih-sm.bps.go.id/region/api/v1/region/level6?groupId={region_group_id}&level5Id={sls_id}"
-                    resp_subsls = requests.get(url_subsls, headers=headers, cookies=cookies)
-                    resp_subsls.raise_for_status()
-                    daftar_subsls = resp_subsls.json().get('data', [])
-                except Exception as e:
-                    print(f"❌ Gagal mengambil SUB SLS dari {sls_name}: {e}")
-                    continue
-
-                for subsls in daftar_subsls:
-                    subsls_id = subsls['id']
-                    subsls_name = subsls['name']
-                    subsls_kode = subsls['fullCode']
-                    print(f"        🧾 SubSLS: {subsls_name} ({subsls_kode})")
-
-                    result.append({
-                        f'{level_region[2]['name']}_id': kecamatan_id,
-                        f'{level_region[2]['name']}': kecamatan_name,
-                        f'{level_region[3]['name']}_id': desa_id,
-                        f'{level_region[3]['name']}': desa_name,
-                        f'{level_region[4]['name']}_id': sls_id,
-                        f'{level_region[4]['name']}': sls_name,
-                        f'{level_region[5]['name']}_id': subsls_id,
-                        f'{level_region[5]['name']}': subsls_name,
-                        'smallcode': subsls_kode,
-                    })
-
-    if not result:
+    if result.empty:
         print("⚠️ Tidak ada data yang berhasil diambil.")
-    return pd.DataFrame(result)
+    return result
 
 def pilih_file(filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]) -> str:
     clear_screen()
@@ -337,17 +265,11 @@ def extract_answers(answers):
 
 def fetch_detail(d):
     assignment_id = d['assignmentId']
-    url = f'https://fasih-sm.bps.go.id/assignment-general/api/assignment/get-by-id-with-data-for-scm?id={assignment_id}'
     try:
-        resp_detail = session.get(url, headers=headers, timeout=15)
-        detail_json = resp_detail.json()
-        inner_json = json.loads(detail_json["data"]["data"])
-        answers = inner_json["answers"]
-        answer_label = [item["dataKey"] for item in answers]
-        answer_values = extract_answers(answers=answers)
-        df = pd.DataFrame([answer_values], columns=answer_label)
-        df['assignment_id'] = assignment_id
-        return df
+        # satu dict per baris, siap untuk ColumnBuffer.append (bukan DataFrame satu baris)
+        row = extract_answers(detail_cache.answers(session, d, timeout=15))
+        row['assignment_id'] = assignment_id
+        return row
     except Exception as e:
         print(f"⚠️ Error parsing assignment_id {assignment_id}: {e}")
         return None
@@ -356,7 +278,7 @@ def get_all_survey_answers(id_survey, template_id, nama_kab, nama_survey, daftar
 
     # Ambil surveyPeriodsId
     try:
-        url = f'https://fasih-sm.bps.go.id/survey/api/v1/surveys/{id_survey}'
+        url = f'{SURVEY_BASE}/surveys/{id_survey}'
         resp = session.get(url, headers=headers)
         
         # Pastikan status OK
@@ -389,14 +311,17 @@ def get_all_survey_answers(id_survey, template_id, nama_kab, nama_survey, daftar
     filepath = os.path.join(save_dir, filename)
     filepath2 = os.path.join(save_dir, filename2)
 
-    res_list = []
-    res2_list = []
+    # buffer kolom: tanpa DataFrame per baris + concat di akhir
+    res_buf = ColumnBuffer()
+    res2_buf = ColumnBuffer()
+    # riwayat status diambil paralel di latar, kolomnya diisi sekaligus saat simpan
+    history = HistoryResolver(session, status_of=status_terakhir)
 
     start_time = time.time()  # Catat waktu mulai
 
     try:
         for smallCode in tqdm(daftarwilayah['smallcode'], desc="Mengambil data SLS", unit="SLS"):
-            url = f'https://fasih-sm.bps.go.id/assignment-general/api/assignments/get-principal-values-by-smallest-code/{surveyPeriodsId}/{smallCode}'
+            url = LISTING_URL.format(period=surveyPeriodsId, smallcode=smallCode)
             resp = session.get(url, headers=headers)
             if resp.status_code != 200 or not resp.text.strip():
                 print(f"❌ Gagal ambil data untuk smallCode {smallCode}, status_code={resp.status_code}")
@@ -406,25 +331,20 @@ def get_all_survey_answers(id_survey, template_id, nama_kab, nama_survey, daftar
             if not isinstance(data, list) or not data:
                 continue
 
-            res2_list.append(pd.DataFrame(data))
+            for d in data:
+                res2_buf.append(d)
+            history.submit([d['assignmentId'] for d in data])
             # data2 = pd.DataFrame(data)
 
             for d in data:
                 assignment_id = d['assignmentId']
-                url_detail = f'https://fasih-sm.bps.go.id/assignment-general/api/assignment/get-by-id-with-data-for-scm?id={assignment_id}'
                 review_assignment_url = f'https://fasih-sm.bps.go.id/survey-collection/survey-review/{assignment_id}/{template_id}/{surveyPeriodsId}/a/1'
                 try:
-                    resp_detail = session.get(url_detail, headers=headers)
-                    detail_json = resp_detail.json()
-                    inner_json = json.loads(detail_json["data"]["data"])
-                    answers = inner_json["answers"]
-                    answer_label = [item["dataKey"] for item in answers]
-                    answer_values = extract_answers(answers)
-                    df = pd.DataFrame([answer_values], columns=answer_label)
-                    df['assignment_id'] = assignment_id
-                    df['link_preview'] = review_assignment_url
-                    df['status_assignment'] = getLastHistory(assignment_id)
-                    res_list.append(df)
+                    answers = detail_cache.answers(session, d)
+                    row = extract_answers(answers)
+                    row['assignment_id'] = assignment_id
+                    row['link_preview'] = review_assignment_url
+                    res_buf.append(row)
                 except Exception as e:
                     print(f"⚠️ Gagal ambil detail assignment_id {assignment_id}: {e}")
 
@@ -436,9 +356,10 @@ def get_all_survey_answers(id_survey, template_id, nama_kab, nama_survey, daftar
         print(e)
     finally:
         # Simpan data yang sempat terkumpul, walaupun error
-        if res_list:
+        if len(res_buf):
             try:
-                df_main = pd.concat(res_list, ignore_index=True)
+                df_main = res_buf.to_frame()
+                df_main['status_assignment'] = history.status_column(df_main['assignment_id'])
                 df_main.fillna('', inplace=True)
                 df_main.to_excel(filepath, index=False)
                 print(f"✅ Data utama (partial/full) disimpan ke: {filepath}")
@@ -446,10 +367,12 @@ def get_all_survey_answers(id_survey, template_id, nama_kab, nama_survey, daftar
                 print(f"⚠️ Gagal simpan data utama: {e}")
         else:
             print("⚠️ Tidak ada data 'answers' yang bisa disimpan.")
+        print(f"ℹ️ {history.summary()}")
+        history.close()
 
-        if res2_list:
+        if len(res2_buf):
             try:
-                df_assign = pd.concat(res2_list, ignore_index=True)
+                df_assign = res2_buf.to_frame()
                 df_assign.fillna('', inplace=True)
                 df_assign.to_excel(filepath2, index=False)
                 print(f"✅ Data assignment (partial/full) disimpan ke: {filepath2}")
@@ -465,7 +388,7 @@ def get_all_survey_answers(id_survey, template_id, nama_kab, nama_survey, daftar
         print(f"⏱️ Proses selesai dalam {int(menit)} menit {int(detik)} detik.")
 
     # Return hasil meskipun tidak lengkap
-    return pd.concat(res_list, ignore_index=True) if res_list else pd.DataFrame()
+    return res_buf.to_frame()
 
 
 def parse_assignment_status(data_json):
@@ -493,29 +416,28 @@ def parse_assignment_status(data_json):
 
 def getRoles(surveyPeriodeId, headers, cookies, session):
     # Ambil surveyPeriodsId
-    url = f'https://fasih-sm.bps.go.id/survey/api/v1/users/myinfo?surveyPeriodId={surveyPeriodeId}'
+    url = f'{SURVEY_BASE}/users/myinfo?surveyPeriodId={surveyPeriodeId}'
     resp = session.get(url, headers=headers)
     surveyRole = resp.json()['data']['surveyRole']['description']
     return surveyRole
 
 
+def status_terakhir(history_json):
+    # parse_assignment_status selalu memberi minimal satu baris ("Open" bila kosong)
+    return parse_assignment_status(history_json)[-1]['status_assignment']
+
+
 def getLastHistory(assignmentId):
-    history_url = f'https://fasih-sm.bps.go.id/assignment-general/api/assignment-history/get-by-assignment-id?assignmentId={assignmentId}'
+    history_url = HISTORY_URL.format(assignment_id=assignmentId)
     resp_history = session.get(history_url, headers=headers)
-    history = parse_assignment_status(resp_history.json())
-    try:
-        status_assignment = history[-1]['status_assignment']
-    except:
-        status_assignment = history[0]['status_assignment']
+    return status_terakhir(resp_history.json())
 
-    return status_assignment
 
 
 
-
-def approveByPML(id_survey, template_id, nama_kab, nama_survey, daftarwilayah, headers, cookies, session):
+def approveByPML(id_survey, template_id, nama_kab, nama_survey, daftarwilayah, headers, cookies, session, driver=None):
     # Ambil surveyPeriodsId
-    url = f'https://fasih-sm.bps.go.id/survey/api/v1/surveys/{id_survey}'
+    url = f'{SURVEY_BASE}/surveys/{id_survey}'
     resp = session.get(url, headers=headers)
 
     # Pastikan status OK
@@ -551,146 +473,81 @@ def approveByPML(id_survey, template_id, nama_kab, nama_survey, daftarwilayah, h
 
     # Inisialisasi DataFrame untuk menyimpan log approval
     log_approve = []
+    history = HistoryResolver(session, status_of=status_terakhir)
+    if driver is None:
+        # tanpa driver konsol: Chrome headless dari cookie session (dibuka saat API tidak tersedia)
+        driver = DriverPool(partial(open_driver, session.cookies), size=1)
+    approver = Approver(session, surveyPeriodsId, template_id, roles, driver=driver)
+    print(f"Approve lewat: {approver.engine}")
 
     start_time = time.time()  # Catat waktu mulai
 
-    # Loop per smallCode
-    for smallCode in tqdm(daftarwilayah['smallcode'], desc="Mengapprove data SLS", unit="Data"):
-        url = f'https://fasih-sm.bps.go.id/assignment-general/api/assignments/get-principal-values-by-smallest-code/{surveyPeriodsId}/{smallCode}'
-        resp = session.get(url, headers=headers)
+    try:
+        # Loop per smallCode
+        for smallCode in tqdm(daftarwilayah['smallcode'], desc="Mengapprove data SLS", unit="Data"):
+            url = LISTING_URL.format(period=surveyPeriodsId, smallcode=smallCode)
+            resp = session.get(url, headers=headers)
         
-        if resp.status_code != 200 or not resp.text.strip():
-            print(f"❌ Gagal mengambil data untuk smallCode {smallCode}, status_code={resp.status_code}")
-            continue
+            if resp.status_code != 200 or not resp.text.strip():
+                print(f"❌ Gagal mengambil data untuk smallCode {smallCode}, status_code={resp.status_code}")
+                continue
 
-        try:
-            data = resp.json().get('data', [])
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON decode error untuk smallCode {smallCode}: {e}")
-            continue
+            try:
+                data = resp.json().get('data', [])
+            except json.JSONDecodeError as e:
+                print(f"❌ JSON decode error untuk smallCode {smallCode}: {e}")
+                continue
         
-        if not data:
-            print(f"ℹ️ Tidak ada data isian untuk smallCode {smallCode}.")
-            continue
+            if not data:
+                print(f"ℹ️ Tidak ada data isian untuk smallCode {smallCode}.")
+                continue
         
-        print("---------------------------------------------------------------------\n")
-        print(f"\n📌 Ditemukan {len(data)} data isian untuk wilayah {smallCode}.")
+            print("---------------------------------------------------------------------\n")
+            print(f"\n📌 Ditemukan {len(data)} data isian untuk wilayah {smallCode}.")
         
-        if pilih1 != 'Y':
-            pilih2 = input("Ingin lanjut approval untuk wilayah ini? (Y/N): ").strip().upper()
-            # pilih2 = 'Y'
-            if pilih2 != "Y":
-                print(f"⏭️ Melewati approval untuk {smallCode}.")
-                continue
+            if pilih1 != 'Y':
+                pilih2 = input("Ingin lanjut approval untuk wilayah ini? (Y/N): ").strip().upper()
+                # pilih2 = 'Y'
+                if pilih2 != "Y":
+                    print(f"⏭️ Melewati approval untuk {smallCode}.")
+                    continue
         
-        status_assignment_filter = ''
-        for d in data:
-            assignment_id = d['assignmentId']
-            history_url = f'https://fasih-sm.bps.go.id/assignment-general/api/assignment-history/get-by-assignment-id?assignmentId={assignment_id}'
-            resp_history = session.get(history_url, headers=headers)
-            review_assignment_url = f'https://fasih-sm.bps.go.id/survey-collection/survey-review/{assignment_id}/{template_id}/{surveyPeriodsId}/a/1'
-            try:
-                history = parse_assignment_status(resp_history.json())
-                status_assignment = history[-1]['status_assignment']
-                approved = False
-                keterangan = ""
-
-                if (
-                    (roles == 'Pengawas' and status_assignment == 'SUBMITTED BY Pencacah') or
-                    (roles == 'PML' and status_assignment == 'SUBMITTED BY PPL') or
-                    (roles == 'Admin Kabupaten' and status_assignment == 'APPROVED BY Pengawas') or
-                    (roles == 'Admin Kabupaten' and status_assignment == 'APPROVED BY PML') or
-                    (roles == 'Admin Kabupaten' and status_assignment == 'EDITED BY Admin Kabupaten') or
-                    (roles == 'Admin Provinsi' and status_assignment == 'COMPLETED BY Admin Kabupaten')
-                ):
-                    status_assignment_filter = status_assignment
-                    try:
-                        driver.get(review_assignment_url)
-                        
-                        wait = WebDriverWait(driver, 30)
-
-                        # Tunggu spinner overlay hilang
-                        # wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, "ngx-spinner-overlay")))
-
-                        # Tunggu tombol approve muncul dan terlihat
-                        wait.until(EC.presence_of_element_located((By.ID, "buttonApprove")))
-                        # wait.until(EC.visibility_of_element_located((By.ID, "buttonApprove")))
-                        
-                        # Tunggu tombol benar-benar bisa diklik
-                        approve_button = wait.until(EC.element_to_be_clickable((By.ID, "buttonApprove")))
-
-                        clicked = False
-                        attempt = 0
-                        max_attempts = 5
-
-                        while not clicked and attempt < max_attempts:
-                            try:
-                                print(f"🔁 Mencoba klik tombol approve... percobaan ke-{attempt+1}")
-                                time.sleep(0.5)  # beri jeda agar stabil
-                                approve_button.click()
-                                clicked = True
-                                print("✅ Klik tombol approve berhasil.")
-                            except (ElementClickInterceptedException, StaleElementReferenceException) as e:
-                                attempt += 1
-                                print(f"⚠️ Klik gagal: {e}. Mengulang...")
-                                # Refresh element jika perlu
-                                approve_button = wait.until(EC.element_to_be_clickable((By.ID, "buttonApprove")))
-                            except Exception as e:
-                                print(f"❌ Error lain saat klik approve: {e}")
-                                break
-
-                        # Konfirmasi 1
-                        wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="fasih"]/div/div/div[6]/button[1]')))
-                        wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="fasih"]/div/div/div[6]/button[1]')))
-                        confirm1 = driver.find_element(By.XPATH, '//*[@id="fasih"]/div/div/div[6]/button[1]')
-                        confirm1.click()
-
-                        # Konfirmasi 2 (jika ada)
-                        try:
-                            wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="fasih"]/div/div/div[6]/button[1]')))
-                            confirm2 = driver.find_element(By.XPATH, '//*[@id="fasih"]/div/div/div[6]/button[1]')
-                            confirm2.click()
-                        except TimeoutException:
-                            pass
-
-                        approved = True
-                        keterangan = "✅ Approved"
-                        print(f"✅ Approved assignment {assignment_id}")
-
-                    except TimeoutException:
-                        keterangan = "❌ Timeout: Elemen tidak muncul"
-                        print(f"❌ Timeout untuk assignment {assignment_id}")
-                    except ElementClickInterceptedException as e:
-                        keterangan = f"❌ Klik gagal karena ditutup elemen lain: {e}"
-                        print(f"❌ Klik gagal untuk assignment {assignment_id}: {e}")
-                    except Exception as e:
-                        keterangan = f"❌ Error saat klik approve: {e}"
-                        print(f"❌ Error klik approve untuk assignment {assignment_id}: {e}")
-
-                else:
-                    keterangan = f"❌ Belum memenuhi syarat approve (status: {status_assignment})"
-                    print(f"ℹ️ Assignment {assignment_id} belum bisa diapprove (status: {status_assignment})")
-
-                # Tambahkan log
-                log_approve.append({
+            status_assignment_filter = ''
+            history.submit([d['assignmentId'] for d in data])  # riwayat satu SLS diambil paralel
+            pending = {}
+            for d in data:
+                assignment_id = d['assignmentId']
+                review_assignment_url = REVIEW_URL.format(assignment_id=assignment_id, template_id=template_id, period=surveyPeriodsId)
+                status_assignment = history.status(assignment_id)
+                row = {
                     'assignment_id': assignment_id,
                     'link_assignment': review_assignment_url,
                     'smallCode': smallCode,
                     'status_assignment': status_assignment,
-                    'approved': approved,
-                    'keterangan': keterangan
-                })
-
-            except Exception as e:
-                print(f"❌ Gagal memproses assignment {assignment_id}: {e}")
-                log_approve.append({
-                    'assignment_id': assignment_id,
-                    'link_assignment': review_assignment_url,
-                    'smallCode': smallCode,
-                    'status_assignment': 'ERROR',
                     'approved': False,
-                    'keterangan': f"❌ Exception: {e}"
-                })
+                    'keterangan': f"❌ Belum memenuhi syarat approve (status: {status_assignment})",
+                }
+                log_approve.append(row)
+                if assignment_id in history.errors:
+                    # riwayat gagal diambil (jaringan / session) → bukan soal syarat status
+                    row['keterangan'] = f"❌ Gagal ambil riwayat: {history.errors[assignment_id]}"
+                    print(f"⚠️ Riwayat {assignment_id} gagal diambil: {history.errors[assignment_id]}")
+                elif role_allows(roles, status_assignment):
+                    status_assignment_filter = status_assignment
+                    pending[approver.submit(assignment_id, review_assignment_url)] = row  # API paralel / driver bergantian
+                else:
+                    print(f"ℹ️ Assignment {assignment_id} belum bisa diapprove (status: {status_assignment})")
+
+            for fut in as_completed(pending):
+                row = pending[fut]
+                try:
+                    row['approved'], row['keterangan'] = fut.result()
+                except Exception as e:
+                    row['approved'], row['keterangan'] = False, f"❌ Exception: {e}"
+                print(f"{row['keterangan']} — assignment {row['assignment_id']}")
+    finally:
+        approver.close()
+        history.close()
 
     # Simpan log approval ke Excel
     df_log = pd.DataFrame(log_approve)
@@ -758,21 +615,8 @@ def main(driver, username, password=None):
     print("XSRF Token1:", xsrf_token)
     print("XSRF Token2:", xsrf_token1)
 
-    headers = {
-        'X-Requested-With': 'XMLHttpRequest',
-        'X-XSRF-TOKEN': xsrf_token,
-        'Referer': 'https://fasih-sm.bps.go.id/',
-        'User-Agent': 'Mozilla/5.0',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json, text/plain, */*',
-        'Origin': 'https://fasih-sm.bps.go.id'
-    }
-
-    session = requests.Session()
-    session.cookies = cookies  # gunakan RequestsCookieJar lengkap
-    # session.cookies.update(cookies)
-    session.headers.update(headers)
-    session.cookies.update(cookies)
+    headers = fasih_headers(cookies)
+    session = FasihClient(headers, cookies)  # RequestsCookieJar lengkap, pool koneksi bersama
     print("Berhasil Login!")
     return headers, cookies, session, password
 
@@ -898,21 +742,8 @@ if mode == "Login SSO":
                 st.write("XSRF Token1:", xsrf_token)
                 st.write("XSRF Token2:", xsrf_token1)
 
-                headers = {
-                    'X-Requested-With': 'XMLHttpRequest',
-                    'X-XSRF-TOKEN': xsrf_token,
-                    'Referer': 'https://fasih-sm.bps.go.id/',
-                    'User-Agent': 'Mozilla/5.0',
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json, text/plain, */*',
-                    'Origin': 'https://fasih-sm.bps.go.id'
-                }
-
-                session = requests.Session()
-                session.cookies = cookies  # gunakan RequestsCookieJar lengkap
-                # session.cookies.update(cookies)
-                session.headers.update(headers)
-                session.cookies.update(cookies)
+                headers = fasih_headers(cookies)
+                session = FasihClient(headers, cookies)  # RequestsCookieJar lengkap, pool koneksi bersama
                 st.success("Berhasil Login!")
                 
                 